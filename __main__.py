@@ -4,11 +4,6 @@ import json
 import argparse
 import logging
 
-from .worker.worker import GlycomodWorker
-from .worker.utils import check_internet_conn
-from .worker.utils import validate_filename
-from .worker.utils import check_text_input_consistency 
-
 logging.basicConfig(format='[%(levelname)s][%(funcName)s] %(message)s', level=logging.INFO)
 logger = logging.getLogger(__file__)
 
@@ -37,47 +32,175 @@ def which_driver():
         raise EnvironmentError(f"Unsupported operating system: {system}")
     return ch_drvr
 
+
+# options of local runs which jobs sent with --daemon can not carry
+DAEMON_CLIENT_UNSUPPORTED = (
+    "txt", "echo", "adducts", "mass_type", "dedup", "pipeline", "journal", "profile", "cprofile", "trace_memory",
+)
+# options of single file runs which batch mode does not use
+BATCH_UNSUPPORTED = ("echo", "journal", "profile", "cprofile", "trace_memory")
+# options of local runs which daemon started with --serve does not use, jobs are written only to the client
+SERVE_UNSUPPORTED = ("txt", "echo", "adducts", "journal", "profile", "cprofile", "trace_memory")
+
+
+def changed_options(parser, args, names) -> list:
+    """Command line spelling of options in names which are not left at their defaults"""
+    return [f"--{name.replace('_', '-')}" for name in names if getattr(args, name) != parser.get_default(name)]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Provide a filepath and run Glycomod search and save results as text or table.')
+    parser.add_argument("--echo", "-e", action="store_true", help="Display results in terminal/console")
+    parser.add_argument("--debug", "-d", action="store_true", help="Display debug logs in console")
+    parser.add_argument("path", type=str, nargs="?", help="Path to text file containig glycan masses. Masses must be floating point numbers separated by newlines. "
+        "mzML and MGF files are read spectrum by spectrum and picked peaks are searched (see config.json/\"peak_picking\"). "
+        "Directory or glob pattern (quoted, e.g. 'study/*.txt') runs batch search of all matching files")
+    parser.add_argument("--tag", "-t", type=str, help=f"N-glycan reducing end tag NAME.\nSupported: 2-AB, ProA")
+    parser.add_argument("--filename", "-f", type=str, help="Filename used for saving .csv or .txt")
+    parser.add_argument("--config", "-cfg", type=str, help="Path to config. If not provided deafault is used")
+    parser.add_argument("--txt", action="store_true", help="Save results as text")
+    parser.add_argument("--format", type=str, choices=["csv", "parquet", "feather"], default="csv",
+        help="Format of results table. 'parquet' and 'feather' require pyarrow")
+    parser.add_argument("--backend", "-b", type=str, choices=["selenium", "http", "local"], default="selenium",
+        help="Search backend. 'selenium' uses Glycomod through Chrome, 'http' submits Glycomod form without browser, 'local' searches compositions offline")
+    parser.add_argument("--chunk-size", type=int, default=0,
+        help="Submit masses to Glycomod in chunks of this many masses. By default all masses are submitted at once")
+    parser.add_argument("--workers", type=int, default=4, help="Number of chunks submitted concurrently")
+    parser.add_argument("--pipeline", action="store_true",
+        help="Fetch, parse and save chunks of masses in overlapping stages. Uses --chunk-size, 100 masses by default")
+    parser.add_argument("--mass-type", type=str, choices=["mono", "avg"], default="mono",
+                        help="Search and report monoisotopic (mono) or average (avg) masses")
+    parser.add_argument("--adducts", type=str, metavar="NAMES",
+                        help="Local backend: search every mass as each of comma separated adducts from config.json/\"adducts\" "
+                             "(e.g. H+,Na+,2H2+) or 'all', results table gets Adduct column")
+    parser.add_argument("--dedup", type=float, default=0.0, metavar="FRACTION",
+                        help="Search masses closer than FRACTION*Tolerance as one query window, e.g. 0.2")
+    parser.add_argument("--journal", type=str, nargs="?", const="", metavar="PATH",
+                        help="Save completed chunks to journal (default: <input>.journal), rerun resumes from it")
+    parser.add_argument("--html-parser", type=str, choices=["lxml", "reference"], default="lxml",
+        help="Parser for Glycomod HTML. 'reference' is the original BeautifulSoup/html5lib parser")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use or update cached Glycomod results (local backend is never cached)")
+    parser.add_argument("--processes", type=int, default=0,
+        help="Batch mode: number of processes searching files in parallel. Defaults to number of CPUs")
+    parser.add_argument("--output-dir", type=str, default=".",
+        help="Batch mode: directory for results of every file and batch summary")
+    parser.add_argument("--profile", type=str, metavar="PATH",
+        help="Save wall time, item counts and peak memory of every stage as JSON file")
+    parser.add_argument("--trace-memory", action="store_true",
+        help="With --profile, also save peak traced memory of every stage. Tracing slows down stages, so their times are not representative")
+    parser.add_argument("--cprofile", type=str, metavar="STAGE",
+        help="With --profile, also save cProfile statistics of one stage (e.g. _parse_gm_html) as PATH.STAGE.prof")
+    parser.add_argument("--serve", type=str, nargs="?", const="127.0.0.1:8765", metavar="ADDRESS",
+        help="Run as daemon keeping warm backends, jobs are accepted on ADDRESS ('host:port' or 'unix:/path/to/socket', default 127.0.0.1:8765)")
+    parser.add_argument("--pool-size", type=int, default=2, help="Daemon: number of warm workers (jobs running at once)")
+    parser.add_argument("--daemon", type=str, metavar="ADDRESS", help="Send search to daemon running on ADDRESS instead of searching in this process")
+    parser.add_argument("--build-index", action="store_true",
+        help="Precompute composition masses for current config, used by 'local' backend")
+    return parser
+
 # TODO test main()
 # TODO make GUI
 # TODO setup.py
 # TODO write readme.md
 # TODO choose licese
 def main():
+    # worker modules are imported after arguments are parsed, so --help and argument errors are fast
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.debug:
+        logging.getLogger().setLevel(logging.DEBUG)
+    if args.build_index:
+        from .worker.mass_index import MassIndex
+        index = MassIndex.build(init_config(path=args.config), mass_type=args.mass_type)
+        logger.info(f"Built mass index with {len(index)} compositions: {index.path}")
+        if not args.path:
+            return
+    if not args.path and not args.serve:
+        parser.error("the following arguments are required: path")
+    if args.daemon:
+        # daemon searches with settings it was started with, job carries only masses, tag and format
+        ignored = changed_options(parser, args, DAEMON_CLIENT_UNSUPPORTED)
+        if ignored:
+            parser.error(f"{', '.join(ignored)} not supported with --daemon, start the daemon with search settings instead")
+    if args.serve:
+        ignored = changed_options(parser, args, SERVE_UNSUPPORTED)
+        if ignored:
+            parser.error(f"{', '.join(ignored)} not supported with --serve")
+    # directory or glob pattern
+    batch = bool(args.path) and (os.path.isdir(args.path) or any(char in args.path for char in "*?["))
+    if batch:
+        ignored = changed_options(parser, args, BATCH_UNSUPPORTED)
+        if ignored:
+            parser.error(f"{', '.join(ignored)} supported only for single file runs, not in batch mode")
+
+    from .worker.utils import check_internet_conn_cached
+    from .worker.utils import validate_filename
+    from .worker.spectra import read_input
+    # local backend does not need Glycomod, daemon client only needs daemon
+    if args.backend != "local" and not args.daemon and not check_internet_conn_cached():
+        raise EnvironmentError("Unable to connect to Glycomod. No internet connection.")
     driver_path = which_driver()
-    if check_internet_conn():
-        parser = argparse.ArgumentParser(description='Provide a filepath and run Glycomod search and save results as text or table.')
-        parser.add_argument("--echo", "-e", action="store_true", help="Display results in terminal/console")
-        parser.add_argument("--debug", "-d", action="store_true", help="Display debug logs in console")
-        parser.add_argument("path", type=str, help="Path to text file containig glycan masses. Masses must be floating point numbers separated by newlines")
-        parser.add_argument("--tag", "-t", type=str, help=f"N-glycan reducing end tag NAME.\nSupported: 2-AB, ProA")
-        parser.add_argument("--filename", "-f", type=str, help="Filename used for saving .csv or .txt")
-        parser.add_argument("--config", "-cfg", type=str, help="Path to config. If not provided deafault is used")
-        parser.add_argument("--txt", action="store_true", help="Save results as text")
-        args = parser.parse_args()
-        if args.debug:
-            logging.getLogger().setLevel(logging.DEBUG)
-        if args.path.endswith(".txt"):
-            path = os.path.normpath(args.path)
-            with open(path, 'r') as infile:
-                text_input = infile.read()
-            check_text_input_consistency(text_input)
-        else:
-            raise TypeError("Provided file is not a textfile. Please provide a proper text(.txt) file.")
-        if args.filename:
-            validate_filename(args.filename)
-            logger.debug("Using filename: %s" % args.filename)
+    if args.filename:
+        validate_filename(args.filename)
+        logger.debug("Using filename: %s" % args.filename)
+    # local search is faster than reading its results back from the cache
+    use_cache = not args.no_cache and args.backend != "local"
+    worker_kwargs = dict(
+        driver_path=driver_path, reducing_end=args.tag, save_txt=args.txt, backend=args.backend,
+        chunk_size=args.chunk_size, max_workers=args.workers, use_cache=use_cache,
+        html_parser=args.html_parser, output_format=args.format, pipeline=args.pipeline, dedup=args.dedup,
+        mass_type=args.mass_type,
+        adducts=None if not args.adducts else "all" if args.adducts == "all" else args.adducts.split(",")
+    )
+    if args.serve:
+        from .worker.daemon import serve
+        # tag, output format and pipeline are chosen per job
+        serve(init_config(path=args.config), address=args.serve, size=args.pool_size, driver_path=driver_path,
+              backend=args.backend, chunk_size=args.chunk_size, max_workers=args.workers,
+              use_cache=use_cache, html_parser=args.html_parser, dedup=args.dedup,
+              mass_type=args.mass_type)
+        return
+    if batch:
+        from .worker.batch import collect_inputs, run_batch
+        inputs = collect_inputs(args.path)
+        run_batch(init_config(path=args.config), inputs, output_dir=args.output_dir, processes=args.processes,
+                  summary_name=args.filename or "batch_summary", **worker_kwargs)
+        logger.debug("BATCH SEARCH FINISHED")
+        return
+    cfg = init_config(path=args.config)
+    path = os.path.normpath(args.path)
+    peaks = read_input(path, cfg.get("peak_picking"))
 
-        cfg = init_config(path=args.config)
-        gw = GlycomodWorker(cfg, driver_path=driver_path, text_input=text_input, reducing_end=args.tag, save_txt=args.txt)
-        logger.debug(f"Running GlycomodWorker\nParams: {args}")
+    if args.daemon:
+        from .worker.daemon import query
+        from datetime import datetime
+        filename = args.filename or datetime.now().strftime("results_%Y%m%d_%H:%M:%S")
+        fmt = args.format
+        with open(f"{filename}.{fmt}", "wb") as outfile:
+            outfile.write(query(args.daemon, peaks.labels, tag=args.tag, fmt=fmt))
+        logger.debug(f"Saved daemon results: {filename}.{fmt}")
+        return
+
+    from .worker.worker import GlycomodWorker
+    metrics = None
+    if args.profile:
+        from .worker.metrics import RunMetrics
+        metrics = RunMetrics(trace_memory=args.trace_memory, cprofile_stage=args.cprofile)
+        metrics.info.update(input=path, backend=args.backend, pipeline=args.pipeline, chunk_size=args.chunk_size)
+    journal = None
+    if args.journal is not None:
+        journal = args.journal or f"{path}.journal"
+    gw = GlycomodWorker(cfg, peaks=peaks, filename=args.filename or "", metrics=metrics, journal=journal, **worker_kwargs)
+    logger.debug(f"Running GlycomodWorker\nParams: {args}")
+    try:
         gw.run()
-        if args.echo:
-            gw.output_text(to_std_out=True)
-        # check if config was modified - run some sort of checksum
-            # check if stored checksum == calculated checksum
-        logger.debug("SEARCH FINISHED SUCCESSFULLY")
-    else:
-        raise EnvironmentError("Unable to connect to Glycomod. No internet connection.")
+    finally:
+        if metrics is not None:
+            metrics.save(args.profile)
+            metrics.close()
+    if args.echo:
+        gw.output_text(to_std_out=True)
+    logger.debug("SEARCH FINISHED SUCCESSFULLY")
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
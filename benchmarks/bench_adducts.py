@@ -0,0 +1,58 @@
+"""Compares calc_default_adducts_mono called per composition with calc_adducts_mono_batch.
+
+    curdir:$ python -m benchmarks.bench_adducts --count 100000
+"""
+import os
+import json
+import time
+import random
+import argparse
+
+from worker.utils import string_to_dict
+from worker.utils import calc_default_adducts_mono
+from worker.utils import calc_adducts_mono_batch
+
+CFG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "worker", "config.json")
+RESIDUES = ["Hex", "HexNAc", "Deoxyhexose", "NeuAc", "NeuGc", "KDN", "Pent", "Phos", "Sulph", "HexA"]
+
+
+def random_compositions(count, seed=0):
+    """Random long notation compositions, half of them with '+ (Man)3(GlcNAc)2' core"""
+    rng = random.Random(seed)
+    compositions = []
+    for i in range(count):
+        residues = sorted(rng.sample(RESIDUES, rng.randint(1, 6)), key=RESIDUES.index)
+        comp = " ".join(f"({name}){rng.randint(1, 12)}" for name in residues)
+        compositions.append(comp + " + (Man)3(GlcNAc)2" if i % 2 else comp)
+    return compositions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark adduct mass calculation")
+    parser.add_argument("--count", type=int, default=100000, help="Number of compositions")
+    parser.add_argument("--tag", type=str, default="ProA", help="Reducing end tag")
+    args = parser.parse_args()
+    with open(CFG_PATH, "r") as f:
+        cfg = json.load(f)
+    dictionaries = [string_to_dict(i) for i in random_compositions(args.count)]
+
+    start = time.perf_counter()
+    expected = [calc_default_adducts_mono(i, cfg, reducing_end=args.tag) for i in dictionaries]
+    per_composition = time.perf_counter() - start
+
+    start = time.perf_counter()
+    names, adduct_ions = calc_adducts_mono_batch(dictionaries, cfg, reducing_end=args.tag)
+    batch = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for row, values in enumerate(adduct_ions.tolist())
+        if dict(zip(names, values)) != expected[row]
+    )
+    print(f"compositions:    {args.count}")
+    print(f"per composition: {per_composition:.3f} s")
+    print(f"batch:           {batch:.3f} s ({per_composition / batch:.1f}x)")
+    print(f"mismatches:      {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
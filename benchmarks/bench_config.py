@@ -0,0 +1,93 @@
+"""Per-hit cost of mass helpers reading nested config dicts (as before MassConfig), called with config dict
+and with compiled MassConfig.
+
+    curdir:$ python -m benchmarks.bench_config --count 100000
+"""
+import os
+import json
+import time
+import argparse
+
+from worker.utils import string_to_dict
+from worker.utils import calc_theor_mono_mass, calc_default_adducts_mono, calc_adducts_batch
+from worker.mass_config import compile_config
+from .bench_adducts import random_compositions
+
+CFG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "worker", "config.json")
+
+
+def dict_theor_mono_mass(dictionary, cfg, prec=6, reducing_end=None):
+    """calc_theor_mono_mass before MassConfig, tag is validated and masses looked up in cfg on every call"""
+    reducing_end_tag_mass = 0.0
+    if reducing_end is not None:
+        if reducing_end in cfg["reducing_end_tag_mono"].keys():
+            reducing_end_tag_mass = cfg["reducing_end_tag_mono"][reducing_end]
+        else:
+            raise ValueError(f"Invalid reducing end tag: {reducing_end}")
+    return round(
+        sum([dictionary[key]*cfg["mono_masses_underivatized"][key] for key in dictionary.keys()])
+        + cfg["mono_masses_underivatized"]["H3O+"] + reducing_end_tag_mass,
+        prec
+    )
+
+
+def dict_default_adducts_mono(dictionary, cfg, prec=4, reducing_end=None):
+    """calc_default_adducts_mono before MassConfig, composition is summed again for every adduct"""
+    reducing_end_tag_mass = 0.0
+    if reducing_end is not None:
+        if reducing_end in cfg["reducing_end_tag_mono"].keys():
+            reducing_end_tag_mass = cfg["reducing_end_tag_mono"][reducing_end]
+        else:
+            raise ValueError(f"Invalid reducing end tag: {reducing_end}")
+    return {
+        name: round(
+            (sum([dictionary[key]*cfg["mono_masses_underivatized"][key] for key in dictionary.keys()])
+             + cfg["mono_masses_underivatized"]["H2O"] + reducing_end_tag_mass + mass) / charge,
+            prec
+        )
+        for name, (mass, charge) in cfg["adducts"].items()
+    }
+
+
+def timed(function, dictionaries, cfg, tag):
+    start = time.perf_counter()
+    results = [function(i, cfg, reducing_end=tag) for i in dictionaries]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mass helpers with config dict and compiled MassConfig")
+    parser.add_argument("--count", type=int, default=100000, help="Number of compositions (hits)")
+    parser.add_argument("--tag", type=str, default="ProA", help="Reducing end tag")
+    args = parser.parse_args()
+    with open(CFG_PATH, "r") as f:
+        cfg = json.load(f)
+    dictionaries = [string_to_dict(i) for i in random_compositions(args.count)]
+
+    start = time.perf_counter()
+    mass_config = compile_config(cfg)
+    compile_time = time.perf_counter() - start
+    print(f"compositions:         {args.count}")
+    print(f"compile config:       {compile_time * 1e6:.1f} us (once)")
+    for name, reference, helper in (
+        ("calc_theor_mono_mass", dict_theor_mono_mass, calc_theor_mono_mass),
+        ("calc_default_adducts", dict_default_adducts_mono, calc_default_adducts_mono),
+    ):
+        dict_time, expected = timed(reference, dictionaries, cfg, args.tag)
+        helper_dict_time, dict_results = timed(helper, dictionaries, cfg, args.tag)
+        compiled_time, results = timed(helper, dictionaries, mass_config, args.tag)
+        mismatches = sum(1 for i, j, k in zip(expected, dict_results, results) if i != j or i != k)
+        print(f"{name}:")
+        print(f"  config dict:        {dict_time / args.count * 1e6:.2f} us/hit")
+        print(f"  helper, dict:       {helper_dict_time / args.count * 1e6:.2f} us/hit ({dict_time / helper_dict_time:.1f}x)")
+        print(f"  MassConfig:         {compiled_time / args.count * 1e6:.2f} us/hit ({dict_time / compiled_time:.1f}x)")
+        print(f"  mismatches:         {mismatches}")
+
+    start = time.perf_counter()
+    names, adduct_ions = calc_adducts_batch(dictionaries, mass_config, reducing_end=args.tag)
+    batch_time = time.perf_counter() - start
+    print(f"calc_adducts_batch:   {batch_time / args.count * 1e6:.2f} us/hit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Times GlycomodWorker stages on synthetic Glycomod pages (see benchmarks.glycomod_html).
+
+Results are saved as JSON, so runs on different commits can be compared:
+
+    curdir:$ python -m benchmarks.bench_stages --sizes 10,1000,10000,100000 --output before.json
+    curdir:$ python -m benchmarks.bench_stages --sizes 10,1000,10000,100000 --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+from worker.worker import GlycomodWorker
+from benchmarks.glycomod_html import generate_page
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CFG_PATH = os.path.join(REPO_DIR, "worker", "config.json")
+STAGES = ("_parse_gm_html", "_create_glycan_objects", "_prettify_text", "output_csv")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, check=True
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def best_of(repeat, function) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_size(cfg, count, repeat, tag, html_parser, tmp_dir) -> dict:
+    html = generate_page(count, seed=count, tag=tag)
+    worker = GlycomodWorker(cfg, reducing_end=tag, html_parser=html_parser, filename=os.path.join(tmp_dir, f"bench_{count}"))
+    worker.html = html
+    result = {"masses": count, "page_bytes": len(html.encode("utf-8"))}
+    result["_parse_gm_html"] = best_of(repeat, worker._parse_gm_html)
+    result["_create_glycan_objects"] = best_of(repeat, worker._create_glycan_objects)
+    result["hits"] = worker.results.n_hits
+    result["_prettify_text"] = best_of(repeat, worker._prettify_text)
+    result["output_csv"] = best_of(repeat, worker.output_csv)
+    return result
+
+
+def compare(results, previous):
+    print(f"\ncompared to {previous['commit']} ({previous['date']}), new/old time:")
+    for size, stages in results["sizes"].items():
+        old = previous["sizes"].get(size)
+        if old is None:
+            continue
+        ratios = "  ".join(f"{stage}: {stages[stage] / old[stage]:.2f}" for stage in STAGES if old.get(stage))
+        print(f"{size:>7}  {ratios}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GlycomodWorker stages on synthetic Glycomod pages")
+    parser.add_argument("--sizes", type=str, default="10,1000,10000,100000", help="Comma separated numbers of masses")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of every stage, best time is reported")
+    parser.add_argument("--tag", type=str, default="ProA", help="Reducing end tag, 'none' for free reducing end")
+    parser.add_argument("--html-parser", type=str, choices=["lxml", "reference"], default="lxml")
+    parser.add_argument("--output", type=str, help="JSON results file, bench_stages_<commit>.json by default")
+    parser.add_argument("--compare", type=str, help="Previous JSON results file to compare with")
+    args = parser.parse_args()
+    with open(CFG_PATH, "r") as f:
+        cfg = json.load(f)
+    tag = None if args.tag.lower() == "none" else args.tag
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "html_parser": args.html_parser,
+        "tag": tag,
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    print(f"{'masses':>7} {'hits':>8} " + " ".join(f"{stage:>23}" for stage in STAGES))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in (int(i) for i in args.sizes.split(",")):
+            result = bench_size(cfg, count, args.repeat, tag, args.html_parser, tmp_dir)
+            results["sizes"][str(count)] = result
+            print(f"{count:>7} {result['hits']:>8} " + " ".join(f"{result[stage]:>21.4f} s" for stage in STAGES))
+    output = args.output or f"bench_stages_{commit}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"saved: {output}")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
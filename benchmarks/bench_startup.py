@@ -0,0 +1,53 @@
+"""Measures CLI startup: 'python -m GlycomodWorker --help' and import of worker.worker in fresh interpreters.
+
+    curdir:$ python -m benchmarks.bench_startup --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# modules needed only by some backends or outputs, loaded when they are used
+LAZY_MODULES = ("pandas", "selenium", "bs4", "arrow", "urllib3", "lxml", "html5lib", "asyncio")
+LOADED_MODULES = (
+    "import sys, worker.worker; "
+    f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+)
+
+
+def timed_run(args, cwd, repeat) -> list:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def loaded_lazy_modules() -> list:
+    """Lazy modules loaded by 'import worker.worker'"""
+    output = subprocess.run(
+        [sys.executable, "-c", LOADED_MODULES], cwd=REPO_DIR, stdout=subprocess.PIPE, check=True
+    ).stdout.decode().strip()
+    return [i for i in output.split(",") if i]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs of every command")
+    args = parser.parse_args()
+    package = os.path.basename(REPO_DIR)
+    cli = timed_run([sys.executable, "-m", package, "--help"], os.path.dirname(REPO_DIR), args.repeat)
+    interpreter = timed_run([sys.executable, "-c", "pass"], REPO_DIR, args.repeat)
+    worker = timed_run([sys.executable, "-c", "import worker.worker"], REPO_DIR, args.repeat)
+    print(f"python -c pass:      {statistics.median(interpreter):.3f} s")
+    print(f"{package} --help:     {statistics.median(cli):.3f} s")
+    print(f"import worker.worker: {statistics.median(worker):.3f} s")
+    print(f"lazy modules loaded: {loaded_lazy_modules() or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
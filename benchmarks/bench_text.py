@@ -0,0 +1,96 @@
+"""Times text report of --txt and --echo paths: whole report joined in memory (as before) and
+streamed mass by mass with writers.write_text_report. Peak memory is traced with tracemalloc.
+
+    curdir:$ python -m benchmarks.bench_text --count 100000
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+from worker.worker import GlycomodWorker
+from worker.result_store import NOT_FOUND
+from benchmarks.glycomod_html import generate_page
+
+CFG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "worker", "config.json")
+
+
+def joined_report(results) -> str:
+    """Report built in memory with '\\n\\n'.join(), as _prettify_text did before streaming"""
+    theoretical_MH = results.theoretical_MH.tolist()
+    delta = results.delta.tolist()
+    composition = results.composition.tolist()
+    comp_strs = ["".join(long_notation.split()) for long_notation, _ in results.composition_table]
+    blocks = []
+    for index in range(len(results)):
+        lines = [f"User mass: {results.user_mass[index]}", *results.header_lines(index)]
+        counter = 0
+        for row in results.hits(index):
+            if results.composition_table[composition[row]] == NOT_FOUND:
+                continue
+            counter += 1
+            lines.append(
+                f"\t{counter}. [MH]+: {theoretical_MH[row]:>9},  Error: {delta[row]:>6}, Comp: {comp_strs[composition[row]]}"
+            )
+        lines.append(f"{counter} structure{'' if counter == 1 else 's'} found.")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def measured(function) -> tuple:
+    """(seconds, peak traced MB) of function, memory is traced in a separate call as tracing slows it down"""
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text report of --txt and --echo")
+    parser.add_argument("--count", type=int, default=100000, help="Number of masses")
+    args = parser.parse_args()
+    with open(CFG_PATH, "r") as f:
+        cfg = json.load(f)
+    tmp_dir = tempfile.mkdtemp()
+    worker = GlycomodWorker(cfg, filename=os.path.join(tmp_dir, "bench_text"))
+    worker.html = generate_page(args.count, seed=args.count)
+    worker._parse_gm_html()
+    worker._create_glycan_objects()
+    # results are only read, so the report is the same every time
+    assert joined_report(worker.results) == worker._prettify_text() == worker._prettify_text()
+
+    def joined_txt():
+        with open(os.path.join(tmp_dir, "joined.txt"), "w") as outfile:
+            outfile.write(joined_report(worker.results))
+
+    def joined_echo():
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            print(joined_report(worker.results))
+
+    def streamed_echo():
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            worker.output_text(to_std_out=True)
+
+    print(f"masses: {args.count}, hits: {worker.results.n_hits}")
+    for path, joined, streamed in (
+        ("--txt", joined_txt, lambda: worker.output_text()),
+        ("--echo", joined_echo, streamed_echo),
+    ):
+        joined_time, joined_peak = measured(joined)
+        streamed_time, streamed_peak = measured(streamed)
+        print(f"{path}:")
+        print(f"  joined:   {joined_time:.3f} s, peak {joined_peak:.1f} MB")
+        print(f"  streamed: {streamed_time:.3f} s, peak {streamed_peak:.1f} MB")
+    with open(os.path.join(tmp_dir, "joined.txt")) as joined, open(worker.filename + ".txt") as streamed:
+        print(f"same output: {joined.read() == streamed.read()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Generates synthetic Glycomod result pages for benchmarks.
+
+Page head, tail and separators between result blocks are taken from tests/test_html/minimal_test.html,
+result blocks are generated with random compositions. Every page contains:
+    masses without match ('0 structures found.')
+    masses with one or more matches ('3 structures found.')
+    negative and positive deltas
+    core notation ('(Hex)2  + (Man)3(GlcNAc)2'), type column (high_man, hybrid/complex) and UniCarbKB links
+
+    ### EXAMPLE ###
+    >>>html = generate_page(1000, seed=0, tag="ProA")
+"""
+import os
+import re
+import random
+
+from worker.local_search import format_gm_number
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(REPO_DIR, "tests", "test_html", "minimal_test.html")
+RESULT_BLOCK = re.compile(r'<hr><h3>User mass: (\S+).*?found\.\n<br>', re.DOTALL)
+
+RESIDUE_MASSES = {
+    "Hex": 162.0528, "HexNAc": 203.0794, "Deoxyhexose": 146.0579, "NeuAc": 291.0954,
+    "NeuGc": 307.0903, "Pent": 132.0423, "Sulph": 79.9568, "Phos": 79.9663,
+}
+CORE_MASS = 3*162.0528 + 2*203.0794
+ADDUCT = 1.00727
+DERIVATIVES = {None: ("Free reducing end", 18.0105546), "ProA": ("ProA", 237.36764), "2-AB": ("2-AB", 138.23326)}
+# share of masses without match and number of structures found for the rest
+NOT_FOUND_SHARE = 0.15
+MAX_MATCHES = 6
+
+HEADER = """<hr><h3>User mass: {mass}
+<br>Adduct ([M+H]<sup>+</sup>): {adduct}<br>
+Derivative mass ({derivative}): {derivative_mass}<br>
+</h3>
+<table class="glycomod2"></table><p>
+"""
+TABLE_HEAD = """</p><table class="glycomod2" width="100%" border="3"><tbody><tr bgcolor=""><th valign="middle">glycoform mass</th>
+<th valign="middle">Δmass (Dalton)</th>
+<th valign="middle">structure</th>
+<th valign="middle">type</th>
+<th valign="middle">Links</th>
+</tr>
+"""
+ROW = ('<tr><td align="center">{mass}</td><td align="center">{delta}</td><td>{structure}</td>'
+       '<td align="center">{type}</td><td>{link}</td></tr>\n')
+LINK = '<a href="http://unicarbkb.org/compositions?glycanType=N-Linked&amp;comp_Hex=5;">UniCarbKB</a>  '
+
+
+def page_template():
+    """Returns (head, separator, tail) of Glycomod result page"""
+    with open(TEMPLATE_PATH, "r") as f:
+        html = f.read()
+    blocks = list(RESULT_BLOCK.finditer(html))
+    return html[:blocks[0].start()], html[blocks[0].end():blocks[1].start()], html[blocks[-1].end():]
+
+
+def random_structure(rng):
+    """Returns (glycoform mass, structure html, type) of random composition"""
+    if rng.random() < 0.3:
+        # composition reported on top of N-glycan core
+        count = rng.randint(1, 6)
+        return (
+            CORE_MASS + count*RESIDUE_MASSES["Hex"],
+            f"(Hex)<sub>{count}</sub>  + (Man)<sub>3</sub>(GlcNAc)<sub>2</sub>",
+            rng.choice(["high_man", "hybrid/complex"])
+        )
+    names = sorted(rng.sample(list(RESIDUE_MASSES), rng.randint(1, 5)), key=list(RESIDUE_MASSES).index)
+    counts = [rng.randint(1, 8) for _ in names]
+    mass = sum(RESIDUE_MASSES[name]*count for name, count in zip(names, counts))
+    structure = "".join(f"({name})<sub>{count}</sub> " for name, count in zip(names, counts))
+    return mass, structure, "-"
+
+
+def random_block(rng, tag=None):
+    derivative, derivative_mass = DERIVATIVES[tag]
+    structures = [] if rng.random() < NOT_FOUND_SHARE else [random_structure(rng) for _ in range(rng.randint(1, MAX_MATCHES))]
+    first_mass = structures[0][0] if structures else rng.uniform(700, 4000)
+    user_mass = round(first_mass + derivative_mass + ADDUCT + rng.uniform(-0.4, 0.4), 2)
+    # other matches are placed within tolerance, their structures are not recalculated
+    structures[1:] = [(first_mass + rng.uniform(-0.1, 0.1), structure, glycan_type) for _, structure, glycan_type in structures[1:]]
+    block = HEADER.format(mass=f"{user_mass:.2f}", adduct=ADDUCT, derivative=derivative, derivative_mass=derivative_mass)
+    if structures:
+        rows = []
+        for mass, structure, glycan_type in structures:
+            delta = user_mass - (mass + derivative_mass + ADDUCT)
+            rows.append(ROW.format(
+                mass=format_gm_number(mass), delta=format_gm_number(delta), structure=structure,
+                type=glycan_type, link=LINK if rng.random() < 0.3 else ""
+            ))
+        block += TABLE_HEAD + "".join(rows) + "</tbody></table><p>\n"
+    found = len(structures)
+    return block + f"{found} structure{'' if found == 1 else 's'} found.\n<br>"
+
+
+def generate_page(count, seed=0, tag=None) -> str:
+    """Glycomod result page with count result blocks"""
+    rng = random.Random(seed)
+    head, separator, tail = page_template()
+    return head + separator.join(random_block(rng, tag) for _ in range(count)) + tail
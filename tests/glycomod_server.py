@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+HTML_DIR = os.path.join(THIS_DIR, 'test_html')
+FIXTURES = (
+    'minimal_test.html',
+    'minimal_test_2.html',
+    'minimal_test_w_multi_matched.html',
+    'minimal_test_w_not_found.html',
+)
+RESULT_BLOCK = re.compile(r'<hr><h3>User mass: (\S+).*?found\.\n<br>', re.DOTALL)
+MONOSACCHARIDES = ("Hex", "HexNAc", "Deoxyhexose", "NeuAc", "NeuGc", "Pent", "Sulph", "Phos", "KDN", "HexA")
+
+FORM_HTML = """<html><head><title>ExPASy - GlycoMod tool</title></head><body>
+<form action="/cgi-bin/glycomod/glycomod.pl" method="POST">
+<input type="text" name="Tolerance" value="0.2">
+<textarea name="Masses"></textarea>
+<input type="hidden" name="mode" value="compositions">
+<select name="Nform">
+<option value="0">Free / PNGase released oligosaccharides</option>
+<option value="3">Derivatised oligosaccharides</option>
+</select>
+<select name="massvalues">
+<option value="monoisotopic" selected>monoisotopic</option>
+<option value="average">average</option>
+</select>
+<input type="text" name="derivative_name" value="">
+<input type="text" name="derivative_mass" value="">
+%s
+<input type="submit" name="submit" value="Start GlycoMod">
+</form></body></html>""" % "\n".join(
+    f'<select name="{i}pres"><option value="y">yes</option><option value="p" selected>possible</option>'
+    f'<option value="n">no</option></select><input type="text" name="{i}nb1" value="">'
+    for i in MONOSACCHARIDES
+)
+
+
+class StandInGlycomod:
+    """Local stand-in for Glycomod serving results from HTML files in tests/test_html/.
+
+    GET returns Glycomod form, POST returns result page containing fixture result blocks
+    for every submitted mass, in submitted order. Masses not present in fixtures get
+    '0 structures found.' block.
+    """
+    def __init__(self, fixtures=FIXTURES, fail_first=0):
+        self.blocks = {}
+        self.submissions = []
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        for fixture in fixtures:
+            with open(os.path.join(HTML_DIR, fixture), "r") as f:
+                html = f.read()
+            matches = list(RESULT_BLOCK.finditer(html))
+            if len(matches) > 1 and not hasattr(self, "separator"):
+                self.head = html[:matches[0].start()]
+                self.separator = html[matches[0].end():matches[1].start()]
+                self.tail = html[matches[-1].end():]
+            for match in matches:
+                self.blocks.setdefault(match.group(1), match.group(0))
+        # not found template, from minimal_test_w_not_found.html
+        self.not_found = self.blocks["1452.01"]
+
+    def render(self, masses) -> str:
+        blocks = []
+        for mass in masses:
+            block = self.blocks.get(mass)
+            if block is None:
+                block = self.not_found.replace("User mass: 1452.01", f"User mass: {mass}")
+            blocks.append(block)
+        return self.head + self.separator.join(blocks) + self.tail
+
+    def start(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, status, body):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond(200, FORM_HTML)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                fields = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True).items()}
+                with stand_in.lock:
+                    stand_in.submissions.append(fields)
+                    failing = stand_in.fail_first > 0
+                    stand_in.fail_first -= 1
+                if failing:
+                    self._respond(500, "Internal Server Error")
+                else:
+                    self._respond(200, stand_in.render(fields["Masses"].split()))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/glycomod/"
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
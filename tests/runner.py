@@ -1,6 +1,25 @@
 import unittest
 from . import test_utils
 from . import test_worker
+from . import test_local_search
+from . import test_mass_index
+from . import test_http_client
+from . import test_cache
+from . import test_gm_parser
+from . import test_result_store
+from . import test_writers
+from . import test_batch
+from . import test_pipeline
+from . import test_startup
+from . import test_metrics
+from . import test_daemon
+from . import test_peaklist
+from . import test_dedup
+from . import test_journal
+from . import test_tolerance
+from . import test_mass_config
+from . import test_compositions
+from . import test_spectra
 
 # initialize the test suite
 loader = unittest.TestLoader()
@@ -9,6 +28,25 @@ suite  = unittest.TestSuite()
 # add tests to the test suite
 suite.addTests(loader.loadTestsFromModule(test_utils))
 suite.addTests(loader.loadTestsFromModule(test_worker))
+suite.addTests(loader.loadTestsFromModule(test_local_search))
+suite.addTests(loader.loadTestsFromModule(test_mass_index))
+suite.addTests(loader.loadTestsFromModule(test_http_client))
+suite.addTests(loader.loadTestsFromModule(test_cache))
+suite.addTests(loader.loadTestsFromModule(test_gm_parser))
+suite.addTests(loader.loadTestsFromModule(test_result_store))
+suite.addTests(loader.loadTestsFromModule(test_writers))
+suite.addTests(loader.loadTestsFromModule(test_batch))
+suite.addTests(loader.loadTestsFromModule(test_pipeline))
+suite.addTests(loader.loadTestsFromModule(test_startup))
+suite.addTests(loader.loadTestsFromModule(test_metrics))
+suite.addTests(loader.loadTestsFromModule(test_daemon))
+suite.addTests(loader.loadTestsFromModule(test_peaklist))
+suite.addTests(loader.loadTestsFromModule(test_dedup))
+suite.addTests(loader.loadTestsFromModule(test_journal))
+suite.addTests(loader.loadTestsFromModule(test_tolerance))
+suite.addTests(loader.loadTestsFromModule(test_mass_config))
+suite.addTests(loader.loadTestsFromModule(test_compositions))
+suite.addTests(loader.loadTestsFromModule(test_spectra))
 
 # initialize a runner, pass it your suite and run it
 runner = unittest.TextTestRunner(verbosity=3)
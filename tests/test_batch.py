@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from worker.batch import collect_inputs, output_name, output_names, run_batch
+from .test_worker import prepare_cfg
+
+COL_NAMES = [f"col_{i}" for i in range(15)]
+INPUTS = {
+    "sample_1.txt": "911.30\n1057.33\n",
+    "sample_2.txt": "911.30\n1452.01\n",
+    "sample_3.txt": "911.30\nabc\n",
+}
+
+
+class TestBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestBatch, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+        cls.cfg["col_names"] = COL_NAMES
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp_dir.name, "study")
+        self.output_dir = os.path.join(self.tmp_dir.name, "results")
+        os.makedirs(self.input_dir)
+        for name, masses in INPUTS.items():
+            with open(os.path.join(self.input_dir, name), "w") as f:
+                f.write(masses)
+        with open(os.path.join(self.input_dir, "notes.md"), "w") as f:
+            f.write("not an input")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_collect_inputs(self):
+        expected = [os.path.join(self.input_dir, i) for i in sorted(INPUTS)]
+        self.assertEqual(collect_inputs(self.input_dir), expected)
+        self.assertEqual(collect_inputs(os.path.join(self.input_dir, "sample_[12].txt")), expected[:2])
+        with self.assertRaises(FileNotFoundError):
+            collect_inputs(os.path.join(self.input_dir, "*.csv"))
+
+    def test_run_batch(self):
+        inputs = collect_inputs(self.input_dir)
+        summary = run_batch(self.cfg, inputs, output_dir=self.output_dir, processes=2, backend="local")
+        self.assertEqual(summary["input"].tolist(), inputs)
+        self.assertEqual(summary["masses"].tolist()[:2], [2, 2])
+        self.assertEqual(summary["matched"].tolist()[:2], [2, 1])
+        # invalid input is reported, other files are searched
+        self.assertEqual(summary["error"].tolist()[:2], ["", ""])
+        self.assertIn("invalid masses on line 2", summary["error"].tolist()[2])
+        self.assertFalse(os.path.exists(output_name(inputs[2], self.output_dir) + ".csv"))
+        results = pd.read_csv(output_name(inputs[1], self.output_dir) + ".csv")
+        self.assertEqual(results["col_0"].tolist(), [911.30, 1452.01])
+        self.assertEqual(results["col_3"].tolist()[1], "NOT FOUND")
+        saved = pd.read_csv(os.path.join(self.output_dir, "batch_summary.csv"), keep_default_na=False)
+        self.assertEqual(saved["input"].tolist(), inputs)
+
+    def test_single_process(self):
+        inputs = collect_inputs(os.path.join(self.input_dir, "sample_[12].txt"))
+        summary = run_batch(self.cfg, inputs, output_dir=self.output_dir, processes=1, backend="local")
+        self.assertEqual(summary["structures"].tolist(), [2, 1])
+
+    def test_output_names(self):
+        with open(os.path.join(self.input_dir, "sample_1.mgf"), "w") as f:
+            f.write("BEGIN IONS\n911.30 100\nEND IONS\n")
+        inputs = collect_inputs(self.input_dir)
+        names = [os.path.basename(i) for i in output_names(inputs, self.output_dir)]
+        # raw and exported peak list of one run get results of their own
+        self.assertEqual(names, ["sample_1.mgf_results", "sample_1.txt_results", "sample_2_results", "sample_3_results"])
+        summary = run_batch(self.cfg, inputs[:2], output_dir=self.output_dir, processes=1, backend="local")
+        self.assertEqual(summary["error"].tolist(), ["", ""])
+        self.assertEqual(len(set(summary["output"])), 2)
+        # same file name in two directories
+        other = os.path.join(self.tmp_dir.name, "other")
+        os.makedirs(other)
+        with open(os.path.join(other, "sample_2.txt"), "w") as f:
+            f.write("911.30\n")
+        with self.assertRaises(ValueError):
+            run_batch(self.cfg, collect_inputs(os.path.join(self.tmp_dir.name, "*", "sample_2.txt")),
+                      output_dir=self.output_dir, backend="local")
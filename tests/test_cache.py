@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from worker.cache import ResultCache, cache_path_from_cfg
+from worker.worker import GlycomodWorker as GW
+from .glycomod_server import StandInGlycomod
+from .test_worker import prepare_cfg
+
+SETTINGS = {"Tolerance": "0.5", "reducing_end_tag": None, "derivative_mass": 0.0}
+LINES = [
+    'User mass: 911.30',
+    'Adduct ([M+H]+): 1.00727',
+    'Derivative mass (Free reducing end): 18.0105546',
+    '892.317-0.034(Hex)3 (HexNAc)2  ',
+    '1 structure'
+]
+
+
+class TestResultCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestResultCache, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_put(self):
+        cache = ResultCache(self.cache_path)
+        self.assertEqual(cache.get_many(["911.30"], SETTINGS), {})
+        cache.put_many({"911.30": LINES}, SETTINGS)
+        # mass is rounded, user mass line follows requested mass
+        self.assertEqual(cache.get_many(["911.3"], SETTINGS), {"911.3": ["User mass: 911.3"] + LINES[1:]})
+        self.assertEqual(cache.get_many(["911.30"], dict(SETTINGS, reducing_end_tag="ProA")), {})
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.close()
+        # cache is persistent
+        self.assertEqual(len(ResultCache(self.cache_path)), 1)
+
+    def test_eviction(self):
+        cache = ResultCache(self.cache_path, max_entries=2)
+        cache.put_many({"911.30": LINES}, SETTINGS)
+        cache.put_many({"1057.33": LINES}, SETTINGS)
+        cache.get_many(["911.30"], SETTINGS)
+        cache.put_many({"1454.0": LINES}, SETTINGS)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(set(cache.get_many(["911.30", "1057.33", "1454.0"], SETTINGS)), {"911.30", "1454.0"})
+
+    def test_worker_cache(self):
+        server = StandInGlycomod().start()
+        try:
+            cfg = dict(TestResultCache.cfg, glycomod_link=server.url, cache={"path": self.cache_path})
+            worker = GW(cfg=cfg, text_input="911.30\n1057.33", backend="http", use_cache=True)
+            worker._search_cached()
+            worker = GW(cfg=cfg, text_input="1454.0\n911.30\n1057.33\n911.30", backend="http", use_cache=True)
+            worker._search_cached()
+            self.assertEqual([i["Masses"] for i in server.submissions], ["911.30\n1057.33", "1454.0"])
+            self.assertEqual((worker.cache.hits, worker.cache.misses), (3, 1))
+            self.assertEqual(
+                [i[0] for i in worker.parsed_data],
+                ["User mass: 1454.0", "User mass: 911.30", "User mass: 1057.33", "User mass: 911.30"]
+            )
+            worker._create_glycan_objects()
+            self.assertEqual(
+                [i.glycomod_structures[0].short_notation for i in worker.compositions],
+                ["H3N2F1P3", "H3N2", "H3N2F1", "H3N2"]
+            )
+        finally:
+            server.stop()
+
+    def test_mass_changes(self):
+        cfg = dict(TestResultCache.cfg, cache={"path": self.cache_path})
+        worker = GW(cfg=cfg, text_input="911.30\n1057.33", backend="local", use_cache=True)
+        worker._search_cached()
+        # results of edited residue masses are searched again, not taken from cache
+        masses = dict(cfg["mono_masses_underivatized"])
+        masses["(Hex)"] += 5
+        edited = dict(cfg, mono_masses_underivatized=masses)
+        worker = GW(cfg=edited, text_input="911.30\n1057.33", backend="local", use_cache=True)
+        worker._search_cached()
+        self.assertEqual((worker.cache.hits, worker.cache.misses), (0, 2))
+        uncached = GW(cfg=edited, text_input="911.30\n1057.33", backend="local")
+        uncached._search_local()
+        self.assertEqual(worker.parsed_data, uncached.parsed_data)
+
+    def test_default_path(self):
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.tmp_dir.name}):
+            path = cache_path_from_cfg({"cache": {"path": "null"}})
+        if os.name != "nt":
+            self.assertEqual(path, os.path.join(self.tmp_dir.name, "GlycomodWorker", "results_cache.sqlite"))
+        self.assertNotIn(os.path.join("worker", "results_cache.sqlite"), path)
@@ -0,0 +1,48 @@
+import os
+import json
+import unittest
+
+from worker import utils
+from worker.compositions import parse_composition, composition_cache_info, clear_composition_cache
+from worker.worker import GlycomodWorker as GW
+from .test_worker import prepare_cfg
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestCompositions(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestCompositions, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def test_parse_composition(self):
+        with open(os.path.join(THIS_DIR, "test_strings.json"), "r") as f:
+            strings = json.load(f)["strings"]
+        for string in strings:
+            parsed = parse_composition(string)
+            dictionary = utils.string_to_dict(string)
+            self.assertEqual(dict(parsed.dictionary), dictionary)
+            self.assertEqual(parsed.short_notation, utils.truncated_str_from_dict(dictionary))
+            self.assertEqual(dict(zip(parsed.residues, parsed.counts)), dictionary)
+            self.assertEqual(parsed.notation, (string, parsed.short_notation))
+        # same string built separately gets the same shared object
+        self.assertIs(parse_composition("(Hex)3 " + "(HexNAc)2"), parse_composition("(Hex)3 (HexNAc)2"))
+        with self.assertRaises(TypeError):
+            parse_composition("(Hex)3 (HexNAc)2").dictionary["(Hex)"] = 4
+        with self.assertRaises(ValueError):
+            parse_composition("(Hex)3 + (Man)2")
+
+    def test_cache_info(self):
+        clear_composition_cache()
+        text_input = "911.30\n1057.33\n1452.01"
+        GW(cfg=TestCompositions.cfg, text_input=text_input, backend="local").search()
+        info = composition_cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["currsize"]), (0, 2, 2))
+        # another sample with the same compositions parses nothing again
+        worker = GW(cfg=TestCompositions.cfg, text_input=text_input, backend="local")
+        results = worker.search()
+        info = composition_cache_info()
+        self.assertEqual((info["hits"], info["misses"]), (2, 2))
+        self.assertIs(results.composition_table[1][0], parse_composition("(Hex)3 (HexNAc)2").long_notation)
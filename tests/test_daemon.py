@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from worker.worker import GlycomodWorker as GW
+from worker.daemon import WorkerPool, make_server, _remove_own_socket, query, daemon_status, merge_config, parse_address
+from .glycomod_server import StandInGlycomod
+from .test_worker import prepare_cfg
+
+COL_NAMES = [f"col_{i}" for i in range(15)]
+MASSES = ["911.30", "1057.33", "1452.01"]
+
+
+class TestDaemon(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestDaemon, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+        cls.cfg["col_names"] = COL_NAMES
+
+    def start(self, address, **worker_kwargs):
+        self.pool = WorkerPool(self.cfg, size=2, **worker_kwargs)
+        self.pool.start()
+        self.server = make_server(address, self.pool)
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+        if isinstance(self.server.server_address, tuple):
+            return f"127.0.0.1:{self.server.server_address[1]}"
+        return address
+
+    def tearDown(self):
+        if hasattr(self, "server"):
+            self.server.shutdown()
+            self.server.server_close()
+            self.pool.close()
+
+    def expected_csv(self, **kwargs):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            worker = GW(cfg=self.cfg, text_input="\n".join(MASSES), filename=os.path.join(tmp_dir, "results"), **kwargs)
+            worker.run()
+            with open(worker.filename + ".csv", "rb") as f:
+                return f.read()
+
+    def test_local_jobs(self):
+        address = self.start("127.0.0.1:0", backend="local")
+        self.assertEqual(query(address, MASSES, fmt="csv"), self.expected_csv(backend="local"))
+        self.assertEqual(query(address, MASSES, tag="ProA", fmt="csv"), self.expected_csv(backend="local", reducing_end="ProA"))
+        results = query(address, "\n".join(MASSES))
+        self.assertEqual(results["columns"], COL_NAMES)
+        self.assertEqual((results["masses"], results["hits"]), (3, 3))
+        self.assertEqual(results["data"]["col_3"][2], "NOT FOUND")
+        narrow = query(address, MASSES, config={"Tolerance": "0.01"})
+        self.assertEqual(narrow["data"]["col_3"], ["NOT FOUND"] * 3)
+        # default settings reuse warm workers, tag and tolerance got their own
+        status = daemon_status(address)
+        cache = status.pop("composition_cache")
+        self.assertEqual(status, {
+            "backend": "local", "size": 2, "jobs": 4, "workers_created": 4, "idle_workers": 4
+        })
+        # compositions parsed in earlier jobs are reused
+        self.assertGreater(cache["hits"], 0)
+
+    def test_errors(self):
+        address = self.start("127.0.0.1:0", backend="local")
+        with self.assertRaises(ValueError):
+            query(address, ["911.30", "abc"])
+        with self.assertRaises(ValueError):
+            query(address, MASSES, config={"col_names": []})
+        with self.assertRaises(ValueError):
+            query(address, MASSES, fmt="xlsx")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "Unix sockets are not available")
+    def test_unix_socket_http_backend(self):
+        stand_in = StandInGlycomod().start()
+        self.cfg = dict(TestDaemon.cfg, glycomod_link=stand_in.url)
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                address = self.start(f"unix:{os.path.join(tmp_dir, 'daemon.sock')}", backend="http")
+                expected = self.expected_csv(backend="http")
+                for _ in range(3):
+                    self.assertEqual(query(address, MASSES, fmt="csv"), expected)
+                # one submission for expected results and one per job, form was loaded when pool started
+                self.assertEqual(len(stand_in.submissions), 4)
+                self.assertEqual(daemon_status(address)["workers_created"], 2)
+        finally:
+            stand_in.stop()
+
+    @unittest.skipUnless(hasattr(os, "fork"), "Unix sockets are not available")
+    def test_unix_socket_path(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "daemon.sock")
+            # regular file is never replaced by socket
+            with open(path, "w") as f:
+                f.write("not a socket")
+            with self.assertRaises(FileExistsError):
+                make_server(f"unix:{path}", None)
+            with open(path) as f:
+                self.assertEqual(f.read(), "not a socket")
+            os.remove(path)
+            address = self.start(f"unix:{path}", backend="local")
+            # socket of running daemon is not taken over
+            with self.assertRaises(OSError):
+                make_server(address, None)
+            self.server.shutdown()
+            self.server.server_close()
+            # stale socket is replaced, and removed by the server that created it
+            server = make_server(address, None)
+            server.server_close()
+            _remove_own_socket(server)
+            self.assertFalse(os.path.exists(path))
+
+    def test_helpers(self):
+        self.assertEqual(parse_address("localhost:8765"), ("tcp", ("localhost", 8765)))
+        self.assertEqual(parse_address("unix:/tmp/gw.sock"), ("unix", "/tmp/gw.sock"))
+        with self.assertRaises(ValueError):
+            parse_address("8765")
+        merged = merge_config(self.cfg, {"Tolerance": "0.1", "default_mono": {"Hexpres": 1}})
+        self.assertEqual(merged["Tolerance"], "0.1")
+        self.assertEqual(merged["default_mono"], dict(self.cfg["default_mono"], Hexpres=1))
+        self.assertEqual(self.cfg["Tolerance"], "0.5")
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from worker.dedup import MassClusters
+from worker.worker import GlycomodWorker as GW
+from .test_worker import prepare_cfg
+
+
+class TestDedup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestDedup, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def test_clusters(self):
+        labels = ["1057.33", "911.30", "911.35", "911.30", "1452.01", "911.41", "911.50"]
+        clusters = MassClusters(np.array(labels, dtype=np.float64), labels, width=0.1)
+        # 911.30-911.35 and 911.41-911.52 would chain into one window wider than 0.1
+        self.assertEqual(clusters.query_labels, ["911.3250", "911.4550", "1057.33", "1452.01"])
+        self.assertEqual(clusters.cluster.tolist(), [2, 0, 0, 0, 3, 1, 1])
+        self.assertAlmostEqual(clusters.half_width, 0.045)
+        self.assertEqual(clusters.query_tolerance(0.5), "0.5450")
+        empty = MassClusters(np.empty(0), [], width=0.1)
+        self.assertEqual((len(empty), empty.query_tolerance(0.5)), (0, "0.5000"))
+
+    def test_search_deduplicated(self):
+        rng = np.random.RandomState(0)
+        masses = rng.uniform(900, 3000, 300)
+        # replicate picks and isotope-adjacent entries
+        masses = np.concatenate((masses, masses + rng.uniform(-0.05, 0.05, 300), masses[:100] + 1.003))
+        text_input = "\n".join(f"{i:.2f}" for i in masses)
+        for tag in (None, "ProA"):
+            expected = GW(cfg=TestDedup.cfg, text_input=text_input, backend="local", reducing_end=tag).search()
+            worker = GW(cfg=TestDedup.cfg, text_input=text_input, backend="local", reducing_end=tag, dedup=0.2)
+            results = worker.search()
+            self.assertLess(len(worker._clusters), 400)
+            self.assertEqual(results.user_mass, expected.user_mass)
+            self.assertEqual(hits(results), hits(expected))
+            # engine tolerance is restored after window search
+            self.assertEqual(worker.engine.tolerance, (0.5, 0.0))
+        with self.assertRaises(ValueError):
+            GW(cfg=TestDedup.cfg, dedup=1.5)
+
+
+def hits(results, tolerance=0.5):
+    """(composition, delta, [M+H]+, adduct ions) of every mass, hits within 0.001 Da of tolerance limit are left out
+    as Glycomod deltas have 3 decimals"""
+    return [
+        [
+            (results.composition_table[results.composition[i]], round(results.delta[i], 3),
+             results.theoretical_MH[i], tuple(results.adduct_ions[i]))
+            for i in range(start, end) if abs(results.delta[i]) < tolerance - 0.001 or results.composition[i] == 0
+        ]
+        for start, end in zip(results.hit_offsets[:-1], results.hit_offsets[1:])
+    ]
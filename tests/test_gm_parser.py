@@ -0,0 +1,51 @@
+import os
+import unittest
+from bs4 import BeautifulSoup
+
+from worker.gm_parser import parse_gm_soup, parse_gm_html
+from benchmarks.glycomod_html import generate_page
+from .glycomod_server import StandInGlycomod
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+HTML_DIR = os.path.join(THIS_DIR, 'test_html')
+
+
+class TestGlycomodParser(unittest.TestCase):
+
+    def assert_same_as_reference(self, html):
+        self.assertEqual(parse_gm_html(html), parse_gm_soup(BeautifulSoup(html, 'html5lib')))
+
+    def test_fixtures(self):
+        fixtures = sorted(i for i in os.listdir(HTML_DIR) if i.endswith(".html"))
+        self.assertEqual(len(fixtures), 4)
+        for fixture in fixtures:
+            with self.subTest(fixture=fixture):
+                with open(os.path.join(HTML_DIR, fixture), "r") as f:
+                    self.assert_same_as_reference(f.read())
+
+    def test_assembled_pages(self):
+        stand_in = StandInGlycomod()
+        for masses in (["1454.0"], ["1452.01"], ["1479.52", "1452.01", "1057.4", "1454.50", "911.30"]):
+            with self.subTest(masses=masses):
+                self.assert_same_as_reference(stand_in.render(masses))
+
+    def test_generated_pages(self):
+        for tag in (None, "ProA"):
+            with self.subTest(tag=tag):
+                html = generate_page(200, seed=1, tag=tag)
+                self.assert_same_as_reference(html)
+                parsed = parse_gm_html(html)
+                self.assertEqual(len(parsed), 200)
+                # not found, single and multiple matches, negative deltas
+                self.assertEqual({len(i) for i in parsed} & {4, 5, 6}, {4, 5, 6})
+                self.assertTrue(any(line.split("(")[0].find("-") > 0 for result in parsed for line in result[3:-1]))
+
+    def test_bytes_input(self):
+        with open(os.path.join(HTML_DIR, 'minimal_test.html'), "rb") as f:
+            parsed = parse_gm_html(f.read())
+        self.assertEqual(parsed[0][3], '892.317-0.034(Hex)3 (HexNAc)2  ')
+        self.assertEqual(parsed[0][4], '1 structure')
+        self.assertEqual(parsed[1][4], '1 structure found.')
+
+    def test_no_results(self):
+        self.assert_same_as_reference("<html><body><h1>GlycoMod</h1></body></html>")
@@ -0,0 +1,100 @@
+import unittest
+
+from worker.worker import GlycomodWorker as GW
+from worker.http_client import GlycomodHTTPClient
+from .glycomod_server import StandInGlycomod
+from .test_worker import prepare_cfg
+
+
+class TestGlycomodHTTPClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestGlycomodHTTPClient, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def setUp(self):
+        self.server = StandInGlycomod().start()
+        self.cfg = dict(TestGlycomodHTTPClient.cfg, glycomod_link=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_fill_form(self):
+        client = GlycomodHTTPClient(self.server.url)
+        fields = client.fill_form(self.cfg, "911.30\n1057.33", reducing_end_tag="ProA", derivative_mass=235.168457)
+        self.assertEqual(fields["Tolerance"], "0.5")
+        self.assertEqual(fields["Masses"], "911.30\n1057.33")
+        self.assertEqual(fields["Nform"], "3")
+        self.assertEqual(fields["derivative_name"], "ProA")
+        self.assertEqual(fields["derivative_mass"], "235.168457")
+        self.assertEqual(fields["mode"], "compositions")
+        self.assertEqual(fields["submit"], "Start GlycoMod")
+        self.assertEqual((fields["Hexpres"], fields["Deoxyhexosepres"], fields["Pentpres"]), ("y", "p", "n"))
+        self.assertEqual((fields["Hexnb1"], fields["HexNAcnb1"]), ("3", "2"))
+        self.assertEqual(client.action, self.server.url.replace("/glycomod/", "/cgi-bin/glycomod/glycomod.pl"))
+        free = client.fill_form(self.cfg, "911.30")
+        self.assertEqual(free["Nform"], "0")
+        self.assertEqual(free["massvalues"], "monoisotopic")
+        average = client.fill_form(self.cfg, "911.30", mass_type="avg")
+        self.assertEqual(average["massvalues"], "average")
+
+    def test_worker_http_backend(self):
+        worker = GW(cfg=self.cfg, text_input="911.30\n1057.33", backend="http")
+        worker._fetch_glycomod_html_http()
+        worker._parse_gm_html()
+        self.assertEqual(
+            worker.parsed_data,
+            [
+                [
+                    'User mass: 911.30',
+                    'Adduct ([M+H]+): 1.00727',
+                    'Derivative mass (Free reducing end): 18.0105546',
+                    '892.317-0.034(Hex)3 (HexNAc)2  ', '1 structure'
+                    ],
+                [
+                    'User mass: 1057.33',
+                    'Adduct ([M+H]+): 1.00727',
+                    'Derivative mass (Free reducing end): 18.0105546',
+                    '1038.375-0.062(Hex)3 (HexNAc)2 (Deoxyhexose)1  ',
+                    '1 structure found.'
+                    ]
+            ]
+        )
+        # second run reuses loaded form and pooled connections
+        worker._fetch_glycomod_html_http()
+        self.assertEqual(len(self.server.submissions), 2)
+
+    def test_chunked(self):
+        masses = ["1454.0", "911.30", "1292.92", "1057.4", "1452.01"]
+        worker = GW(cfg=self.cfg, text_input="\n".join(masses), backend="http", chunk_size=2, max_workers=3)
+        worker._fetch_chunked()
+        self.assertEqual(len(self.server.submissions), 3)
+        self.assertEqual(
+            sorted(i["Masses"] for i in self.server.submissions),
+            ["1292.92\n1057.4", "1452.01", "1454.0\n911.30"]
+        )
+        self.assertEqual([i[0] for i in worker.parsed_data], [f"User mass: {i}" for i in masses])
+        worker._create_glycan_objects()
+        self.assertEqual(
+            [len(i.glycomod_structures) for i in worker.compositions],
+            [3, 1, 1, 2, 1]
+        )
+        self.assertEqual(worker.compositions[-1].glycomod_structures[0].short_notation, "NOT FOUND")
+
+    def test_chunk_retry(self):
+        self.server.fail_first = 1
+        worker = GW(cfg=self.cfg, text_input="911.30\n1057.33\n1454.0", backend="http", chunk_size=1, max_workers=1)
+        worker._fetch_chunked()
+        self.assertEqual(len(self.server.submissions), 4)
+        self.assertEqual([i[0] for i in worker.parsed_data], ["User mass: 911.30", "User mass: 1057.33", "User mass: 1454.0"])
+        self.server.fail_first = 1
+        worker = GW(cfg=self.cfg, text_input="911.30", backend="http", chunk_size=1, chunk_retries=0)
+        with self.assertRaises(ConnectionError):
+            worker._fetch_chunked()
+
+    def test_server_error(self):
+        self.server.fail_first = 1
+        client = GlycomodHTTPClient(self.server.url)
+        with self.assertRaises(ConnectionError):
+            client.submit(client.fill_form(self.cfg, "911.30"))
@@ -0,0 +1,98 @@
+import os
+import json
+import tempfile
+import unittest
+
+from worker.worker import GlycomodWorker as GW
+from worker.journal import RunJournal
+from .glycomod_server import StandInGlycomod
+from .test_worker import prepare_cfg
+
+MASSES = ["1454.0", "911.30", "1292.92", "1057.4", "1452.01", "1479.52", "1276.47", "1739.61", "911.30"]
+
+
+class CrashingWorker(GW):
+    """Worker whose browser/network dies on chunk crash_on"""
+    crash_on = 2
+
+    def _search_chunk(self, chunk_number, masses):
+        if chunk_number == self.crash_on:
+            raise ConnectionError("Glycomod connection lost")
+        return super()._search_chunk(chunk_number, masses)
+
+
+class TestJournal(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestJournal, cls).setUpClass()
+        cls.stand_in = StandInGlycomod().start()
+        cls.cfg = dict(prepare_cfg(), glycomod_link=cls.stand_in.url, col_names=[f"col_{i}" for i in range(15)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stand_in.stop()
+        super(TestJournal, cls).tearDownClass()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.journal = os.path.join(self.tmp_dir.name, "masses.txt.journal")
+        TestJournal.stand_in.submissions.clear()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_worker(self, worker_class=GW, name="results", cfg=None, **kwargs):
+        filename = os.path.join(self.tmp_dir.name, name)
+        worker = worker_class(cfg or TestJournal.cfg, text_input="\n".join(MASSES), filename=filename, backend="http",
+                              chunk_size=2, max_workers=1, **kwargs)
+        try:
+            worker.run()
+        finally:
+            worker.close()
+        with open(filename + ".csv", "rb") as f:
+            return f.read()
+
+    def journal_chunks(self):
+        with open(self.journal, "r") as f:
+            return sorted(json.loads(i)["chunk"] for i in f.readlines()[1:])
+
+    def test_resume(self):
+        expected = self.run_worker(name="expected")
+        TestJournal.stand_in.submissions.clear()
+        with self.assertRaises(ConnectionError):
+            self.run_worker(CrashingWorker, journal=self.journal)
+        chunks = self.journal_chunks()
+        self.assertEqual(chunks[:2], [0, 1])
+        self.assertNotIn(2, chunks)
+        self.assertEqual(len(TestJournal.stand_in.submissions), len(chunks))
+        # only chunks left in journal are searched
+        self.assertEqual(self.run_worker(journal=self.journal), expected)
+        self.assertEqual(len(TestJournal.stand_in.submissions), 5)
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_changed_input_or_config(self):
+        with self.assertRaises(ConnectionError):
+            self.run_worker(CrashingWorker, journal=self.journal)
+        TestJournal.stand_in.submissions.clear()
+        # different tolerance, journal is started over
+        with self.assertRaises(ConnectionError):
+            self.run_worker(CrashingWorker, cfg=dict(TestJournal.cfg, Tolerance="0.2"), journal=self.journal)
+        self.assertEqual(len(TestJournal.stand_in.submissions), len(self.journal_chunks()))
+        with self.assertLogs("RunJournal", level="WARNING") as logs:
+            RunJournal(self.journal, {"input": "other", "settings": "other", "chunk_size": 2}).open()
+        self.assertIn("different input, settings", logs.output[0])
+
+    def test_torn_entry(self):
+        header = {"input": "a", "settings": "b", "chunk_size": 2}
+        journal = RunJournal(self.journal, header)
+        journal.open()
+        journal.append(0, [["User mass: 911.30", "0 structures found."]])
+        journal.close()
+        with open(self.journal, "a") as f:
+            f.write('{"chunk": 1, "results": [["User ma')
+        with self.assertLogs("RunJournal", level="WARNING"):
+            done = RunJournal(self.journal, header).open()
+        self.assertEqual(list(done), [0])
+        with open(self.journal, "r") as f:
+            self.assertEqual(len(f.readlines()), 2)
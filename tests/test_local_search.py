@@ -0,0 +1,143 @@
+import unittest
+
+import numpy as np
+
+from worker.local_search import LocalSearchEngine, search_space_from_cfg, format_gm_number
+from worker.worker import GlycomodWorker as GW
+from worker.result_store import NOT_FOUND
+from .test_worker import prepare_cfg
+
+
+class TestLocalSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestLocalSearch, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def test_search_space_from_cfg(self):
+        residues, min_counts = search_space_from_cfg(TestLocalSearch.cfg)
+        self.assertEqual(residues, ["Hex", "HexNAc", "Deoxyhexose", "NeuAc"])
+        self.assertEqual(min_counts, [3, 2, 0, 0])
+
+    def test_format_gm_number(self):
+        self.assertEqual(format_gm_number(892.31720), "892.317")
+        self.assertEqual(format_gm_number(1434.50012), "1434.5")
+        self.assertEqual(format_gm_number(-0.0348), "-0.035")
+        self.assertEqual(format_gm_number(0.0001), "0.0")
+
+    def test_search(self):
+        engine = LocalSearchEngine(TestLocalSearch.cfg)
+        # same masses as in minimal_test.html
+        results = engine.search("911.30\n1057.33\n")
+        self.assertEqual(
+            results,
+            [
+                [
+                    'User mass: 911.30',
+                    'Adduct ([M+H]+): 1.007276',
+                    'Derivative mass (Free reducing end): 18.0105546',
+                    '892.317\t-0.035(Hex)3 (HexNAc)2',
+                    '1 structure found.'
+                    ],
+                [
+                    'User mass: 1057.33',
+                    'Adduct ([M+H]+): 1.007276',
+                    'Derivative mass (Free reducing end): 18.0105546',
+                    '1038.375\t-0.063(Hex)3 (HexNAc)2 (Deoxyhexose)1',
+                    '1 structure found.'
+                    ]
+            ]
+        )
+
+    def test_search_not_found(self):
+        engine = LocalSearchEngine(TestLocalSearch.cfg, reducing_end="ProA")
+        results = engine.search("1452.01")
+        self.assertEqual(results[0][2], 'Derivative mass (ProA): 235.168457')
+        self.assertEqual(results[0][-1], '0 structures found.')
+
+    def test_search_multiple_matches(self):
+        engine = LocalSearchEngine(TestLocalSearch.cfg)
+        results = engine.search("2500.9")
+        self.assertEqual(len(results[0]), 6)
+        self.assertEqual(results[0][-1], '2 structures found.')
+
+    def test_search_wide_tolerance(self):
+        cfg = dict(TestLocalSearch.cfg, Tolerance="2")
+        results = LocalSearchEngine(cfg).search("912.5")
+        self.assertEqual(results[0][3], '892.317\t1.165(Hex)3 (HexNAc)2')
+        worker = GW(cfg=cfg, text_input="912.5", backend="local")
+        worker._search_local()
+        worker._create_glycan_objects()
+        self.assertEqual(worker.results.theoretical_MH.tolist(), [892.317])
+        self.assertEqual(worker.results.delta.tolist(), [1.165])
+
+    def test_search_avg(self):
+        engine = LocalSearchEngine(TestLocalSearch.cfg, mass_type="avg")
+        results = engine.search("911.85\n1058.0")
+        self.assertEqual(results[0], [
+            'User mass: 911.85',
+            'Adduct ([M+H]+): 1.00739',
+            'Derivative mass (Free reducing end): 18.01524',
+            '892.817\t0.01(Hex)3 (HexNAc)2',
+            '1 structure found.'
+        ])
+        self.assertEqual(results[1][-2:], ['1038.96\t0.017(Hex)3 (HexNAc)2 (Deoxyhexose)1', '1 structure found.'])
+        worker = GW(cfg=TestLocalSearch.cfg, text_input="911.85\n1058.0", backend="local", reducing_end="ProA", mass_type="avg")
+        worker.search()
+        # ProA tag and adducts use average masses too
+        self.assertEqual(worker.results.red_end_tag_mass.tolist(), [219.326] * 2)
+        self.assertEqual(worker.results.header_table[0][1], "Derivative mass (ProA): 235.325")
+
+    def test_match_adducts(self):
+        engine = LocalSearchEngine(TestLocalSearch.cfg, reducing_end="ProA")
+        masses = np.random.RandomState(0).uniform(500, 2000, 200)
+        adducts = [(name, mass, charge) for name, (mass, charge) in TestLocalSearch.cfg["adducts"].items()]
+        offsets, hits = engine.match_adducts(masses, adducts)
+        self.assertEqual(len(offsets), len(masses) * len(adducts) + 1)
+        # same as searching masses shifted to [M+H]+ of every adduct by hand
+        proton = TestLocalSearch.cfg["mono_masses_underivatized"]["H+"]
+        for k, (name, mass, charge) in enumerate(adducts):
+            shifted, shifted_hits = engine.match(masses * charge - mass + proton)
+            pairs = np.arange(len(masses)) * len(adducts) + k
+            for i, pair in enumerate(pairs):
+                found = hits[offsets[pair]:offsets[pair + 1]]
+                expected = shifted_hits[shifted[i]:shifted[i + 1]]
+                # tolerance of z-charged m/z is z times wider in glycoform mass
+                if charge == 1:
+                    self.assertEqual(found.tolist(), expected.tolist())
+                else:
+                    self.assertTrue(set(expected.tolist()) <= set(found.tolist()))
+
+    def test_worker_adducts(self):
+        text_input = "911.30\n467.15\n300.00"
+        single = GW(cfg=TestLocalSearch.cfg, text_input=text_input, backend="local").search()
+        worker = GW(cfg=TestLocalSearch.cfg, text_input=text_input, backend="local", adducts=["H+", "HNa2+", "Na+"])
+        results = worker.search()
+        self.assertEqual(results.user_mass, ["911.30", "467.15", "300.00"])
+        self.assertEqual(results.adduct, ["H+", "HNa2+", "H+"])
+        # [M+H]+ hits are the same as in single adduct search
+        self.assertEqual(results.delta[:1].tolist(), single.delta[:1].tolist())
+        # 467.15 is (Hex)3 (HexNAc)2 as [M+H+Na]2+, delta is in m/z
+        self.assertEqual(results.composition_table[results.composition[1]][0], "(Hex)3 (HexNAc)2")
+        self.assertEqual(results.delta[1], -0.012)
+        self.assertEqual(results.header_lines(1)[0], "Adduct ([M+HNa]2+): 23.997044")
+        self.assertEqual(results.composition_table[results.composition[2]], NOT_FOUND)
+        worker.cfg = dict(worker.cfg, col_names=[f"col_{i}" for i in range(15)])
+        self.assertEqual(worker._col_names()[-1], "Adduct")
+        self.assertEqual(results.to_columns(worker._col_names())["Adduct"], ["H+", "HNa2+", "H+"])
+        with self.assertRaises(ValueError):
+            GW(cfg=TestLocalSearch.cfg, backend="http", adducts="all")
+        with self.assertRaises(ValueError):
+            GW(cfg=TestLocalSearch.cfg, backend="local", adducts=["Li+"])
+
+    def test_worker_local_backend(self):
+        worker = GW(cfg=TestLocalSearch.cfg, text_input="911.30\n1057.33\n1452.01", backend="local")
+        worker._search_local()
+        worker._create_glycan_objects()
+        self.assertEqual(
+            [[j.short_notation for j in i.glycomod_structures] for i in worker.compositions],
+            [["H3N2"], ["H3N2F1"], ["NOT FOUND"]]
+        )
+        with self.assertRaises(ValueError):
+            GW(cfg=TestLocalSearch.cfg, backend="carrier_pigeon")
@@ -0,0 +1,102 @@
+import os
+import json
+import unittest
+
+import numpy as np
+
+from worker import utils
+from worker.mass_config import MassConfig, compile_config
+from .test_worker import prepare_cfg
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestMassConfig(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMassConfig, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def test_compile(self):
+        config = compile_config(TestMassConfig.cfg)
+        self.assertEqual(config.masses["(Hex)"], TestMassConfig.cfg["mono_masses_underivatized"]["(Hex)"])
+        self.assertEqual(config.mass_vector[config.index["(HexNAc)"]], config.masses["(HexNAc)"])
+        self.assertEqual(config.adduct_names, tuple(TestMassConfig.cfg["adducts"]))
+        self.assertEqual(config.adducts[0], ("H+", 1.007276, 1))
+        self.assertEqual(config.tag_mass("ProA"), TestMassConfig.cfg["reducing_end_tag_mono"]["ProA"])
+        self.assertEqual(config.tag_mass(None), 0.0)
+        with self.assertRaises(ValueError):
+            config.tag_mass("Biotin")
+        # MassConfig is passed through, config dicts are compiled again
+        self.assertIs(compile_config(config), config)
+        self.assertIsNot(compile_config(TestMassConfig.cfg), config)
+        self.assertEqual(compile_config(TestMassConfig.cfg, "avg").mass_type, "avg")
+        with self.assertRaises(ValueError):
+            compile_config(config, "avg")
+
+    def test_edited_in_place(self):
+        cfg = prepare_cfg()
+        before = utils.calc_default_adducts_mono({"(Hex)": 3, "(HexNAc)": 2}, cfg)
+        cfg["mono_masses_underivatized"]["(Hex)"] += 5
+        after = utils.calc_default_adducts_mono({"(Hex)": 3, "(HexNAc)": 2}, cfg)
+        self.assertAlmostEqual(after["H+"] - before["H+"], 15.0)
+        cfg["adducts"]["H+"][0] += 1
+        self.assertAlmostEqual(utils.calc_default_adducts_mono({"(Hex)": 3, "(HexNAc)": 2}, cfg)["H+"] - after["H+"], 1.0)
+        self.assertAlmostEqual(utils.calc_theor_mono_mass({"(Hex)": 3}, cfg), utils.calc_theor_mono_mass({"(Hex)": 3}, compile_config(cfg)))
+        with self.assertRaises(ValueError):
+            utils.calc_theor_mono_mass({"(Hex)": 3}, compile_config(cfg, "avg"))
+
+    def test_immutable(self):
+        config = compile_config(TestMassConfig.cfg)
+        with self.assertRaises(AttributeError):
+            config.water = 0.0
+        with self.assertRaises(TypeError):
+            config.masses["(Hex)"] = 0.0
+        with self.assertRaises(ValueError):
+            config.mass_vector[0] = 0.0
+
+    def test_validation(self):
+        cfg = dict(TestMassConfig.cfg)
+        del cfg["mono_masses_underivatized"]
+        with self.assertRaises(ValueError):
+            MassConfig.from_config(cfg)
+        # sections a helper does not use may be missing, helpers using them raise
+        cfg = {key: value for key, value in TestMassConfig.cfg.items() if key not in ("adducts_avg", "reducing_end_tag_mono")}
+        self.assertEqual(utils.calc_theor_avg_mass({"(Hex)": 3}, cfg), utils.calc_theor_avg_mass({"(Hex)": 3}, TestMassConfig.cfg))
+        self.assertEqual(utils.calc_theor_mono_mass({"(Hex)": 3}, cfg), utils.calc_theor_mono_mass({"(Hex)": 3}, TestMassConfig.cfg))
+        with self.assertRaises(ValueError):
+            utils.calc_theor_mono_mass({"(Hex)": 3}, cfg, reducing_end="ProA")
+        with self.assertRaises(ValueError):
+            utils.calc_adducts_batch([{"(Hex)": 3}], cfg, mass_type="avg")
+        with self.assertRaises(ValueError):
+            MassConfig.from_config(dict(TestMassConfig.cfg, adducts={"Na+": [22.989768, 0]}))
+        with self.assertRaises(ValueError):
+            MassConfig.from_config(dict(TestMassConfig.cfg, adducts={"Na+": 22.989768}))
+        with self.assertRaises(ValueError):
+            MassConfig.from_config(TestMassConfig.cfg, "median")
+
+    def test_same_masses(self):
+        config = compile_config(TestMassConfig.cfg)
+        with open(os.path.join(THIS_DIR, "test_strings.json"), "r") as f:
+            dictionaries = [utils.string_to_dict(i) for i in json.load(f)["strings"]]
+        for reducing_end in (None, "ProA"):
+            names, adduct_ions = utils.calc_adducts_batch(dictionaries, config, reducing_end=reducing_end)
+            for row, dictionary in enumerate(dictionaries):
+                self.assertEqual(
+                    utils.calc_theor_mono_mass(dictionary, config, reducing_end=reducing_end),
+                    utils.calc_theor_mono_mass(dictionary, TestMassConfig.cfg, reducing_end=reducing_end)
+                )
+                expected = {
+                    name: utils._calc_theor_mono_mass_adducts(
+                        dictionary, TestMassConfig.cfg, charge, config.tag_mass(reducing_end), mass, prec=4
+                    )
+                    for name, mass, charge in config.adducts
+                }
+                self.assertEqual(utils.calc_default_adducts_mono(dictionary, config, reducing_end=reducing_end), expected)
+                self.assertEqual(dict(zip(names, adduct_ions[row].tolist())), expected)
+        with self.assertRaises(ValueError):
+            utils.calc_adducts_batch([{"(Glc)": 1}], config)
+        names, adduct_ions = utils.calc_adducts_batch([], config)
+        self.assertEqual(adduct_ions.shape, (0, len(names)))
+        self.assertTrue(np.isfinite(adduct_ions).all())
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from worker.mass_index import MassIndex, index_path_from_cfg
+from worker.local_search import LocalSearchEngine, search_space_from_cfg, enumerate_compositions
+from .test_worker import prepare_cfg as shared_cfg
+
+
+class TestMassIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMassIndex, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp_dir.name, "index.bin")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build_and_open(self):
+        index = MassIndex.build(TestMassIndex.cfg, self.index_path)
+        residues, min_counts = search_space_from_cfg(TestMassIndex.cfg)
+        residue_masses = [TestMassIndex.cfg["mono_masses_underivatized"][f"({i})"] for i in residues]
+        masses, counts = enumerate_compositions(residue_masses, min_counts, 3000)
+        self.assertIsInstance(index.masses, np.memmap)
+        self.assertEqual(index.residues, residues)
+        np.testing.assert_array_equal(np.asarray(index.masses), masses)
+        np.testing.assert_array_equal(np.asarray(index.counts), counts)
+
+    def test_for_config_checksum(self):
+        MassIndex.build(TestMassIndex.cfg, self.index_path)
+        self.assertIsNotNone(MassIndex.for_config(TestMassIndex.cfg, self.index_path))
+        changed_cfg = dict(TestMassIndex.cfg, default_mono=dict(TestMassIndex.cfg["default_mono"], Pentpres=1))
+        self.assertIsNone(MassIndex.for_config(changed_cfg, self.index_path))
+        with self.assertRaises(ValueError):
+            MassIndex.open(self.index_path, checksum="0"*64)
+        self.assertIsNone(MassIndex.for_config(TestMassIndex.cfg, os.path.join(self.tmp_dir.name, "missing.bin")))
+
+    def test_default_path(self):
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.tmp_dir.name}):
+            path = index_path_from_cfg(TestMassIndex.cfg)
+            avg_path = index_path_from_cfg(TestMassIndex.cfg, mass_type="avg")
+        if os.name != "nt":
+            self.assertEqual(path, os.path.join(self.tmp_dir.name, "GlycomodWorker", "local_index.bin"))
+            self.assertEqual(avg_path, os.path.join(self.tmp_dir.name, "GlycomodWorker", "local_index_avg.bin"))
+        self.assertNotIn(os.path.join("worker", "local_index.bin"), path)
+
+    def test_avg_index(self):
+        path = os.path.join(self.tmp_dir.name, "index_avg.bin")
+        index = MassIndex.build(TestMassIndex.cfg, path, mass_type="avg")
+        self.assertIsNotNone(MassIndex.for_config(TestMassIndex.cfg, path, mass_type="avg"))
+        # mono search never uses average index
+        self.assertIsNone(MassIndex.for_config(TestMassIndex.cfg, path))
+        text_input = "911.84\n1058.0\n2501.9"
+        self.assertEqual(
+            LocalSearchEngine(TestMassIndex.cfg, index=index, mass_type="avg").search(text_input),
+            LocalSearchEngine(TestMassIndex.cfg, mass_type="avg").search(text_input)
+        )
+
+    def test_search_with_index(self):
+        index = MassIndex.build(TestMassIndex.cfg, self.index_path)
+        text_input = "911.30\n1057.33\n2500.9\n1452.01"
+        self.assertEqual(
+            LocalSearchEngine(TestMassIndex.cfg, reducing_end="ProA", index=index).search(text_input),
+            LocalSearchEngine(TestMassIndex.cfg, reducing_end="ProA").search(text_input)
+        )
+
+
+def prepare_cfg():
+    cfg = shared_cfg()
+    cfg["local_index"] = {"path": "null", "max_mass": 3000}
+    return cfg
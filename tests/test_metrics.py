@@ -0,0 +1,73 @@
+import os
+import json
+import pstats
+import tempfile
+import unittest
+
+from worker.worker import GlycomodWorker as GW
+from worker.metrics import RunMetrics
+from .test_result_store import PARSED_DATA
+from .test_worker import prepare_cfg
+
+COL_NAMES = [f"col_{i}" for i in range(15)]
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestRunMetrics, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+        cls.cfg["col_names"] = COL_NAMES
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.metrics = RunMetrics(trace_memory=True, cprofile_stage="_create_glycan_objects")
+
+    def tearDown(self):
+        self.metrics.close()
+        self.tmp_dir.cleanup()
+
+    def test_worker_stages(self):
+        worker = GW(cfg=self.cfg, text_input="911.30\n1057.33\n1452.01", backend="local", save_txt=True,
+                    filename=os.path.join(self.tmp_dir.name, "results"), metrics=self.metrics)
+        worker.run()
+        stages = self.metrics.stages
+        self.assertEqual(list(stages), ["_search_local", "_create_glycan_objects", "output_table", "output_text", "run"])
+        self.assertEqual((stages["_search_local"]["masses"], stages["_search_local"]["hits"]), (3, 2))
+        # NOT FOUND mass gets one row
+        self.assertEqual(stages["output_table"]["rows"], 3)
+        self.assertGreaterEqual(stages["run"]["seconds"], stages["output_table"]["seconds"])
+        self.assertGreaterEqual(stages["run"]["peak_traced_mb"], stages["_create_glycan_objects"]["peak_traced_mb"])
+
+        path = os.path.join(self.tmp_dir.name, "metrics.json")
+        self.metrics.save(path)
+        with open(path, "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["stages"]["run"]["calls"], 1)
+        self.assertIn("total_seconds", saved)
+        profiled = pstats.Stats(path + "._create_glycan_objects.prof")
+        self.assertTrue(any(name == "_build_results" for _, _, name in profiled.stats))
+
+    def test_parse_counts(self):
+        worker = GW(cfg=self.cfg, metrics=self.metrics)
+        worker.parsed_data = [list(i) for i in PARSED_DATA]
+        worker._create_glycan_objects()
+        worker._create_glycan_objects()
+        stats = self.metrics.stages["_create_glycan_objects"]
+        self.assertEqual((stats["calls"], stats["masses"], stats["hits"]), (2, 6, 10))
+
+    def test_no_metrics(self):
+        worker = GW(cfg=self.cfg)
+        worker.parsed_data = [list(i) for i in PARSED_DATA]
+        worker._create_glycan_objects()
+        self.assertEqual(self.metrics.stages, {})
+
+    def test_untraced(self):
+        metrics = RunMetrics()
+        worker = GW(cfg=self.cfg, metrics=metrics)
+        worker.parsed_data = [list(i) for i in PARSED_DATA]
+        worker._create_glycan_objects()
+        self.assertNotIn("peak_traced_mb", metrics.stages["_create_glycan_objects"])
+        self.assertFalse(metrics.to_dict()["trace_memory"])
+        metrics.close()
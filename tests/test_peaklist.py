@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from worker.peaklist import read_peak_list, parse_peak_text
+from worker.worker import GlycomodWorker as GW
+from .test_worker import prepare_cfg
+
+
+class TestPeakList(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPeakList, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def test_parse_peak_text(self):
+        peaks = parse_peak_text("911.30\n1057.33  1452.01\r\n\n.5\t6.\n")
+        np.testing.assert_array_equal(peaks.masses, [911.3, 1057.33, 1452.01, 0.5, 6.0])
+        self.assertEqual(peaks.labels, ["911.30", "1057.33", "1452.01", ".5", "6."])
+        self.assertEqual(peaks.text, "911.30\n1057.33\n1452.01\n.5\n6.")
+        self.assertEqual(len(parse_peak_text(" \n")), 0)
+
+    def test_invalid_lines(self):
+        with self.assertRaises(ValueError) as error:
+            parse_peak_text("911.30\nabc\n1.2.3\n1057.33\n.\n1452.01 x")
+        self.assertIn("line 2 ('abc'), 3 ('1.2.3'), 5 ('.'), 6 ('1452.01 x')", str(error.exception))
+        with self.assertRaises(ValueError) as error:
+            parse_peak_text("\n".join(["911.30", "9,1"] * 12))
+        self.assertIn("line 2 ('9,1'), 4 ('9,1')", str(error.exception))
+        self.assertIn("and 2 more", str(error.exception))
+
+    def test_read_peak_list_chunks(self):
+        masses = np.round(np.random.RandomState(0).uniform(500, 4000, 5000), 2)
+        text = "\n".join(f"{i:.2f}" for i in masses) + "\n1234.5.6\n"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "peaks.txt")
+            with open(path, "w") as f:
+                f.write(text[:text.rindex("1234.5.6")])
+            read = read_peak_list(path)
+            np.testing.assert_array_equal(read.masses, masses)
+            # small chunks split lines, memory-mapped file is read the same way
+            for mmap_threshold in (0, 10**9):
+                chunked = read_peak_list(path, chunk_size=1001, mmap_threshold=mmap_threshold)
+                np.testing.assert_array_equal(chunked.masses, masses)
+                self.assertEqual(chunked.labels, read.labels)
+            with open(path, "w") as f:
+                f.write(text)
+            with self.assertRaises(ValueError) as error:
+                read_peak_list(path, chunk_size=1001, mmap_threshold=0)
+            self.assertIn("line 5001 ('1234.5.6')", str(error.exception))
+
+    def test_worker_peaks(self):
+        peaks = parse_peak_text("911.30\n1057.33\n1452.01")
+        worker = GW(cfg=TestPeakList.cfg, peaks=peaks, backend="local")
+        self.assertEqual(worker.text_input, "911.30\n1057.33\n1452.01")
+        worker._search_local()
+        text_worker = GW(cfg=TestPeakList.cfg, text_input="911.30\n1057.33\n1452.01", backend="local")
+        text_worker._search_local()
+        self.assertEqual(worker.parsed_data, text_worker.parsed_data)
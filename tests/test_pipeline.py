@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from worker.worker import GlycomodWorker as GW
+from worker.result_store import ResultStore
+from .glycomod_server import StandInGlycomod
+from .test_worker import prepare_cfg
+
+COL_NAMES = [f"col_{i}" for i in range(15)]
+MASSES = "1454.0\n911.30\n1292.92\n1057.4\n1452.01\n1479.52\n911.30"
+
+
+class TestSearchPipeline(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestSearchPipeline, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+        cls.cfg["col_names"] = COL_NAMES
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.server = StandInGlycomod().start()
+        self.cfg = dict(TestSearchPipeline.cfg, glycomod_link=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp_dir.cleanup()
+
+    def run_worker(self, name, **kwargs):
+        worker = GW(cfg=self.cfg, text_input=MASSES, filename=os.path.join(self.tmp_dir.name, name), **kwargs)
+        worker.run()
+        with open(worker.filename + ".csv", "r") as f:
+            return worker, f.read()
+
+    def test_same_as_sequential(self):
+        for backend in ("http", "local"):
+            with self.subTest(backend=backend):
+                worker, expected = self.run_worker(f"{backend}_sequential", backend=backend)
+                piped, written = self.run_worker(f"{backend}_pipeline", backend=backend, pipeline=True,
+                                                 chunk_size=2, max_workers=2)
+                self.assertEqual(written, expected)
+                self.assertEqual(list(piped.results.iter_submitted()), list(worker.results.iter_submitted()))
+                self.assertEqual(len(piped.parsed_data), 7)
+        # 1 sequential submission + 4 chunks
+        self.assertEqual(len(self.server.submissions), 5)
+
+    def test_cached(self):
+        cfg = dict(self.cfg, cache={"path": os.path.join(self.tmp_dir.name, "cache.sqlite")})
+        self.cfg = cfg
+        _, expected = self.run_worker("first", backend="http", pipeline=True, chunk_size=3, use_cache=True)
+        submitted = len(self.server.submissions)
+        _, written = self.run_worker("second", backend="http", pipeline=True, chunk_size=3, use_cache=True)
+        self.assertEqual(written, expected)
+        self.assertEqual(len(self.server.submissions), submitted)
+
+    def test_failure_cancels(self):
+        self.server.fail_first = 100
+        worker = GW(cfg=self.cfg, text_input=MASSES, filename=os.path.join(self.tmp_dir.name, "failed"),
+                    backend="http", pipeline=True, chunk_size=1, max_workers=2, chunk_retries=1)
+        with self.assertRaises(ConnectionError):
+            worker.run()
+        # fetching stops instead of trying every chunk
+        self.assertLess(len(self.server.submissions), 14)
+
+    def test_concat(self):
+        worker = GW(cfg=self.cfg, text_input=MASSES, backend="local")
+        worker._search()
+        whole = worker._build_results(worker.parsed_data)
+        parts = [worker._build_results(worker.parsed_data[i:i + 3]) for i in range(0, 7, 3)]
+        joined = ResultStore.concat(parts)
+        self.assertEqual(list(joined.iter_submitted()), list(whole.iter_submitted()))
+        self.assertEqual(joined.composition_table, whole.composition_table)
+        self.assertEqual(len(ResultStore.concat([])), 0)
@@ -0,0 +1,148 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+from worker.worker import GlycomodWorker as GW
+from worker.result_store import ResultStore
+from worker.data_types import GlycomodComposition, SubmittedMass
+from worker.writers import write_text_report
+from .test_worker import prepare_cfg
+
+COL_NAMES = [f"col_{i}" for i in range(15)]
+PARSED_DATA = [
+    [
+        'User mass: 911.30',
+        'Adduct ([M+H]+): 1.00727',
+        'Derivative mass (Free reducing end): 18.0105546',
+        '892.317-0.034(Hex)3 (HexNAc)2  ',
+        '1 structure'
+    ],
+    [
+        'User mass: 1454.0',
+        'Adduct ([M+H]+): 1.00727',
+        'Derivative mass (Free reducing end): 18.0105546',
+        '1434.5020.48(Hex)3 (HexNAc)2 (Deoxyhexose)1 (Pent)3',
+        '1435.32-0.337(Hex)1 (HexNAc)3 (Deoxyhexose)2 (Pent)1 (Sulph)3',
+        '892.317-0.034(Hex)3 (HexNAc)2  ',
+        '3 structures'
+    ],
+    [
+        'User mass: 1452.01',
+        'Adduct ([M+H]+): 1.00727',
+        'Derivative mass (Free reducing end): 18.0105546',
+        '0 structures found.'
+    ],
+]
+
+
+class TestResultStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestResultStore, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def setUp(self):
+        self.worker = GW(cfg=self.cfg)
+        self.worker.parsed_data = [list(i) for i in PARSED_DATA]
+        self.worker._create_glycan_objects()
+
+    def test_columns(self):
+        results = self.worker.results
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results.n_hits, 5)
+        self.assertEqual(results.hit_offsets.tolist(), [0, 1, 4, 5])
+        # same composition is stored once, 0 is reserved for NOT FOUND
+        self.assertEqual(results.composition.tolist(), [1, 2, 3, 1, 0])
+        self.assertEqual(len(results.header_table), 1)
+        self.assertEqual(results.delta.tolist(), [-0.034, 0.48, -0.337, -0.034, 1000.0])
+        self.assertEqual(results.adduct_ions[0].tolist(), results.adduct_ions[3].tolist())
+        self.assertEqual(results.adduct_ions[4].tolist(), [0.0] * 8)
+
+    def test_round_trip(self):
+        submitted = self.worker.compositions
+        self.assertIsInstance(submitted[0], SubmittedMass)
+        self.assertIsInstance(submitted[0].glycomod_structures[0], GlycomodComposition)
+        self.assertEqual(list(ResultStore.from_submitted(submitted).iter_submitted()), submitted)
+
+    def test_compositions_list(self):
+        submitted = self.worker.compositions
+        self.assertIs(self.worker.compositions, submitted)
+        # edits of the list are used for output, as when compositions was a plain list
+        submitted[0].glycomod_structures[0] = submitted[0].glycomod_structures[0]._replace(delta=-0.05)
+        submitted.append(SubmittedMass(
+            experimental_mass="1500.0", adduct="H+", adduct_mass=1.00727, red_end_tag=None, red_end_tag_mass=18.0105546,
+            glycomod_structures=[submitted[0].glycomod_structures[0]._replace(long_notation="(Hex)9", short_notation="H9")]
+        ))
+        results = self.worker.results
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results.delta.tolist()[0], -0.05)
+        self.assertEqual(results.found().tolist(), [True, True, False, True])
+        # rebuilt once per edit, masses from search keep their Glycomod header lines
+        self.assertIs(self.worker.results, results)
+        self.assertEqual(results.header_lines(0), self.worker._results.header_lines(0))
+        del submitted[0]
+        self.assertEqual(self.worker.results.user_mass[0], results.user_mass[1])
+        self.assertEqual(self.worker.results.header_lines(0), self.worker._results.header_lines(1))
+        self.assertEqual(self.worker.results.header.tolist(), [0, 0, -1])
+        # next search starts over
+        self.worker._create_glycan_objects()
+        self.assertEqual(len(self.worker.results), 3)
+        self.assertIsNot(self.worker.compositions, submitted)
+
+    def test_not_found_anywhere(self):
+        # NOT FOUND is composition 3 of store built from SubmittedMass objects
+        store = ResultStore.from_submitted(self.worker.compositions)
+        self.assertEqual(store.not_found_ids(), [3])
+        filtered = store.filter_hits([True] * store.n_hits)
+        self.assertEqual(filtered.composition_table, store.composition_table)
+        self.assertEqual(filtered.hit_offsets.tolist(), store.hit_offsets.tolist())
+        self.assertEqual(filtered.found().tolist(), [True, True, False])
+        # hit of composition 0 is kept, mass left without hits gets NOT FOUND
+        filtered = store.filter_hits([True, False, False, False, True])
+        self.assertEqual(filtered.composition.tolist(), [0, 3, 3])
+        without = ResultStore.from_submitted(self.worker.compositions[:1])
+        self.assertEqual(without.filter_hits([False]).composition_table[-1], ("NOT FOUND", "NOT FOUND"))
+        self.assertEqual(without.filter_hits([False]).found().tolist(), [False])
+
+    def test_to_dataframe(self):
+        records = [row for mass in self.worker.compositions for row in mass.prep_csv_out()]
+        expected = pd.DataFrame.from_records(records, columns=COL_NAMES)
+        pd.testing.assert_frame_equal(self.worker.results.to_dataframe(COL_NAMES), expected)
+
+    def test_prettify_text(self):
+        text = self.worker._prettify_text()
+        self.assertEqual(
+            text.split("\n\n")[1].split("\n"),
+            [
+                'User mass: 1454.0',
+                'Adduct ([M+H]+): 1.00727',
+                'Derivative mass (Free reducing end): 18.0105546',
+                '\t1. [MH]+:  1434.502,  Error:   0.48, Comp: (Hex)3(HexNAc)2(Deoxyhexose)1(Pent)3',
+                '\t2. [MH]+:   1435.32,  Error: -0.337, Comp: (Hex)1(HexNAc)3(Deoxyhexose)2(Pent)1(Sulph)3',
+                '\t3. [MH]+:   892.317,  Error: -0.034, Comp: (Hex)3(HexNAc)2',
+                '3 structures found.'
+            ]
+        )
+        self.assertTrue(text.endswith("User mass: 1452.01\nAdduct ([M+H]+): 1.00727\n"
+                                      "Derivative mass (Free reducing end): 18.0105546\n0 structures found."))
+        # parsed data is left as it was
+        self.assertEqual(self.worker.parsed_data, PARSED_DATA)
+
+    def test_write_text_report(self):
+        text = self.worker._prettify_text()
+        for batch_masses in (1, 2, 1000):
+            report = io.StringIO()
+            write_text_report(self.worker.results, report, batch_masses=batch_masses)
+            self.assertEqual(report.getvalue(), text)
+        # --echo prints the same report, as many times as asked
+        for _ in range(2):
+            echoed = io.StringIO()
+            with redirect_stdout(echoed):
+                self.worker.output_text(to_std_out=True)
+            self.assertEqual(echoed.getvalue(), text + "\n")
+        empty = io.StringIO()
+        write_text_report(ResultStore(), empty)
+        self.assertEqual(empty.getvalue(), "")
@@ -0,0 +1,155 @@
+import os
+import zlib
+import base64
+import tempfile
+import unittest
+
+import numpy as np
+
+from worker.peaklist import parse_peak_text
+from worker.spectra import Spectrum, iter_mgf, iter_mzml, pick_peaks, read_input, read_spectra
+from worker.worker import GlycomodWorker as GW
+from .test_worker import prepare_cfg
+
+MGF = """# exported peak list
+BEGIN IONS
+TITLE=spot A1
+PEPMASS=911.30
+911.3012 1500.0
+1057.3371 800
+1200.0 5
+END IONS
+BEGIN IONS
+TITLE=spot A2
+1452.5093 900.5 1+
+END IONS
+"""
+
+
+class TestSpectra(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestSpectra, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_iter_mgf(self):
+        spectra = list(iter_mgf(self.write("run.mgf", MGF)))
+        self.assertEqual([i.id for i in spectra], ["spot A1", "spot A2"])
+        np.testing.assert_array_equal(spectra[0].mz, [911.3012, 1057.3371, 1200.0])
+        np.testing.assert_array_equal(spectra[1].intensity, [900.5])
+        self.assertTrue(spectra[0].centroided)
+        with self.assertRaises(ValueError):
+            list(iter_mgf(self.write("bad.mgf", "BEGIN IONS\n911.30 abc\nEND IONS\n")))
+
+    def test_iter_mzml(self):
+        mz = np.array([911.3012, 1057.3371, 1452.5093])
+        intensity = np.array([1500.0, 800.0, 5.0])
+        path = self.write("run.mzML", mzml([
+            ("scan=1", 1, False, mz, intensity, True, np.float64),
+            ("scan=2", 2, False, mz[:1], intensity[:1], False, np.float64),
+            ("scan=3", 1, True, mz, intensity, False, np.float32),
+        ]))
+        spectra = list(iter_mzml(path))
+        self.assertEqual([(i.id, i.ms_level, i.centroided) for i in spectra],
+                         [("scan=1", 1, True), ("scan=2", 2, True), ("scan=3", 1, False)])
+        np.testing.assert_array_equal(spectra[0].mz, mz)
+        np.testing.assert_array_equal(spectra[1].intensity, intensity[:1])
+        np.testing.assert_allclose(spectra[2].mz, mz, rtol=1e-7)
+
+    def test_pick_peaks(self):
+        centroided = Spectrum("", 1, True, np.array([100.0, 200.0, 300.0]), np.array([1000.0, 5.0, 0.0]))
+        np.testing.assert_array_equal(pick_peaks(centroided), [100.0, 200.0])
+        np.testing.assert_array_equal(pick_peaks(centroided, relative_intensity=0.01), [100.0])
+        np.testing.assert_array_equal(pick_peaks(centroided, min_intensity=2000), [])
+        # two profile peaks and noise, apex of the second is between two equal points
+        mz = np.round(np.arange(911.0, 912.0, 0.1), 1)
+        intensity = np.array([0, 10, 100, 10, 0, 2, 0, 50, 50, 0], dtype=np.float64)
+        profile = Spectrum("", 1, False, mz, intensity)
+        picked = pick_peaks(profile, relative_intensity=0.1)
+        np.testing.assert_allclose(picked, [911.2, (911.6 * 0 + 911.7 * 50 + 911.8 * 50) / 100])
+        self.assertEqual(len(pick_peaks(profile)), 3)
+        self.assertEqual(len(pick_peaks(Spectrum("", 1, False, mz[:2], intensity[:2]))), 0)
+
+    def test_read_spectra(self):
+        mz = np.array([911.30123, 1057.33711, 1452.50932])
+        path = self.write("run.mzML", mzml([
+            ("scan=1", 1, False, mz[:2], np.array([1000.0, 5.0]), True, np.float64),
+            ("scan=2", 2, False, mz, np.array([1000.0, 1000.0, 1000.0]), True, np.float64),
+            ("scan=3", 1, False, mz[2:], np.array([300.0]), True, np.float64),
+        ]))
+        peaks = read_spectra(path)
+        self.assertEqual(peaks.labels, ["911.3012", "1452.5093"])
+        np.testing.assert_array_equal(peaks.masses, [911.3012, 1452.5093])
+        # peaks of every scan are merged after rounding
+        peaks = read_spectra(path, {"ms_level": None, "relative_intensity": 0, "decimals": 2})
+        self.assertEqual(peaks.labels, ["911.30", "1057.34", "1452.51"])
+        peaks = read_spectra(path, {"ms_level": None, "relative_intensity": 0})
+        self.assertEqual(peaks.labels, ["911.3012", "1057.3371", "1452.5093"])
+        self.assertEqual(len(read_spectra(path, {"ms_level": 3})), 0)
+
+    def test_read_spectra_many_scans(self):
+        # same peaks in every scan, shifted by less than rounding
+        rng = np.random.RandomState(0)
+        mz = np.array([1452.50932, 911.30123, 1057.33711])
+        path = self.write("run.mzML", mzml([
+            (f"scan={i}", 1, False, mz + rng.uniform(-0.003, 0.003, 3), np.array([1000.0, 900.0, 800.0]), True, np.float64)
+            for i in range(20)
+        ]))
+        peaks = read_spectra(path, {"decimals": 1})
+        self.assertEqual(peaks.labels, ["911.3", "1057.3", "1452.5"])
+        np.testing.assert_array_equal(peaks.masses, [911.3, 1057.3, 1452.5])
+
+    def test_read_input(self):
+        self.assertEqual(read_input(self.write("peaks.txt", "911.30\n1057.33\n")).labels, ["911.30", "1057.33"])
+        self.assertEqual(read_input(self.write("run.MGF", MGF)).labels, ["911.3012", "1057.3371", "1452.5093"])
+        with self.assertRaises(TypeError):
+            read_input(self.write("peaks.csv", "911.30\n"))
+
+    def test_worker_spectra(self):
+        peaks = read_input(self.write("run.mgf", MGF), TestSpectra.cfg.get("peak_picking"))
+        worker = GW(cfg=TestSpectra.cfg, peaks=peaks, backend="local")
+        worker._search_local()
+        text_worker = GW(cfg=TestSpectra.cfg, peaks=parse_peak_text(peaks.text), backend="local")
+        text_worker._search_local()
+        self.assertEqual(worker.parsed_data, text_worker.parsed_data)
+
+
+def mzml(spectra) -> str:
+    """mzML document of (id, ms level, profile, m/z, intensity, zlib, dtype) spectra"""
+    def array(values, accession, compressed, dtype):
+        data = np.asarray(values, dtype=dtype).astype(np.dtype(dtype).newbyteorder("<")).tobytes()
+        data = zlib.compress(data) if compressed else data
+        return (
+            f'<binaryDataArray encodedLength="0">'
+            f'<cvParam cvRef="MS" accession="{"MS:1000523" if dtype == np.float64 else "MS:1000521"}" value=""/>'
+            f'<cvParam cvRef="MS" accession="{"MS:1000574" if compressed else "MS:1000576"}" value=""/>'
+            f'<cvParam cvRef="MS" accession="{accession}" value=""/>'
+            f'<binary>{base64.b64encode(data).decode("ascii")}</binary></binaryDataArray>'
+        )
+    blocks = [
+        f'<spectrum index="{i}" id="{spectrum_id}" defaultArrayLength="{len(mz)}">'
+        f'<cvParam cvRef="MS" accession="MS:1000511" name="ms level" value="{ms_level}"/>'
+        f'<cvParam cvRef="MS" accession="{"MS:1000128" if profile else "MS:1000127"}" value=""/>'
+        f'<binaryDataArrayList count="2">{array(mz, "MS:1000514", compressed, dtype)}'
+        f'{array(intensity, "MS:1000515", compressed, dtype)}</binaryDataArrayList></spectrum>'
+        for i, (spectrum_id, ms_level, profile, mz, intensity, compressed, dtype) in enumerate(spectra)
+    ]
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<indexedmzML xmlns="http://psi.hupo.org/ms/mzml"><mzML><run id="run">'
+        f'<spectrumList count="{len(spectra)}">{"".join(blocks)}</spectrumList>'
+        '</run></mzML></indexedmzML>\n'
+    )
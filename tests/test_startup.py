@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+
+from worker import utils
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(THIS_DIR)
+# imported only by code paths that use them (see benchmarks/bench_startup.py)
+LAZY_MODULES = ("pandas", "selenium", "bs4", "arrow", "urllib3", "lxml", "html5lib", "asyncio")
+
+
+def loaded_modules(code, cwd) -> list:
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys; {code}; print(','.join(sorted(sys.modules)))"],
+        cwd=cwd, stdout=subprocess.PIPE, check=True
+    ).stdout.decode().strip()
+    return output.split(",")
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_worker_import(self):
+        loaded = loaded_modules("import worker.worker", REPO_DIR)
+        self.assertEqual([i for i in LAZY_MODULES if i in loaded], [])
+
+    def test_cli_import(self):
+        package = os.path.basename(REPO_DIR)
+        loaded = loaded_modules(f"import {package}.__main__", os.path.dirname(REPO_DIR))
+        self.assertEqual([i for i in LAZY_MODULES + ("numpy", f"{package}.worker") if i in loaded], [])
+
+    def test_help(self):
+        result = subprocess.run(
+            [sys.executable, "-m", os.path.basename(REPO_DIR), "--help"],
+            cwd=os.path.dirname(REPO_DIR), stdout=subprocess.PIPE, timeout=30
+        )
+        self.assertEqual(result.returncode, 0)
+        self.assertIn(b"--backend", result.stdout)
+
+    def test_conn_cached(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "conn_ok")
+            with open(path, "w") as f:
+                f.write("")
+            # recent successful check is reused without connecting
+            self.assertTrue(utils.check_internet_conn_cached(path=path))
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from worker.tolerance import parse_tolerance, tolerance_windows, query_tolerance
+from worker.local_search import LocalSearchEngine
+from worker.result_store import NOT_FOUND
+from worker.worker import GlycomodWorker as GW
+from .glycomod_server import StandInGlycomod
+from .test_worker import prepare_cfg
+
+
+class TestTolerance(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestTolerance, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+
+    def test_parse_tolerance(self):
+        self.assertEqual(parse_tolerance("0.5"), (0.5, 0.0))
+        self.assertEqual(parse_tolerance(0.2), (0.2, 0.0))
+        self.assertEqual(parse_tolerance("10 ppm"), (0.0, 10.0))
+        self.assertEqual(parse_tolerance("0.01 Da + 5ppm"), (0.01, 5.0))
+        for invalid in ("", "abc", "10 ppb", "-0.5", "0 ppm"):
+            with self.assertRaises(ValueError):
+                parse_tolerance(invalid)
+        np.testing.assert_allclose(tolerance_windows([1000.0, 2000.0], (0.01, 5.0)), [0.015, 0.02])
+        self.assertEqual(query_tolerance(0.0528665), "0.0529")
+        self.assertEqual(query_tolerance(0.045000000000001), "0.0450")
+
+    def test_match_ppm(self):
+        rng = np.random.RandomState(0)
+        masses = rng.uniform(900, 3000, 500)
+        for tolerance in ("0.5", "20 ppm", "0.01 Da + 20 ppm"):
+            engine = LocalSearchEngine(dict(TestTolerance.cfg, Tolerance=tolerance), reducing_end="ProA")
+            offsets, hits = engine.match(masses)
+            self.assertEqual(len(offsets), len(masses) + 1)
+            windows = tolerance_windows(masses, parse_tolerance(tolerance))
+            targets = masses - engine.derivative_mass - engine.adduct_mass
+            for i in range(len(masses)):
+                expected = np.flatnonzero(np.abs(engine.masses - targets[i]) <= windows[i])
+                self.assertEqual(hits[offsets[i]:offsets[i + 1]].tolist(), expected.tolist())
+        offsets, hits = engine.match(np.empty(0))
+        self.assertEqual((offsets.tolist(), hits.tolist()), ([0], []))
+
+    def test_worker_local_ppm(self):
+        text_input = "911.30\n1057.33"
+        results = GW(cfg=dict(TestTolerance.cfg, Tolerance="40 ppm"), text_input=text_input, backend="local").search()
+        self.assertEqual(results.composition_table[results.composition[0]][0], "(Hex)3 (HexNAc)2")
+        self.assertEqual(results.composition_table[results.composition[1]], NOT_FOUND)
+
+    def test_worker_http_ppm(self):
+        stand_in = StandInGlycomod().start()
+        try:
+            cfg = dict(TestTolerance.cfg, glycomod_link=stand_in.url, Tolerance="50 ppm")
+            results = GW(cfg=cfg, text_input="911.30\n1057.33", backend="http").search()
+        finally:
+            stand_in.stop()
+        # Glycomod gets Da tolerance of the widest window, 1057.33 * 50 ppm
+        self.assertEqual([i["Tolerance"] for i in stand_in.submissions], ["0.0529"])
+        # -0.034 is within 911.30 * 50 ppm, -0.062 is outside 1057.33 * 50 ppm
+        self.assertEqual(results.hit_offsets.tolist(), [0, 1, 2])
+        self.assertEqual(results.delta[0], -0.034)
+        self.assertEqual(results.composition_table[results.composition[1]], NOT_FOUND)
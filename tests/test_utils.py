@@ -62,6 +62,32 @@ class TestUtils(unittest.TestCase):
                 4028.708, places=2
         )
 
+    def test_calc_adducts_mono_batch(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_strings.json"), "r") as f:
+            dictionaries = [utils.string_to_dict(i) for i in json.load(f)["strings"]]
+        for reducing_end in (None, "ProA", "2-AB"):
+            names, adduct_ions = utils.calc_adducts_mono_batch(dictionaries, TestUtils.cfg, reducing_end=reducing_end)
+            self.assertEqual(names, list(TestUtils.cfg["adducts"].keys()))
+            for row, dictionary in enumerate(dictionaries):
+                expected = utils.calc_default_adducts_mono(dictionary, TestUtils.cfg, reducing_end=reducing_end)
+                self.assertEqual(dict(zip(names, adduct_ions[row].tolist())), expected)
+        names, adduct_ions = utils.calc_adducts_mono_batch([], TestUtils.cfg)
+        self.assertEqual(adduct_ions.shape, (0, len(names)))
+
+    def test_calc_adducts_batch_avg(self):
+        dictionaries = [{"(GlcNAc)": 2, "(Man)": 3}, {"(HexNAc)": 4, "(NeuAc)": 4, "(NeuGc)": 3, "(Sulph)": 1, "(Hex)": 5}]
+        for reducing_end in (None, "ProA"):
+            names, adduct_ions = utils.calc_adducts_batch(dictionaries, TestUtils.cfg, reducing_end=reducing_end, mass_type="avg")
+            self.assertEqual(names, list(TestUtils.cfg["adducts_avg"].keys()))
+            # [M+H]+ of average masses, H3O+ = H2O + H+
+            for row, dictionary in enumerate(dictionaries):
+                self.assertAlmostEqual(
+                    adduct_ions[row, names.index("H+")],
+                    utils.calc_theor_avg_mass(dictionary, TestUtils.cfg, reducing_end=reducing_end), places=3
+                )
+        with self.assertRaises(ValueError):
+            utils.calc_adducts_batch(dictionaries, TestUtils.cfg, mass_type="median")
+
     def test_validate_filename(self):
         self.assertEqual(utils.validate_filename("proper_file_name"), "proper_file_name")
         self.assertEqual(utils.validate_filename("pr0p3r_f1l3_n4m3"), "pr0p3r_f1l3_n4m3")
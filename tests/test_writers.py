@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from worker.worker import GlycomodWorker as GW
+from worker.writers import open_writer, CSVResultWriter
+from .test_result_store import PARSED_DATA
+from .test_worker import prepare_cfg
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+COL_NAMES = [f"col_{i}" for i in range(15)]
+
+
+class TestWriters(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestWriters, cls).setUpClass()
+        cls.cfg = prepare_cfg()
+        cls.cfg["col_names"] = COL_NAMES
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "results")
+        self.worker = GW(cfg=self.cfg, reducing_end="ProA", filename=self.filename)
+        self.worker.parsed_data = [list(i) for i in PARSED_DATA]
+        self.worker._create_glycan_objects()
+        self.expected = self.worker.results.to_dataframe(COL_NAMES)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_csv_same_as_pandas(self):
+        self.worker.output_table()
+        with open(self.filename + ".csv", "r") as f:
+            written = f.read()
+        self.assertEqual(written, self.expected.to_csv(index=False))
+
+    def test_csv_rows(self):
+        with open_writer("csv", self.filename, COL_NAMES) as writer:
+            self.assertIsInstance(writer, CSVResultWriter)
+            for submitted_mass in self.worker.compositions:
+                writer.write(submitted_mass)
+        self.assertEqual(writer.rows, 5)
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet(self):
+        self.worker.output_table(fmt="parquet")
+        pd.testing.assert_frame_equal(pd.read_parquet(self.filename + ".parquet"), self.expected)
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_feather(self):
+        self.worker.output_table(fmt="feather")
+        pd.testing.assert_frame_equal(pd.read_feather(self.filename + ".feather"), self.expected)
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            open_writer("xlsx", self.filename, COL_NAMES)
+        with self.assertRaises(ValueError):
+            GW(cfg=self.cfg, output_format="xlsx")
@@ -0,0 +1,126 @@
+# -*- coding: UTF-8 -*-
+import os
+import glob
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+import numpy as np
+
+from .worker import GlycomodWorker
+from .spectra import INPUT_EXTENSIONS, read_input
+
+SUMMARY_COLUMNS = ["input", "output", "masses", "matched", "structures", "seconds", "error"]
+
+# GlycomodWorker of current process, created once by _init_process and reused for every file
+_process_worker = None
+
+
+def collect_inputs(pattern) -> list:
+    """Returns sorted input files (.txt, .mzML, .mgf) from directory or glob pattern
+        ### EXAMPLE ###
+        >>>collect_inputs("study/")
+        >>>collect_inputs("study/sample_*.txt")
+    """
+    if os.path.isdir(pattern):
+        paths = [
+            i for i in glob.glob(os.path.join(pattern, "*"))
+            if os.path.splitext(i)[1].lower() in INPUT_EXTENSIONS
+        ]
+    else:
+        paths = glob.glob(pattern)
+    paths = sorted(os.path.normpath(i) for i in paths if os.path.isfile(i))
+    if not paths:
+        raise FileNotFoundError(f"No input files found: {pattern}")
+    return paths
+
+
+def output_name(path, output_dir, keep_extension=False) -> str:
+    """Results of 'sample_1.txt' are saved as '<output_dir>/sample_1_results' + extension,
+    with keep_extension as '<output_dir>/sample_1.txt_results'"""
+    name = os.path.basename(path)
+    stem = name if keep_extension else os.path.splitext(name)[0]
+    return os.path.join(output_dir, f"{stem}_results")
+
+
+def output_names(inputs, output_dir) -> list:
+    """output_name of every input. Inputs sharing a stem ('run.mzML' and 'run.mgf') keep their extension,
+    raises ValueError if results of two inputs would still be saved to the same file"""
+    stems = [os.path.splitext(os.path.basename(i))[0].lower() for i in inputs]
+    names = [output_name(path, output_dir, keep_extension=stems.count(stem) > 1) for path, stem in zip(inputs, stems)]
+    keys = [os.path.normcase(i).lower() for i in names]
+    duplicates = sorted({path for path, key in zip(inputs, keys) if keys.count(key) > 1})
+    if duplicates:
+        raise ValueError(f"Results of these inputs would overwrite each other in {output_dir}: {duplicates}")
+    return names
+
+
+def _init_process(cfg, worker_kwargs, log_level):
+    global _process_worker
+    logging.getLogger().setLevel(log_level)
+    _process_worker = GlycomodWorker(cfg, **worker_kwargs)
+    # pool processes skip atexit handlers, multiprocessing finalizers still run on exit
+    Finalize(None, _close_process, exitpriority=10)
+
+
+def _close_process():
+    global _process_worker
+    if _process_worker is not None:
+        _process_worker.close()
+        _process_worker = None
+
+
+def _run_file(path, filename) -> dict:
+    """Runs search for one input file with worker of current process, returns summary row"""
+    worker = _process_worker
+    summary = dict.fromkeys(SUMMARY_COLUMNS)
+    summary.update(input=path, output=f"{filename}.{worker.output_format}", error="")
+    start = time.perf_counter()
+    try:
+        worker.reset(peaks=read_input(path, worker.cfg.get("peak_picking")), filename=filename)
+        worker.run()
+        found = worker.results.found()
+        summary.update(
+            masses=len(worker.results),
+            matched=int(found.sum()),
+            structures=int(np.diff(worker.results.hit_offsets)[found].sum()),
+        )
+    except Exception as e:
+        logging.getLogger(name="Batch").error(f"Search failed for {path}: {e}")
+        summary.update(output="", error=str(e))
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def run_batch(cfg, inputs, output_dir=".", processes=None, summary_name="batch_summary", **worker_kwargs):
+    """Searches every input file in a pool of processes, each process reuses one GlycomodWorker
+    (browser, HTTP connection pool or local search engine) for all files it gets.
+    Every input gets its own results file in output_dir, summary of all inputs is saved
+    as <output_dir>/<summary_name>.csv and returned as DataFrame.
+        worker_kwargs -> GlycomodWorker keyword arguments (backend, reducing_end, output_format ...)
+    """
+    import pandas as pd
+    logger = logging.getLogger(name="Batch")
+    filenames = output_names(inputs, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    processes = max(1, min(processes or os.cpu_count() or 1, len(inputs)))
+    worker_kwargs.setdefault("keep_browser", True)
+    log_level = logging.getLogger().getEffectiveLevel()
+    logger.info(f"Searching {len(inputs)} files in {processes} processes")
+    if processes == 1:
+        _init_process(cfg, worker_kwargs, log_level)
+        try:
+            rows = [_run_file(path, filename) for path, filename in zip(inputs, filenames)]
+        finally:
+            _close_process()
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_process, initargs=(cfg, worker_kwargs, log_level)
+        ) as executor:
+            rows = list(executor.map(_run_file, inputs, filenames))
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    summary.to_csv(os.path.join(output_dir, f"{summary_name}.csv"), index=False)
+    failed = int((summary["error"] != "").sum())
+    logger.info(f"Batch finished: {len(inputs) - failed} files searched, {failed} failed")
+    return summary
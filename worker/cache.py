@@ -0,0 +1,113 @@
+# -*- coding: UTF-8 -*-
+import os
+import json
+import time
+import sqlite3
+import logging
+
+from .utils import config_checksum
+
+DEFAULT_MAX_ENTRIES = 200000
+
+
+def user_cache_dir() -> str:
+    """Per-user cache directory: %LOCALAPPDATA%\\GlycomodWorker on Windows, $XDG_CACHE_HOME/GlycomodWorker
+    (~/.cache/GlycomodWorker) elsewhere"""
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        root = os.environ["LOCALAPPDATA"]
+    else:
+        root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "GlycomodWorker")
+
+
+def cache_path_from_cfg(cfg) -> str:
+    """config.json/"cache"/"path", results_cache.sqlite in user_cache_dir() if null"""
+    path = cfg.get("cache", {}).get("path", "null")
+    if path == "null":
+        return os.path.join(user_cache_dir(), "results_cache.sqlite")
+    return os.path.abspath(path)
+
+
+class ResultCache:
+    """Persistent SQLite cache of per-mass search results.
+
+    Results are stored as result lines (same as GlycomodWorker.parsed_data elements) under key
+    made of experimental mass rounded to prec decimals and checksum of search settings
+    (Tolerance, reducing end tag, derivative mass, default_mono, default_occurrences, checksum of mass sections ...).
+    When cache grows over max_entries, least recently used entries are evicted.
+    """
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, prec=4):
+        self.logger = logging.getLogger(name="ResultCache")
+        self.path = path
+        self.max_entries = max_entries
+        self.prec = prec
+        self.hits = 0
+        self.misses = 0
+        # worker (and its cache) can be created in one thread and used in another (see daemon.WorkerPool),
+        # it is never used by two threads at once
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, lines TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.conn.commit()
+
+    @classmethod
+    def from_config(cls, cfg):
+        cache_cfg = cfg.get("cache", {})
+        return cls(cache_path_from_cfg(cfg), max_entries=int(cache_cfg.get("max_entries", DEFAULT_MAX_ENTRIES)))
+
+    @staticmethod
+    def settings_checksum(settings) -> str:
+        return config_checksum(settings, sorted(settings))
+
+    def _key(self, mass, checksum) -> str:
+        return f"{round(float(mass), self.prec):.{self.prec}f}|{checksum}"
+
+    def get_many(self, masses, settings) -> dict:
+        """Returns {mass: result lines} for cached masses, 'User mass' line is set to requested mass string"""
+        checksum = self.settings_checksum(settings)
+        keys = {self._key(i, checksum): i for i in masses}
+        found = {}
+        key_list = list(keys)
+        # stay under SQLite's limit of bound parameters
+        for start in range(0, len(key_list), 500):
+            batch = key_list[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, lines FROM results WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, lines in rows:
+                found[key] = json.loads(lines)
+        now = time.time()
+        self.conn.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(now, i) for i in found])
+        self.conn.commit()
+        results = {}
+        for key, mass in keys.items():
+            if key in found:
+                results[mass] = [f"User mass: {mass}"] + found[key][1:]
+        self.hits += sum(1 for i in masses if i in results)
+        self.misses += sum(1 for i in masses if i not in results)
+        return results
+
+    def put_many(self, results, settings):
+        """Stores {mass: result lines} and evicts least recently used entries over max_entries"""
+        checksum = self.settings_checksum(settings)
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results (key, lines, last_used) VALUES (?, ?, ?)",
+            [(self._key(mass, checksum), json.dumps(lines), now) for mass, lines in results.items()]
+        )
+        excess = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self.logger.debug(f"Evicted {excess} cached results")
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
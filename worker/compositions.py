@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple, Mapping, Tuple
+
+from .utils import string_to_dict, truncated_str_from_dict
+
+# distinct long notations remembered by parse_composition, searches repeat a few hundred of them
+COMPOSITION_CACHE_SIZE = 8192
+
+
+class Composition(NamedTuple):
+    """Parsed Glycomod composition, one shared object for every hit of the same long notation (see parse_composition)
+        long_notation -> "(Hex)3 (HexNAc)2 (Deoxyhexose)1"
+        short_notation -> "H3N2F1"
+        residues, counts -> ("(Hex)", "(HexNAc)", "(Deoxyhexose)"), (3, 2, 1)
+        dictionary -> read-only {residue: count}, same as utils.string_to_dict, used by mass helpers
+        notation -> (long_notation, short_notation), entry of ResultStore.composition_table
+    """
+    long_notation: str
+    short_notation: str
+    residues: Tuple[str, ...]
+    counts: Tuple[int, ...]
+    dictionary: Mapping[str, int]
+    notation: Tuple[str, str]
+
+
+@lru_cache(maxsize=COMPOSITION_CACHE_SIZE)
+def parse_composition(long_notation) -> Composition:
+    """Parses long notation once, repeated compositions get the same interned Composition.
+        ### EXAMPLE ###
+        >>>parse_composition("(Hex)3 (HexNAc)2").short_notation
+        >>>"H3N2"
+        >>>parse_composition("(Hex)3 (HexNAc)2") is parse_composition("(Hex)3 (HexNAc)2")
+        >>>True
+    """
+    dictionary = string_to_dict(long_notation)
+    long_notation = sys.intern(long_notation)
+    short_notation = sys.intern(truncated_str_from_dict(dictionary))
+    return Composition(
+        long_notation=long_notation,
+        short_notation=short_notation,
+        residues=tuple(dictionary),
+        counts=tuple(dictionary.values()),
+        dictionary=MappingProxyType(dictionary),
+        notation=(long_notation, short_notation),
+    )
+
+
+def composition_cache_info() -> dict:
+    """Statistics of parse_composition cache: hits, misses, maxsize, currsize"""
+    return parse_composition.cache_info()._asdict()
+
+
+def clear_composition_cache():
+    parse_composition.cache_clear()
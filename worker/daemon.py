@@ -0,0 +1,359 @@
+# -*- coding: UTF-8 -*-
+import io
+import os
+import json
+import stat
+import socket
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .worker import GlycomodWorker
+from .writers import CSVResultWriter, ArrowResultWriter
+from .peaklist import parse_peak_text
+from .compositions import composition_cache_info
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+RESPONSE_FORMATS = ("json", "csv", "parquet", "feather")
+CONTENT_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/octet-stream",
+    "feather": "application/octet-stream",
+}
+# config.json sections jobs can override
+CONFIG_OVERRIDES = ("Tolerance", "default_mono", "default_occurrences")
+
+
+def parse_address(address):
+    """Returns ("unix", path) for 'unix:/path/to/socket' or ("tcp", (host, port)) for 'host:port'"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid daemon address '{address}', expected 'host:port' or 'unix:/path/to/socket'")
+    return "tcp", (host, int(port))
+
+
+def merge_config(cfg, overrides) -> dict:
+    """Returns copy of cfg with overrides applied, dictionary sections are updated key by key"""
+    merged = dict(cfg)
+    for key, value in (overrides or {}).items():
+        if key not in CONFIG_OVERRIDES:
+            raise ValueError(f"Config section '{key}' can not be overridden. Allowed: {list(CONFIG_OVERRIDES)}")
+        merged[key] = dict(cfg[key], **value) if isinstance(cfg.get(key), dict) else value
+    return merged
+
+
+class WorkerPool:
+    """Pool of warm GlycomodWorker objects shared by daemon jobs.
+
+    Workers are kept per search settings (reducing end tag and config overrides) and reused, so
+    browser sessions, HTTP connections and local search engines are started once, not for every job.
+    At most size jobs run at once, other jobs wait for a free worker.
+    Idle workers over max_idle are closed, least recently used settings first.
+    """
+    def __init__(self, cfg, size=2, max_idle=None, **worker_kwargs):
+        self.logger = logging.getLogger(name="WorkerPool")
+        self.cfg = cfg
+        self.size = size
+        self.max_idle = max_idle or 2*size
+        self.worker_kwargs = dict(worker_kwargs)
+        self.worker_kwargs.setdefault("keep_browser", True)
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.idle = OrderedDict()
+        self.jobs = 0
+        self.created = 0
+
+    @staticmethod
+    def _key(tag, overrides) -> str:
+        return json.dumps([tag, overrides or {}], sort_keys=True)
+
+    def _create(self, tag, overrides) -> GlycomodWorker:
+        worker = GlycomodWorker(merge_config(self.cfg, overrides), reducing_end=tag, **self.worker_kwargs)
+        with self.lock:
+            self.created += 1
+        return worker
+
+    @staticmethod
+    def warm(worker):
+        """Starts backend of worker: local search engine, Glycomod form over HTTP or browser"""
+        if worker.backend == "local":
+            worker._get_engine()
+        elif worker.backend == "http":
+            worker._get_http_client()._load_form()
+        else:
+            worker._release_driver(worker._get_driver())
+
+    def start(self):
+        """Starts size workers with default settings"""
+        for _ in range(self.size):
+            worker = self._create(None, None)
+            self.warm(worker)
+            self._release(self._key(None, None), worker)
+        self.logger.info(f"Started {self.size} {self.worker_kwargs.get('backend', 'selenium')} workers")
+
+    def _release(self, key, worker):
+        evicted = []
+        with self.lock:
+            self.idle.setdefault(key, []).append(worker)
+            self.idle.move_to_end(key)
+            while sum(len(i) for i in self.idle.values()) > self.max_idle:
+                oldest = next(iter(self.idle))
+                evicted.append(self.idle[oldest].pop(0))
+                if not self.idle[oldest]:
+                    del self.idle[oldest]
+        for i in evicted:
+            i.close()
+
+    @contextmanager
+    def worker(self, tag=None, overrides=None):
+        """Worker for tag and config overrides, returned to pool after use
+            ### EXAMPLE ###
+            >>>with pool.worker("ProA", {"Tolerance": "0.2"}) as worker:
+            >>>    worker.reset(text_input="911.30")
+            >>>    results = worker.search()
+        """
+        key = self._key(tag, overrides)
+        with self.slots:
+            with self.lock:
+                self.jobs += 1
+                workers = self.idle.get(key)
+                worker = workers.pop() if workers else None
+            if worker is None:
+                worker = self._create(tag, overrides)
+            try:
+                yield worker
+            finally:
+                self._release(key, worker)
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "backend": self.worker_kwargs.get("backend", "selenium"),
+                "size": self.size,
+                "jobs": self.jobs,
+                "workers_created": self.created,
+                "idle_workers": sum(len(i) for i in self.idle.values()),
+                "composition_cache": composition_cache_info(),
+            }
+
+    def close(self):
+        with self.lock:
+            workers = [i for idle in self.idle.values() for i in idle]
+            self.idle.clear()
+        for worker in workers:
+            worker.close()
+
+
+def render_results(results, col_names, fmt) -> bytes:
+    """Results as JSON columns ({"columns": [...], "data": {column: values}}), .csv, .parquet or .feather"""
+    if fmt == "json":
+        return json.dumps({
+            "masses": len(results),
+            "hits": results.n_hits,
+            "columns": list(col_names),
+            "data": results.to_columns(col_names),
+        }).encode("utf-8")
+    if fmt == "csv":
+        output = io.StringIO()
+        with CSVResultWriter(output, col_names) as writer:
+            for submitted_mass in results.iter_submitted():
+                writer.write(submitted_mass)
+        return output.getvalue().encode("utf-8")
+    if fmt in ("parquet", "feather"):
+        output = io.BytesIO()
+        with ArrowResultWriter(output, col_names, fmt=fmt) as writer:
+            for submitted_mass in results.iter_submitted():
+                writer.write(submitted_mass)
+        return output.getvalue()
+    raise ValueError(f"Unsupported format: {fmt}. Supported: {list(RESPONSE_FORMATS)}")
+
+
+def run_job(pool, job) -> bytes:
+    """Runs search job and returns rendered results
+        job -> {"masses": [...] or newline separated string, "tag": "ProA", "config": {"Tolerance": "0.2"}, "format": "csv"}
+    """
+    masses = job.get("masses")
+    text_input = "\n".join(str(i) for i in masses) if isinstance(masses, list) else str(masses or "")
+    peaks = parse_peak_text(text_input)
+    if not len(peaks):
+        raise ValueError("Job contains no masses")
+    fmt = job.get("format", "json")
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}. Supported: {list(RESPONSE_FORMATS)}")
+    with pool.worker(job.get("tag"), job.get("config")) as worker:
+        worker.reset(peaks=peaks)
+        results = worker.search()
+        col_names = worker.cfg["col_names"]
+    return render_results(results, col_names, fmt)
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """POST /search runs job (see run_job), GET /status returns pool status"""
+    pool = None
+
+    def log_message(self, format, *args):
+        logging.getLogger(name="Daemon").debug(format % args)
+
+    def _respond(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._respond(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._respond(200, json.dumps(self.pool.status()).encode("utf-8"))
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        if self.path != "/search":
+            self._error(404, f"Unknown path {self.path}")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length).decode("utf-8"))
+            body = run_job(self.pool, job)
+        except (ValueError, KeyError, TypeError) as e:
+            self._error(400, str(e))
+            return
+        except Exception as e:
+            logging.getLogger(name="Daemon").exception("Job failed")
+            self._error(500, f"{type(e).__name__}: {e}")
+            return
+        self._respond(200, body, CONTENT_TYPES[job.get("format", "json")])
+
+
+if hasattr(socket, "AF_UNIX"):
+    from socketserver import ThreadingUnixStreamServer
+
+    class UnixHTTPServer(ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def get_request(self):
+            # BaseHTTPRequestHandler expects (host, port) client address
+            request, _ = super().get_request()
+            return request, ("unix", 0)
+else:
+    UnixHTTPServer = None
+
+
+def _remove_stale_socket(path):
+    """Removes socket left by daemon which is no longer running, anything else at path is left alone"""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket, choose another daemon address")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"Daemon is already listening on {path}")
+
+
+def _remove_own_socket(server):
+    """Removes socket file created by server, if it was not replaced in the meantime"""
+    path, created = getattr(server, "socket_file", (None, None))
+    try:
+        if path is not None and os.path.samestat(os.stat(path), created):
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def make_server(address, pool):
+    """HTTP server for daemon on 'host:port' or 'unix:/path/to/socket'.
+    Raises FileExistsError if something else than socket exists at socket path."""
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {"pool": pool})
+    family, target = parse_address(address)
+    if family == "unix":
+        if UnixHTTPServer is None:
+            raise EnvironmentError("Unix sockets are not supported on this system")
+        _remove_stale_socket(target)
+        server = UnixHTTPServer(target, handler)
+        server.socket_file = (target, os.stat(target))
+        return server
+    server = ThreadingHTTPServer(target, handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(cfg, address=DEFAULT_ADDRESS, size=2, **worker_kwargs):
+    """Runs daemon until interrupted (Ctrl+C)"""
+    logger = logging.getLogger(name="Daemon")
+    pool = WorkerPool(cfg, size=size, **worker_kwargs)
+    pool.start()
+    server = make_server(address, pool)
+    logger.info(f"GlycomodWorker daemon listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping daemon")
+    finally:
+        server.server_close()
+        pool.close()
+        _remove_own_socket(server)
+
+
+class UnixHTTPConnection(HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def _connection(address, timeout):
+    family, target = parse_address(address)
+    if family == "unix":
+        return UnixHTTPConnection(target, timeout=timeout)
+    return HTTPConnection(*target, timeout=timeout)
+
+
+def query(address, masses, tag=None, config=None, fmt="json", timeout=600.0):
+    """Sends search job to running daemon. Returns dict for "json" format, otherwise file contents as bytes
+        ### EXAMPLE ###
+        >>>query("127.0.0.1:8765", ["911.30", "1057.33"], tag="ProA", fmt="csv")
+    """
+    job = {"masses": masses, "tag": tag, "config": config or {}, "format": fmt}
+    conn = _connection(address, timeout)
+    try:
+        conn.request("POST", "/search", body=json.dumps(job).encode("utf-8"), headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        body = response.read()
+    finally:
+        conn.close()
+    if response.status == 400:
+        raise ValueError(json.loads(body.decode("utf-8"))["error"])
+    if response.status != 200:
+        raise ConnectionError(f"Daemon responded with HTTP {response.status}: {body.decode('utf-8', errors='replace')}")
+    return json.loads(body.decode("utf-8")) if fmt == "json" else body
+
+
+def daemon_status(address, timeout=10.0) -> dict:
+    conn = _connection(address, timeout)
+    try:
+        conn.request("GET", "/status")
+        response = conn.getresponse()
+        return json.loads(response.read().decode("utf-8"))
+    finally:
+        conn.close()
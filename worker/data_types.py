@@ -33,8 +33,8 @@ class SubmittedMass(NamedTuple):
             f"Reducing end: {self.red_end_tag} ({self.red_end_tag_mass})\n" + \
             f"Compositions: {len(self.glycomod_structures)}\n"
 
-    def prep_csv_out(self):
-        """Prepare tuples used for outputing as csv"""
+    def prep_csv_out(self, adduct=False):
+        """Prepare tuples used for outputing as csv, with adduct the adduct name is added as last column"""
         structure_list = []
         if len(self.glycomod_structures) > 0:
             for i in self.glycomod_structures:
@@ -58,6 +58,6 @@ class SubmittedMass(NamedTuple):
                         i.theoretical_MTagHNa,
                         i.theoretical_MTagHK,
                         i.theoretical_MTagNa2,
-                    )
+                    ) + ((self.adduct,) if adduct else ())
                 )
         return structure_list
@@ -0,0 +1,88 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+
+from .result_store import ResultStore
+from .tolerance import QUERY_DECIMALS, query_tolerance
+
+
+class MassClusters:
+    """MassClusters collapses near-duplicate masses (replicate picks, isotope-adjacent entries ...)
+    into query windows, so every window is searched once instead of every mass.
+
+    Sorted masses are grouped greedily: a window starts at the smallest remaining mass and takes every
+    mass up to width above it. Window is queried at its midpoint with tolerance widened by
+    half of the widest window (query_tolerance), so the query covers +-tolerance around every mass in it.
+    fan_out() gives every original mass the hits within tolerance of it, with delta shifted by
+    (mass - query mass). Glycomod reports deltas with 3 decimals, so hits less than 0.0005 Da
+    from the tolerance limit can be kept or left out differently than in a search of single mass.
+
+        ### EXAMPLE ###
+        >>>clusters = MassClusters(peaks.masses, peaks.labels, width=0.1)
+        >>>clusters.query_labels, clusters.query_tolerance(0.5)
+        >>>results = clusters.fan_out(query_results, tolerance=0.5)
+    """
+    def __init__(self, masses, labels, width):
+        masses = np.asarray(masses, dtype=np.float64)
+        self.masses = masses
+        self.labels = list(labels)
+        order = np.argsort(masses, kind="stable")
+        sorted_masses = masses[order]
+        starts = self._window_starts(sorted_masses, width)
+        ends = np.append(starts[1:], len(masses))[:len(starts)]
+        self.cluster = np.empty(len(masses), dtype=np.int64)
+        self.cluster[order] = np.repeat(np.arange(len(starts)), ends - starts)
+        lowest, highest = sorted_masses[starts], sorted_masses[ends - 1]
+        # windows of one distinct mass are queried with mass as written in input
+        self.query_labels = [
+            self.labels[order[start]] if low == high else f"{(low + high) / 2:.{QUERY_DECIMALS}f}"
+            for start, low, high in zip(starts.tolist(), lowest.tolist(), highest.tolist())
+        ]
+        self.query_masses = np.array(self.query_labels, dtype=np.float64)
+        spread = np.maximum(self.query_masses - lowest, highest - self.query_masses)
+        self.half_width = float(spread.max()) if len(spread) else 0.0
+
+    @staticmethod
+    def _window_starts(sorted_masses, width):
+        """Indices of first mass of every window in sorted_masses"""
+        if not len(sorted_masses):
+            return np.empty(0, dtype=np.int64)
+        # chains of masses closer than width to their neighbour, only chains wider than width are split further
+        breaks = np.flatnonzero(np.diff(sorted_masses) > width) + 1
+        chain_starts = np.concatenate(([0], breaks))
+        chain_ends = np.append(breaks, len(sorted_masses))
+        starts = [chain_starts]
+        for start, end in zip(chain_starts.tolist(), chain_ends.tolist()):
+            if sorted_masses[end - 1] - sorted_masses[start] <= width:
+                continue
+            split = []
+            while True:
+                start = int(np.searchsorted(sorted_masses[:end], sorted_masses[start] + width, side="right"))
+                if start >= end:
+                    break
+                split.append(start)
+            starts.append(np.array(split, dtype=np.int64))
+        return np.unique(np.concatenate(starts)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.query_labels)
+
+    def query_tolerance(self, tolerance) -> str:
+        """Da tolerance for window queries, rounded up so no hit within tolerance (widest window, Da)
+        of any mass is missed"""
+        return query_tolerance(float(tolerance) + self.half_width)
+
+    def fan_out(self, store, tolerance) -> ResultStore:
+        """Returns results for every original mass from store of window query results (one mass per window).
+        tolerance is Da, single value or tolerance window of every mass (see tolerance.tolerance_windows)."""
+        if len(store) != len(self):
+            raise ValueError(f"Got results for {len(store)} of {len(self)} query windows")
+        n_masses = len(self.masses)
+        counts = np.diff(store.hit_offsets)[self.cluster]
+        owner = np.repeat(np.arange(n_masses), counts)
+        # hit rows of every window, repeated for every mass in window
+        first_hit = np.repeat(store.hit_offsets[:-1][self.cluster] - np.cumsum(counts) + counts, counts)
+        hit = first_hit + np.arange(len(owner))
+        delta = store.delta[hit] + (self.masses - self.query_masses[self.cluster])[owner]
+        tolerance = np.broadcast_to(np.asarray(tolerance, dtype=np.float64), self.masses.shape)
+        keep = ~np.isin(store.composition[hit], store.not_found_ids()) & (np.abs(delta) <= tolerance[owner])
+        return store.select_hits(self.cluster, self.labels, owner[keep], hit[keep], np.round(delta[keep], 3))
@@ -0,0 +1,78 @@
+# -*- coding: UTF-8 -*-
+import re
+
+import lxml.html
+
+# type and link columns of result rows, removed from result lines
+ROW_ANNOTATIONS = re.compile(r"high_manUniCarbKB|hybrid/complexUniCarbKB| -UniCarbKB|high_man|hybrid/complex|paucimannose| -")
+
+
+def parse_gm_soup(soup) -> list:
+    """Parses Glycomod result page for relevant data about glycan compositions.
+    Returns list of result lines for every submitted mass."""
+    items = []
+    glycans_list = []
+    for hr in soup.find_all("hr"):
+        for item in hr.find_next_siblings():
+            if item.name == 'hr':
+                break
+            items.append(item.text)
+    # this is a bit silly but I do not want to use regexes
+    clean_text = ''.join(items).replace(u'\nglycoform mass\nΔmass (Dalton)\nstructure\ntype\nLinks', "")\
+        .replace("high_manUniCarbKB", "").replace("hybrid/complexUniCarbKB", "").\
+        replace(" -UniCarbKB", "").replace("high_man", "").replace("hybrid/complex", "").\
+        replace("paucimannose", "").\
+        replace(" -", "").\
+        replace("\n\n\n\nSIB Swiss Institute of Bioinformatics | Disclaimer", "").\
+        replace("Back to the Top\n\n", "")
+    unprocessed_strings = clean_text.split(' found.', clean_text.count('found.')-1)
+    for i in unprocessed_strings:
+        ll = i.split("\n")
+        ll2 = []
+        for j in range(len(ll)):
+            if len(ll[j]) > 1:
+                ll2.append(ll[j])
+        glycans_list.append(ll2)           
+    return glycans_list
+
+
+def _text_lines(text) -> list:
+    return [i for i in text.split("\n") if len(i) > 1]
+
+
+def parse_gm_html(html) -> list:
+    """Fast parser for Glycomod result page, gives the same result as parse_gm_soup.
+
+    Page is parsed with lxml and every result block (elements between two <hr>) is read in one pass:
+        <h3> -> 'User mass', 'Adduct' and 'Derivative mass' lines
+        <tr> with <td> -> one line per composition, type and link columns removed
+        <p> -> 'N structures found.' line
+    As in parse_gm_soup, ' found.' is kept only in the last block."""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8")
+    root = lxml.html.document_fromstring(html)
+    glycans_list = []
+    for hr in root.iter("hr"):
+        lines = []
+        for element in hr.itersiblings():
+            if not isinstance(element.tag, str):
+                # comments and processing instructions
+                continue
+            if element.tag == "hr":
+                break
+            if element.tag == "table":
+                for row in element.iter("tr"):
+                    cells = [i for i in row if i.tag == "td"]
+                    if cells:
+                        line = ROW_ANNOTATIONS.sub("", "".join(i.text_content() for i in cells))
+                        if len(line) > 1:
+                            lines.append(line)
+            else:
+                lines.extend(_text_lines(element.text_content()))
+        glycans_list.append(lines)
+    if not glycans_list:
+        return [[]]
+    for lines in glycans_list[:-1]:
+        if lines and lines[-1].endswith(" found."):
+            lines[-1] = lines[-1][:-len(" found.")]
+    return glycans_list
@@ -0,0 +1,142 @@
+# -*- coding: UTF-8 -*-
+import logging
+from urllib.parse import urljoin
+
+import urllib3
+from bs4 import BeautifulSoup
+
+PRESENCE_TEXT = {2: "yes", 1: "possible", 0: "no"}
+# visible text of Glycomod mass value options
+MASS_TYPE_TEXT = {"mono": "monoisotopic", "avg": "average"}
+
+
+class GlycomodHTTPClient:
+    """GlycomodHTTPClient submits Glycomod form over plain HTTP, without a browser.
+
+    Form page is loaded once per client to find form action and values of <select> options,
+    so fields can be filled by visible text, same as with Selenium.
+    Connections are kept in urllib3 pool and reused between submissions.
+    """
+    def __init__(self, form_url, timeout=120.0, retries=3, maxsize=4):
+        self.logger = logging.getLogger(name="HTTPClient")
+        self.form_url = form_url
+        self.http = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=maxsize,
+            block=True,
+            timeout=urllib3.Timeout(connect=10.0, read=timeout),
+            retries=urllib3.Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+        )
+        self.action = None
+        self.method = "POST"
+        self.defaults = {}
+        self.options = {}
+        self.radios = {}
+
+    def _decode(self, response) -> str:
+        if response.status != 200:
+            raise ConnectionError(f"Glycomod responded with HTTP {response.status}")
+        content_type = response.headers.get("Content-Type", "")
+        charset = "utf-8"
+        if "charset=" in content_type:
+            charset = content_type.split("charset=")[-1].split(";")[0].strip()
+        return response.data.decode(charset, errors="replace")
+
+    def _load_form(self):
+        """Loads Glycomod form page and stores form action, default field values and <select> options"""
+        response = self.http.request("GET", self.form_url)
+        soup = BeautifulSoup(self._decode(response), 'html5lib')
+        masses = soup.find("textarea", attrs={"name": "Masses"})
+        if masses is None:
+            raise ValueError(f"No Glycomod form found at {self.form_url}")
+        form = masses.find_parent("form")
+        self.action = urljoin(self.form_url, form.get("action") or self.form_url)
+        self.method = (form.get("method") or "POST").upper()
+        defaults = {}
+        for element in form.find_all("input"):
+            name = element.get("name")
+            input_type = (element.get("type") or "text").lower()
+            if not name or input_type in ("submit", "reset", "button", "image"):
+                continue
+            if input_type == "radio":
+                self.radios.setdefault(name, []).append(element.get("value", ""))
+            if input_type in ("checkbox", "radio") and not element.has_attr("checked"):
+                continue
+            defaults[name] = element.get("value", "")
+        for element in form.find_all("textarea"):
+            if element.get("name"):
+                defaults[element["name"]] = element.text
+        for element in form.find_all("select"):
+            name = element.get("name")
+            if not name:
+                continue
+            options = element.find_all("option")
+            self.options[name] = {i.text.strip(): i.get("value", i.text.strip()) for i in options}
+            selected = [i for i in options if i.has_attr("selected")] or options[:1]
+            if selected:
+                defaults[name] = selected[0].get("value", selected[0].text.strip())
+        submit = form.find("input", attrs={"value": "Start GlycoMod"})
+        if submit is not None and submit.get("name"):
+            defaults[submit["name"]] = submit["value"]
+        self.defaults = defaults
+        self.logger.debug(f"Loaded Glycomod form, action: {self.action}")
+
+    def _select(self, name, visible_text) -> str:
+        try:
+            return self.options[name][visible_text]
+        except KeyError:
+            raise ValueError(f"Glycomod form has no option '{visible_text}' for '{name}'")
+
+    def _mass_type_field(self, mass_type):
+        """Returns (field name, value) selecting monoisotopic or average masses, None if form has no such field.
+        Field is found by option text or radio value ('monoisotopic'/'average'), not by name."""
+        text = MASS_TYPE_TEXT[mass_type]
+        for name, options in self.options.items():
+            for visible_text, value in options.items():
+                if visible_text.lower() == text:
+                    return name, value
+        for name, values in self.radios.items():
+            for value in values:
+                if value.lower() == text:
+                    return name, value
+        return None
+
+    def fill_form(self, cfg, text_input, reducing_end_tag=None, derivative_mass=0.0, mass_type="mono") -> dict:
+        """Returns Glycomod form fields, filled the same way as GlycomodWorker fills them with Selenium"""
+        if self.action is None:
+            self._load_form()
+        if not text_input:
+            raise ValueError("FATAL! No data provided for fetching html")
+        fields = dict(self.defaults)
+        fields["Tolerance"] = str(cfg.get("Tolerance", "0.5"))
+        fields["Masses"] = text_input
+        if reducing_end_tag:
+            fields["Nform"] = self._select("Nform", "Derivatised oligosaccharides")
+            fields["derivative_name"] = reducing_end_tag
+            fields["derivative_mass"] = str(derivative_mass)
+        else:
+            fields["Nform"] = self._select("Nform", "Free / PNGase released oligosaccharides")
+        for option, value in cfg["default_mono"].items():
+            fields[option] = self._select(option, PRESENCE_TEXT.get(value, "no"))
+        for option, value in cfg["default_occurrences"].items():
+            fields[option] = str(value)
+        mass_type_field = self._mass_type_field(mass_type)
+        if mass_type_field is not None:
+            fields[mass_type_field[0]] = mass_type_field[1]
+        elif mass_type != "mono":
+            # monoisotopic masses are Glycomod default
+            raise ValueError(f"Glycomod form has no '{MASS_TYPE_TEXT[mass_type]}' mass option")
+        return fields
+
+    def submit(self, fields) -> str:
+        """Submits filled form and returns Glycomod result HTML"""
+        if self.action is None:
+            self._load_form()
+        if self.method == "GET":
+            response = self.http.request("GET", self.action, fields=fields)
+        else:
+            response = self.http.request("POST", self.action, fields=fields, encode_multipart=False)
+        return self._decode(response)
+
+    def close(self):
+        self.http.clear()
@@ -0,0 +1,92 @@
+# -*- coding: UTF-8 -*-
+import os
+import json
+import hashlib
+import logging
+
+
+def input_checksum(masses) -> str:
+    """Returns sha256 hex digest of submitted masses"""
+    return hashlib.sha256("\n".join(masses).encode("utf-8")).hexdigest()
+
+
+class RunJournal:
+    """Append-only journal of completed chunks of a search, used to resume interrupted runs.
+
+    Journal is a JSON lines file. First line describes the run, every next line holds
+    results of one completed chunk (same as GlycomodWorker.parsed_data elements):
+        {"input": <sha256 of masses>, "settings": <sha256 of search settings>, "chunk_size": 100}
+        {"chunk": 3, "results": [["User mass: 911.30", ...], ...]}
+    Chunks are written in order of completion and flushed to disk, so a crash loses at most
+    the chunk being written. Torn last line is dropped when journal is opened again.
+
+    When input, settings or chunk size differ from the journal, it was written for another run
+    and is started over.
+        ### EXAMPLE ###
+        >>>journal = RunJournal("test.txt.journal", {"input": ..., "settings": ..., "chunk_size": 100})
+        >>>done = journal.open()
+        >>>journal.append(3, parsed_chunk)
+    """
+    def __init__(self, path, header):
+        self.logger = logging.getLogger(name="RunJournal")
+        self.path = path
+        self.header = header
+        self.file = None
+
+    def _read(self) -> dict:
+        """Returns {chunk number: results} of matching journal, None if there is no usable journal"""
+        done = {}
+        valid_size = 0
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f):
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("line is not complete")
+                    entry = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    self.logger.warning(f"Dropping incomplete journal entry on line {number + 1}: {self.path}")
+                    break
+                if number == 0:
+                    if entry != self.header:
+                        changed = [key for key in self.header if entry.get(key) != self.header[key]]
+                        self.logger.warning(f"Journal {self.path} was written for different {', '.join(changed)}, starting over")
+                        return None
+                else:
+                    done[entry["chunk"]] = entry["results"]
+                valid_size += len(line)
+        if not valid_size:
+            return None
+        with open(self.path, "r+b") as f:
+            f.truncate(valid_size)
+        return done
+
+    def open(self) -> dict:
+        """Opens journal for appending, returns {chunk number: results} of chunks completed before"""
+        done = self._read() if os.path.exists(self.path) else None
+        if done is None:
+            self.file = open(self.path, "w", encoding="utf-8")
+            self._write(self.header)
+            return {}
+        self.file = open(self.path, "a", encoding="utf-8")
+        if done:
+            self.logger.info(f"Resuming from journal {self.path}: {len(done)} chunks done")
+        return done
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def append(self, chunk, results):
+        self._write({"chunk": chunk, "results": results})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """Deletes journal once run is complete and output is written"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,226 @@
+# -*- coding: UTF-8 -*-
+import logging
+
+import numpy as np
+
+from .tolerance import parse_tolerance, tolerance_windows
+
+# order in which Glycomod lists monosaccharides in a composition
+GLYCOMOD_RESIDUE_ORDER = [
+    "Hex", "HexNAc", "Deoxyhexose", "NeuAc", "NeuGc", "KDN", "Pent", "Phos", "Sulph", "HexA"
+]
+
+
+def format_gm_number(number, prec=3) -> str:
+    """Formats number the way Glycomod prints masses and deltas
+        ### EXAMPLE ###
+        >>>format_gm_number(1434.50012)
+        >>>"1434.5"
+    """
+    formatted = f"{number:.{prec}f}".rstrip("0")
+    if formatted.endswith("."):
+        formatted = formatted + "0"
+    return formatted
+
+
+def search_space_from_cfg(cfg):
+    """Returns (residues, min_counts) for monosaccharides allowed by config.json/"default_mono"
+    and config.json/"default_occurrences". Residues are ordered as in Glycomod output.
+        2 -> "yes" -> at least 1 (or "<name>nb1") residue
+        1 -> "possible" -> 0 or more residues
+        0 -> "no" -> residue is left out of the search space"""
+    presence = {option[:-len("pres")]: value for option, value in cfg["default_mono"].items()}
+    occurrences = {option[:-len("nb1")]: int(value) for option, value in cfg.get("default_occurrences", {}).items()}
+    residues = []
+    min_counts = []
+    for name in GLYCOMOD_RESIDUE_ORDER:
+        value = presence.get(name, 0)
+        if value == 0:
+            continue
+        residues.append(name)
+        min_counts.append(max(1, occurrences.get(name, 1)) if value == 2 else 0)
+    return residues, min_counts
+
+
+def enumerate_compositions(residue_masses, min_counts, max_mass):
+    """Enumerates all compositions with residue mass <= max_mass.
+    Returns (masses, counts) sorted by mass; counts has one column per residue."""
+    residue_masses = np.asarray(residue_masses, dtype=np.float64)
+    base_counts = np.asarray(min_counts, dtype=np.int64)
+    base_mass = float(base_counts @ residue_masses)
+    if base_mass > max_mass:
+        return np.empty(0, dtype=np.float64), np.empty((0, len(residue_masses)), dtype=np.uint8)
+    max_count = int((base_counts.max() if len(base_counts) else 0) + max_mass // residue_masses.min()) if len(residue_masses) else 0
+    count_dtype = np.uint8 if max_count <= np.iinfo(np.uint8).max else np.uint16
+
+    masses = np.array([base_mass])
+    counts = base_counts.astype(count_dtype).reshape(1, -1)
+    for i, residue_mass in enumerate(residue_masses):
+        mass_blocks, count_blocks = [masses], [counts]
+        k = 1
+        while True:
+            selected = masses + k*residue_mass <= max_mass
+            if not selected.any():
+                break
+            added = counts[selected].copy()
+            added[:, i] += k
+            mass_blocks.append(masses[selected] + k*residue_mass)
+            count_blocks.append(added)
+            k += 1
+        masses = np.concatenate(mass_blocks)
+        counts = np.concatenate(count_blocks)
+    # recalculate from counts so every mass is summed the same way
+    masses = counts.astype(np.float64) @ residue_masses
+    order = np.argsort(masses, kind="stable")
+    return masses[order], counts[order]
+
+
+class LocalSearchEngine:
+    """LocalSearchEngine runs Glycomod composition search without Glycomod.
+
+    All compositions allowed by config.json/"default_mono" and config.json/"default_occurrences"
+    are enumerated from config.json/"mono_masses_underivatized" and matched against experimental
+    masses within config.json/"Tolerance" (Da, ppm or both, see tolerance.parse_tolerance).
+    Every mass has its own tolerance window, all windows are looked up in sorted composition masses at once
+    and matches are kept as CSR hit list (see match()).
+
+    Results are returned in the same form as GlycomodWorker._parse_gm_html() produces
+    from Glycomod HTML so the rest of the worker does not care where they came from.
+        'User mass: 911.30',
+        'Adduct ([M+H]+): 1.007276',
+        'Derivative mass (Free reducing end): 18.01056',
+        '892.317\t-0.035(Hex)3 (HexNAc)2',
+        '1 structure found.'
+    Glycoform mass and delta are separated by tab, so deltas above 1 Da (wide Tolerance) can't be misread.
+
+    Experimental mass is treated as [M + derivative + adduct], same as in Glycomod:
+    derivative is H2O for free reducing end or config.json/"reducing_end_tag_mono_full" for tags.
+    With mass_type="avg", average masses are used ("avg_masses_underivatized", "reducing_end_tag_avg_full").
+
+    If MassIndex is provided, its memory-mapped masses are searched instead of enumerating
+    compositions on every run. Masses above index max_mass fall back to enumeration.
+    """
+    def __init__(self, cfg, reducing_end=None, adduct="H+", index=None, mass_type="mono"):
+        self.logger = logging.getLogger(name="LocalSearch")
+        self.cfg = cfg
+        self.mass_type = mass_type
+        # (Da, ppm)
+        self.tolerance = parse_tolerance(cfg.get("Tolerance", "0.5"))
+        masses = cfg[f"{mass_type}_masses_underivatized"]
+        tags = cfg[f"reducing_end_tag_{mass_type}_full"]
+        self.adduct = adduct
+        self.adduct_mass = masses[adduct]
+        if reducing_end:
+            if reducing_end not in tags:
+                raise ValueError(f"Invalid reducing end tag. Available tags: {list(tags.keys())}")
+            self.derivative_name = reducing_end
+            self.derivative_mass = tags[reducing_end]
+        else:
+            self.derivative_name = "Free reducing end"
+            self.derivative_mass = masses["H2O"]
+        self.residues, self.min_counts = search_space_from_cfg(cfg)
+        self.residue_masses = [masses[f"({name})"] for name in self.residues]
+        self.max_mass = 0.0
+        self.masses = np.empty(0, dtype=np.float64)
+        self.counts = np.empty((0, len(self.residues)), dtype=np.uint8)
+        if index is not None:
+            if index.residues != self.residues:
+                raise ValueError(f"Index residues {index.residues} do not match config residues {self.residues}")
+            self.max_mass = index.max_mass
+            self.masses = index.masses
+            self.counts = index.counts
+
+    def _ensure_search_space(self, max_mass):
+        """Enumerates compositions up to max_mass, reusing previous enumeration if it is large enough"""
+        if max_mass <= self.max_mass:
+            return
+        if len(self.masses) and self.max_mass:
+            self.logger.warning(f"Masses exceed search space ({self.max_mass:.2f} Da), enumerating compositions")
+        self.masses, self.counts = enumerate_compositions(self.residue_masses, self.min_counts, max_mass)
+        self.max_mass = max_mass
+        self.logger.debug(f"Enumerated {len(self.masses)} compositions up to {max_mass:.2f} Da")
+
+    def long_notation(self, counts) -> str:
+        return " ".join(
+            f"({name}){count}" for name, count in zip(self.residues, counts) if count
+        )
+
+    def _lines(self, user_mass, experimental, hits):
+        """Returns Glycomod-like result lines for single mass, matches are self.masses[hits]"""
+        offset = self.derivative_mass + self.adduct_mass
+        lines = [
+            f"User mass: {user_mass}",
+            f"Adduct ([M+{self.adduct[:-1]}]+): {self.adduct_mass}",
+            f"Derivative mass ({self.derivative_name}): {self.derivative_mass}",
+        ]
+        for i in hits:
+            glycoform_mass = self.masses[i]
+            delta = experimental - (glycoform_mass + offset)
+            lines.append(
+                f"{format_gm_number(glycoform_mass)}\t{format_gm_number(delta)}{self.long_notation(self.counts[i])}"
+            )
+        found = len(hits)
+        lines.append(f"{found} structure{'' if found == 1 else 's'} found.")
+        return lines
+
+    def search(self, text_input) -> list:
+        """Searches all newline separated masses from text_input"""
+        user_masses = text_input.split()
+        if not user_masses:
+            raise ValueError("FATAL! No data provided for local search")
+        return self.search_masses(np.array(user_masses, dtype=np.float64), user_masses)
+
+    def match(self, masses) -> tuple:
+        """Matches masses array against compositions, returns CSR hit list (offsets, hits):
+        compositions of masses[i] are self.masses[hits[offsets[i]:offsets[i+1]]], ordered by mass.
+            ### EXAMPLE ###
+            >>>offsets, hits = engine.match(np.array([911.30, 1057.33]))
+            >>>offsets, hits
+            >>>(array([0, 1, 2]), array([0, 2]))
+        """
+        return self.match_adducts(masses, [(self.adduct, self.adduct_mass, 1)])
+
+    def match_adducts(self, masses, adducts) -> tuple:
+        """Matches every m/z in masses as every adduct (name, mass, charge) in one pass.
+        Returns CSR hit list (offsets, hits) of (mass, adduct) pairs, pair k is masses[k // len(adducts)]
+        as adducts[k % len(adducts)]. Tolerance applies to m/z, so windows of z-charged adducts are z times wider
+        in glycoform mass."""
+        masses = np.asarray(masses, dtype=np.float64)
+        if not len(masses) or not len(adducts):
+            return np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64)
+        offsets = np.array([self.derivative_mass + mass for _, mass, _ in adducts], dtype=np.float64)
+        charges = np.array([charge for _, _, charge in adducts], dtype=np.float64)
+        # glycoform mass of every (mass, adduct) pair
+        targets = (masses[:, None] * charges[None, :] - offsets[None, :]).ravel()
+        windows = (tolerance_windows(masses, self.tolerance)[:, None] * charges[None, :]).ravel()
+        self._ensure_search_space(float((targets + windows).max()))
+        lo = np.searchsorted(self.masses, targets - windows, side="left")
+        hi = np.searchsorted(self.masses, targets + windows, side="right")
+        counts = hi - lo
+        hit_offsets = np.zeros(len(targets) + 1, dtype=np.int64)
+        np.cumsum(counts, out=hit_offsets[1:])
+        # hits of pair k are consecutive compositions lo[k]:hi[k]
+        hits = np.arange(hit_offsets[-1], dtype=np.int64) + np.repeat(lo - hit_offsets[:-1], counts)
+        return hit_offsets, hits
+
+    def search_masses(self, masses, labels) -> list:
+        """Searches masses array, labels are masses as written in input ('911.30') and are used in results
+            ### EXAMPLE ###
+            >>>peaks = read_peak_list("test.txt")
+            >>>engine.search_masses(peaks.masses, peaks.labels)
+        """
+        if not len(masses):
+            raise ValueError("FATAL! No data provided for local search")
+        offsets, hits = self.match(masses)
+        hits = hits.tolist()
+        offsets = offsets.tolist()
+        return [
+            self._lines(label, experimental, hits[offsets[i]:offsets[i + 1]])
+            for i, (label, experimental) in enumerate(zip(labels, masses.tolist()))
+        ]
+
+    def reserve(self, user_masses):
+        """Makes sure search space covers all user_masses, so searching them in parts does not enumerate again"""
+        offset = self.derivative_mass + self.adduct_mass
+        highest = max(float(i) for i in user_masses)
+        self._ensure_search_space(highest - offset + float(tolerance_windows(highest, self.tolerance)))
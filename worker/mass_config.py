@@ -0,0 +1,145 @@
+# -*- coding: UTF-8 -*-
+from types import MappingProxyType
+from typing import NamedTuple, Mapping, Tuple
+
+import numpy as np
+
+MASS_TYPES = ("mono", "avg")
+# only residue masses are required, helpers using adducts or tags raise if their section is missing
+REQUIRED_SECTIONS = ("masses",)
+
+
+def _frozen(values, dtype) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+class MassConfig(NamedTuple):
+    """Mass sections of config.json for one mass type, validated and compiled once (see compile_config).
+        masses -> {residue or ion: mass}, read-only view of config.json/"<mass type>_masses_underivatized"
+        index -> {residue or ion: position in mass_vector}
+        adducts -> ((name, mass, charge), ...) of config.json/"adducts" ("adducts_avg")
+        adduct_masses, adduct_charges -> float64 arrays in order of adduct_names
+        tags, tags_full -> config.json/"reducing_end_tag_<mass type>" and "..._full"
+        missing -> config.json sections missing from config, empty in MassConfig (see require)
+    Arrays are read-only, so one MassConfig can be shared by threads and workers.
+    """
+    mass_type: str
+    masses: Mapping[str, float]
+    index: Mapping[str, int]
+    mass_vector: np.ndarray
+    water: float
+    hydronium: float
+    adducts: Tuple[Tuple[str, float, int], ...]
+    adduct_names: Tuple[str, ...]
+    adduct_masses: np.ndarray
+    adduct_charges: np.ndarray
+    tags: Mapping[str, float]
+    tags_full: Mapping[str, float]
+    missing: Tuple[str, ...] = ()
+
+    @staticmethod
+    def sections(mass_type="mono") -> dict:
+        """{field: config.json section} compiled for mass_type"""
+        return {
+            "masses": f"{mass_type}_masses_underivatized",
+            "adducts": "adducts" if mass_type == "mono" else "adducts_avg",
+            "tags": f"reducing_end_tag_{mass_type}",
+            "tags_full": f"reducing_end_tag_{mass_type}_full",
+        }
+
+    @classmethod
+    def from_config(cls, cfg, mass_type="mono") -> "MassConfig":
+        """Validates and compiles mass sections of cfg, raises ValueError naming invalid section"""
+        if mass_type not in MASS_TYPES:
+            raise ValueError(f"Unsupported mass type {mass_type}. Available: {list(MASS_TYPES)}")
+        sections = cls.sections(mass_type)
+        adduct_section = sections["adducts"]
+        missing = [field for field, section in sections.items() if not isinstance(cfg.get(section), dict)]
+        if any(field in REQUIRED_SECTIONS for field in missing):
+            raise ValueError(f"Invalid config, missing sections: {[sections[i] for i in missing]}")
+        masses = {}
+        for section in ("masses", "tags", "tags_full"):
+            try:
+                masses[section] = {name: float(mass) for name, mass in (cfg[sections[section]] if section not in missing else {}).items()}
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid config, {sections[section]} must map names to masses")
+        for ion in ("H2O", "H3O+"):
+            if ion not in masses["masses"]:
+                raise ValueError(f"Invalid config, {ion} missing from {sections['masses']}")
+        adducts = []
+        for name, entry in (cfg[adduct_section] if "adducts" not in missing else {}).items():
+            try:
+                mass, charge = entry
+                adducts.append((name, float(mass), int(charge)))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid config, {adduct_section}/{name} must be [mass, charge]")
+            if adducts[-1][2] < 1 or adducts[-1][2] != charge:
+                raise ValueError(f"Invalid config, charge of {adduct_section}/{name} must be positive integer")
+        names = list(masses["masses"])
+        return cls(
+            mass_type=mass_type,
+            masses=MappingProxyType(masses["masses"]),
+            index=MappingProxyType({name: i for i, name in enumerate(names)}),
+            mass_vector=_frozen([masses["masses"][name] for name in names], np.float64),
+            water=masses["masses"]["H2O"],
+            hydronium=masses["masses"]["H3O+"],
+            adducts=tuple(adducts),
+            adduct_names=tuple(name for name, _, _ in adducts),
+            adduct_masses=_frozen([mass for _, mass, _ in adducts], np.float64),
+            adduct_charges=_frozen([charge for _, _, charge in adducts], np.float64),
+            tags=MappingProxyType(masses["tags"]),
+            tags_full=MappingProxyType(masses["tags_full"]),
+            missing=tuple(sections[i] for i in missing),
+        )
+
+    def require(self, *fields):
+        """Raises ValueError if config.json sections of fields ("adducts", "tags", "tags_full") were missing"""
+        if not self.missing:
+            return
+        sections = self.sections(self.mass_type)
+        missing = [sections[i] for i in fields if sections[i] in self.missing]
+        if missing:
+            raise ValueError(f"Invalid config, missing sections: {missing}")
+
+    def tag_mass(self, reducing_end) -> float:
+        """Mass of reducing end tag, 0.0 for free reducing end (None). Raises ValueError for unknown tag."""
+        if reducing_end is None:
+            return 0.0
+        self.require("tags")
+        try:
+            return self.tags[reducing_end]
+        except KeyError:
+            raise ValueError(f"Invalid reducing end tag. Available tags: {list(self.tags)}")
+
+    def indices(self, dictionaries) -> tuple:
+        """Flattens compositions in dictionary form (see utils.string_to_dict) into
+        (row of every residue, position of residue in its dictionary, mass_vector index, count)"""
+        index = self.index
+        lengths = np.array([len(i) for i in dictionaries], dtype=np.int64)
+        keys = [key for dictionary in dictionaries for key in dictionary]
+        try:
+            positions = [index[key] for key in keys]
+        except KeyError as e:
+            raise ValueError(f"Unknown residue {e.args[0]}, not in {self.mass_type}_masses_underivatized")
+        counts = [count for dictionary in dictionaries for count in dictionary.values()]
+        rows = np.repeat(np.arange(len(dictionaries)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        columns = np.arange(len(keys)) - np.repeat(starts, lengths)
+        return rows, columns, np.array(positions, dtype=np.int64), np.array(counts, dtype=np.float64)
+
+
+def compile_config(cfg, mass_type="mono") -> MassConfig:
+    """Returns MassConfig of cfg, cfg can also be MassConfig already.
+    Config dicts are compiled on every call, so compile once and pass MassConfig to helpers called per hit.
+    Helpers for one glycan read config dicts directly and do not compile them (see utils.calc_theor_mono_mass).
+        ### EXAMPLE ###
+        >>>mass_config = compile_config(cfg, "avg")
+        >>>calc_adducts_batch(dictionaries, mass_config, mass_type="avg")
+    """
+    if isinstance(cfg, MassConfig):
+        if cfg.mass_type != mass_type:
+            raise ValueError(f"Config compiled for {cfg.mass_type} masses, {mass_type} requested")
+        return cfg
+    return MassConfig.from_config(cfg, mass_type)
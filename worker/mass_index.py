@@ -0,0 +1,136 @@
+# -*- coding: UTF-8 -*-
+import os
+import json
+import struct
+import logging
+
+import numpy as np
+
+from .utils import config_checksum
+from .cache import user_cache_dir
+from .local_search import search_space_from_cfg, enumerate_compositions
+
+# config.json sections that change contents of the index
+INDEX_CFG_SECTIONS = ("mono_masses_underivatized", "default_mono", "default_occurrences", "local_index")
+INDEX_MAGIC = b"GMIDX001"
+DEFAULT_INDEX_MAX_MASS = 6000.0
+
+logger = logging.getLogger(name="MassIndex")
+
+
+def index_path_from_cfg(cfg, mass_type="mono") -> str:
+    """config.json/"local_index"/"path", local_index.bin in cache.user_cache_dir() if null.
+    Index of average masses is stored next to mono index, with '_avg' suffix"""
+    path = cfg.get("local_index", {}).get("path", "null")
+    if path == "null":
+        path = os.path.join(user_cache_dir(), "local_index.bin")
+    path = os.path.abspath(path)
+    if mass_type != "mono":
+        root, extension = os.path.splitext(path)
+        path = f"{root}_{mass_type}{extension}"
+    return path
+
+
+def index_cfg_sections(mass_type="mono") -> tuple:
+    return tuple(f"{mass_type}_masses_underivatized" if i == "mono_masses_underivatized" else i for i in INDEX_CFG_SECTIONS)
+
+
+class MassIndex:
+    """Precomputed composition masses stored on disk and memory-mapped on load.
+
+    File layout (all arrays are little endian, offsets aligned to 8 bytes):
+        magic (8 bytes) | header length (uint32) | JSON header | padding
+        sorted glycoform masses -> float64[count]
+        packed residue counts -> uint8/uint16[count, len(residues)]
+
+    Header holds config checksum of INDEX_CFG_SECTIONS, so index built for
+    different config.json is never used. Average mass index (mass_type="avg") is checked against
+    "avg_masses_underivatized" instead of "mono_masses_underivatized".
+    Searching is a binary search over memory-mapped masses, so only touched pages get loaded
+    and all processes using the same index share one copy in page cache.
+    """
+    def __init__(self, path, checksum, residues, max_mass, masses, counts):
+        self.path = path
+        self.checksum = checksum
+        self.residues = residues
+        self.max_mass = max_mass
+        self.masses = masses
+        self.counts = counts
+
+    def __len__(self):
+        return len(self.masses)
+
+    @staticmethod
+    def _data_offset(header_bytes) -> int:
+        offset = len(INDEX_MAGIC) + 4 + len(header_bytes)
+        return offset + (-offset % 8)
+
+    @classmethod
+    def build(cls, cfg, path=None, mass_type="mono"):
+        """Enumerates compositions for cfg and writes index to path"""
+        path = path or index_path_from_cfg(cfg, mass_type)
+        max_mass = float(cfg.get("local_index", {}).get("max_mass", DEFAULT_INDEX_MAX_MASS))
+        residues, min_counts = search_space_from_cfg(cfg)
+        residue_masses = [cfg[f"{mass_type}_masses_underivatized"][f"({name})"] for name in residues]
+        masses, counts = enumerate_compositions(residue_masses, min_counts, max_mass)
+        masses = masses.astype("<f8")
+        counts = counts.astype(counts.dtype.newbyteorder("<"))
+        header = {
+            "checksum": config_checksum(cfg, index_cfg_sections(mass_type)),
+            "residues": residues,
+            "max_mass": max_mass,
+            "count": len(masses),
+            "counts_dtype": counts.dtype.str,
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_offset = cls._data_offset(header_bytes)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as outfile:
+            outfile.write(INDEX_MAGIC)
+            outfile.write(struct.pack("<I", len(header_bytes)))
+            outfile.write(header_bytes)
+            outfile.write(b"\0" * (data_offset - outfile.tell()))
+            outfile.write(masses.tobytes())
+            outfile.write(counts.tobytes())
+        # readers never see partially written index
+        os.replace(tmp_path, path)
+        logger.debug(f"Built index with {len(masses)} compositions up to {max_mass} Da: {path}")
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path, checksum=None):
+        """Memory-maps index from path, raises ValueError if it was built for different config"""
+        with open(path, "rb") as infile:
+            if infile.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{path} is not a GlycomodWorker mass index")
+            header_len = struct.unpack("<I", infile.read(4))[0]
+            header_bytes = infile.read(header_len)
+        header = json.loads(header_bytes.decode("utf-8"))
+        if checksum is not None and header["checksum"] != checksum:
+            raise ValueError(f"Index {path} was built with different config. Rebuild index.")
+        data_offset = cls._data_offset(header_bytes)
+        count = header["count"]
+        n_residues = len(header["residues"])
+        if count == 0:
+            masses = np.empty(0, dtype="<f8")
+            counts = np.empty((0, n_residues), dtype=header["counts_dtype"])
+        else:
+            masses = np.memmap(path, dtype="<f8", mode="r", offset=data_offset, shape=(count,))
+            counts = np.memmap(
+                path, dtype=header["counts_dtype"], mode="r",
+                offset=data_offset + masses.nbytes, shape=(count, n_residues)
+            )
+        return cls(path, header["checksum"], header["residues"], header["max_mass"], masses, counts)
+
+    @classmethod
+    def for_config(cls, cfg, path=None, mass_type="mono"):
+        """Returns index for cfg or None if index is missing or outdated"""
+        path = path or index_path_from_cfg(cfg, mass_type)
+        if not os.path.isfile(path):
+            return None
+        try:
+            return cls.open(path, checksum=config_checksum(cfg, index_cfg_sections(mass_type)))
+        except ValueError as e:
+            logger.warning(f"Ignoring mass index: {e}")
+            return None
@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+import os
+import json
+import time
+import logging
+import cProfile
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident memory of current process in MB, None where it is not available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return round(peak / 1024**2 if os.uname().sysname == "Darwin" else peak / 1024, 1)
+
+
+class RunMetrics:
+    """RunMetrics records wall time, item counts and peak traced memory of GlycomodWorker stages.
+
+    Stages can be nested (run() contains all other stages), every stage is reported separately
+    (with "peak_traced_mb" when trace_memory is on):
+        "stages": {
+            "_parse_gm_html": {"calls": 1, "seconds": 0.012, "masses": 100, "hits": 230},
+            ...
+        }
+    With trace_memory, peak memory is measured with tracemalloc (Python allocations) while stage runs.
+    Tracing slows down allocation-heavy stages several times, so it is off by default and stage seconds
+    of traced runs should not be compared with untraced ones. Peak RSS of whole process is always reported once.
+
+    With cprofile_stage, cProfile statistics of that stage are saved next to metrics file
+    as <metrics file>.<stage>.prof (see pstats).
+    """
+    def __init__(self, trace_memory=False, cprofile_stage=None):
+        self.logger = logging.getLogger(name="Metrics")
+        self.stages = {}
+        self.info = {}
+        self.trace_memory = trace_memory
+        self.cprofile_stage = cprofile_stage
+        self.profiler = cProfile.Profile() if cprofile_stage else None
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        self._open = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _traced_peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+
+    @contextmanager
+    def stage(self, name):
+        if self._open:
+            # parent keeps its peak so far, tracemalloc peak is reset for this stage
+            self._open[-1][1] = max(self._open[-1][1], self._traced_peak())
+        if self.trace_memory and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        frame = [name, 0]
+        self._open.append(frame)
+        profiling = self.profiler is not None and name == self.cprofile_stage
+        if profiling:
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiling:
+                self.profiler.disable()
+            self._open.pop()
+            peak = max(frame[1], self._traced_peak())
+            if self._open:
+                self._open[-1][1] = max(self._open[-1][1], peak)
+            stats = self._stats(name)
+            stats["calls"] += 1
+            stats["seconds"] = round(stats["seconds"] + seconds, 6)
+            if self.trace_memory:
+                stats["peak_traced_mb"] = max(stats["peak_traced_mb"], round(peak / 1024**2, 3))
+
+    def _stats(self, name) -> dict:
+        stats = {"calls": 0, "seconds": 0.0}
+        if self.trace_memory:
+            stats["peak_traced_mb"] = 0.0
+        return self.stages.setdefault(name, stats)
+
+    def add_counts(self, name, counts):
+        """Adds item counts (masses, hits, rows ...) to stage"""
+        stats = self._stats(name)
+        for key, value in counts.items():
+            stats[key] = stats.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        from .compositions import composition_cache_info
+        return {
+            "started": self.started,
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "trace_memory": self.trace_memory,
+            **self.info,
+            "composition_cache": composition_cache_info(),
+            "stages": self.stages,
+        }
+
+    def save(self, path):
+        """Writes metrics to JSON file at path, and cProfile statistics if cprofile_stage was set"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        if self.profiler is not None:
+            self.profiler.dump_stats(f"{path}.{self.cprofile_stage}.prof")
+        self.logger.debug(f"Saved run metrics: {path}")
+
+    def close(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def measured(stage, counter=None):
+    """Records method as RunMetrics stage when worker has metrics (self.metrics is not None).
+    counter(worker, *args, **kwargs) returns item counts of the stage, it is called after method returns.
+        ### EXAMPLE ###
+        >>>@measured("_parse_gm_html", lambda worker: {"masses": len(worker.parsed_data)})
+        >>>def _parse_gm_html(self):
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = getattr(self, "metrics", None)
+            if metrics is None:
+                return method(self, *args, **kwargs)
+            with metrics.stage(stage):
+                result = method(self, *args, **kwargs)
+            if counter is not None:
+                metrics.add_counts(stage, counter(self, *args, **kwargs))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,136 @@
+# -*- coding: UTF-8 -*-
+import io
+import os
+import mmap
+
+import numpy as np
+
+# files larger than this are memory-mapped instead of read
+MMAP_THRESHOLD = 64 * 1024**2
+CHUNK_SIZE = 4 * 1024**2
+# invalid lines listed in error message
+MAX_REPORTED_LINES = 10
+
+_DOT = ord(".")
+_NUMBER_BYTES = np.zeros(256, dtype=bool)
+_NUMBER_BYTES[np.frombuffer(b"0123456789.", dtype=np.uint8)] = True
+_ALLOWED_BYTES = _NUMBER_BYTES.copy()
+_ALLOWED_BYTES[np.frombuffer(b" \t\n\r\x0b\x0c", dtype=np.uint8)] = True
+
+
+class PeakList:
+    """Experimental masses read from peak list.
+        masses -> float64 array
+        labels -> list of masses as written in input ('911.30'), used in results and sent to Glycomod
+    """
+    def __init__(self, masses, labels):
+        self.masses = masses
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.masses)
+
+    @property
+    def text(self) -> str:
+        """Newline separated masses, same as text_input of GlycomodWorker"""
+        return "\n".join(self.labels)
+
+
+def _invalid_token(token) -> bool:
+    return token.count(".") > 1 or not token.strip(".")
+
+
+def _bad_lines(chunk, first_line) -> list:
+    """Returns (line number, line) of invalid lines in chunk, only called when chunk failed validation"""
+    bad = []
+    for number, line in enumerate(chunk.split(b"\n"), start=first_line):
+        text = line.decode("utf-8", errors="replace")
+        valid_chars = _ALLOWED_BYTES[np.frombuffer(line, dtype=np.uint8)].all()
+        if not valid_chars or any(_invalid_token(i) for i in text.split()):
+            bad.append((number, text.strip()))
+    return bad
+
+
+def _misplaced_dots(data) -> bool:
+    """True if any number has more than one dot or is a lone dot"""
+    dots = np.flatnonzero(data == _DOT)
+    if not len(dots):
+        return False
+    space = ~_NUMBER_BYTES[data]
+    # numbers are separated by whitespace, two dots without whitespace between them are in the same number
+    separators = np.cumsum(space, dtype=np.int32)
+    if (separators[dots[1:]] == separators[dots[:-1]]).any():
+        return True
+    padded = np.concatenate(([True], space, [True]))
+    return bool((padded[dots] & padded[dots + 2]).any())
+
+
+def _parse_chunk(chunk):
+    """Returns (masses, labels) of chunk, None if chunk contains invalid characters or numbers"""
+    data = np.frombuffer(chunk, dtype=np.uint8)
+    if not _ALLOWED_BYTES[data].all() or _misplaced_dots(data):
+        return None
+    labels = chunk.decode("ascii").split()
+    if not labels:
+        return np.empty(0, dtype=np.float64), labels
+    return np.fromstring(chunk, dtype=np.float64, sep=" "), labels
+
+
+def _iter_chunks(source, chunk_size):
+    """Yields (chunk, number of first line in chunk), chunks end at line end"""
+    rest = b""
+    line = 1
+    while True:
+        data = source.read(chunk_size)
+        if not data:
+            break
+        data = rest + data
+        end = data.rfind(b"\n") + 1
+        if not end:
+            rest = data
+            continue
+        chunk, rest = data[:end], data[end:]
+        yield chunk, line
+        line += chunk.count(b"\n")
+    if rest:
+        yield rest, line
+
+
+def _parse_source(source, chunk_size=CHUNK_SIZE) -> PeakList:
+    masses, labels, bad = [], [], []
+    for chunk, first_line in _iter_chunks(source, chunk_size):
+        parsed = _parse_chunk(chunk)
+        if parsed is None:
+            bad.extend(_bad_lines(chunk, first_line))
+        elif not bad:
+            masses.append(parsed[0])
+            labels.extend(parsed[1])
+    if bad:
+        listed = ", ".join(f"{number} ('{line}')" for number, line in bad[:MAX_REPORTED_LINES])
+        more = f" and {len(bad) - MAX_REPORTED_LINES} more" if len(bad) > MAX_REPORTED_LINES else ""
+        raise ValueError(
+            f"Your input contains invalid masses on line {listed}{more}; Input should consist of floating point numbers."
+        )
+    if not masses:
+        return PeakList(np.empty(0, dtype=np.float64), [])
+    return PeakList(np.concatenate(masses), labels)
+
+
+def read_peak_list(path, chunk_size=CHUNK_SIZE, mmap_threshold=MMAP_THRESHOLD) -> PeakList:
+    """Reads and validates whitespace separated masses from file in chunks.
+    Files over mmap_threshold bytes are memory-mapped. Raises ValueError listing invalid lines.
+        ### EXAMPLE ###
+        >>>peaks = read_peak_list("test.txt")
+        >>>peaks.masses
+        >>>array([ 911.3 , 1057.33])
+    """
+    with open(path, "rb") as infile:
+        if os.fstat(infile.fileno()).st_size > mmap_threshold:
+            with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return _parse_source(mapped, chunk_size)
+        return _parse_source(infile, chunk_size)
+
+
+def parse_peak_text(text, chunk_size=CHUNK_SIZE) -> PeakList:
+    """Same as read_peak_list for masses already in memory"""
+    return _parse_source(io.BytesIO(text.encode("utf-8")), chunk_size)
@@ -0,0 +1,178 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from toolz.itertoolz import concat
+
+from .result_store import ResultStore
+from .writers import open_writer
+
+DEFAULT_CHUNK_SIZE = 100
+_END = object()
+
+
+class SearchPipeline:
+    """SearchPipeline runs GlycomodWorker search as asyncio stages connected by bounded queues.
+
+        fetch -> parse -> create results -> write output
+
+    Masses are split into chunks of worker.chunk_size (DEFAULT_CHUNK_SIZE if not set).
+    Up to worker.max_workers chunks are fetched concurrently while earlier chunks are parsed,
+    turned into ResultStore and written, always in input order. Queues hold at most queue_size
+    chunks, so fetching waits when later stages fall behind.
+    Blocking work (network, parsing, file writes) runs in thread pools, cached results are read
+    and stored from the event loop thread.
+
+    If any stage fails, remaining stages and pending fetches are cancelled and error is raised.
+    """
+    def __init__(self, worker, queue_size=None):
+        self.logger = logging.getLogger(name="Pipeline")
+        self.worker = worker
+        self.chunk_size = worker.chunk_size or DEFAULT_CHUNK_SIZE
+        self.queue_size = queue_size or max(2, worker.max_workers)
+        self.parsed_chunks = []
+        self.stores = []
+        self.cancelled = False
+
+    def _fetch(self, text_input):
+        """Fetches raw results for masses (HTML, or parsed lines with local backend)"""
+        if self.cancelled:
+            raise asyncio.CancelledError()
+        worker = self.worker
+        if worker.backend == "local":
+            return worker._get_engine().search(text_input)
+        fetch = worker._fetch_html_http if worker.backend == "http" else worker._fetch_html_selenium
+        for attempt in range(1, worker.chunk_retries + 2):
+            try:
+                return fetch(text_input)
+            except Exception as e:
+                if attempt > worker.chunk_retries or self.cancelled:
+                    raise
+                self.logger.warning(f"Fetch attempt {attempt} failed, retrying: {e}")
+
+    def _parse(self, raw, masses) -> list:
+        parsed = raw if self.worker.backend == "local" else self.worker._parse_html(raw)
+        if len(parsed) != len(masses):
+            raise ValueError(f"Expected results for {len(masses)} masses, got {len(parsed)}")
+        return parsed
+
+    async def _produce(self, masses, fetched, io_pool):
+        """Starts fetches of masses missing from cache, at most max_workers at once"""
+        loop = asyncio.get_event_loop()
+        worker = self.worker
+        settings = worker._cache_settings() if worker.cache is not None else None
+        # local engine may extend its search space while searching, it is not shared between threads
+        semaphore = asyncio.Semaphore(1 if worker.backend == "local" else worker.max_workers)
+
+        async def fetch(missing):
+            async with semaphore:
+                return await loop.run_in_executor(io_pool, self._fetch, "\n".join(missing))
+
+        for start in range(0, len(masses), self.chunk_size):
+            chunk = masses[start:start + self.chunk_size]
+            cached = worker.cache.get_many(chunk, settings) if settings is not None else {}
+            missing = list(dict.fromkeys(i for i in chunk if i not in cached))
+            task = asyncio.ensure_future(fetch(missing)) if missing else None
+            # waits here when parse stage is queue_size chunks behind
+            await fetched.put((chunk, cached, missing, task))
+        await fetched.put(_END)
+
+    async def _parse_stage(self, fetched, parsed, cpu_pool):
+        loop = asyncio.get_event_loop()
+        worker = self.worker
+        settings = worker._cache_settings() if worker.cache is not None else None
+        while True:
+            item = await fetched.get()
+            if item is _END:
+                break
+            chunk, results, missing, task = item
+            if task is not None:
+                raw = await task
+                lines = await loop.run_in_executor(cpu_pool, self._parse, raw, missing)
+                fetched_results = dict(zip(missing, lines))
+                if settings is not None:
+                    worker.cache.put_many(fetched_results, settings)
+                results = dict(results, **fetched_results)
+            # every mass gets its own list, same mass can be submitted more than once
+            await parsed.put([list(results[i]) for i in chunk])
+        await parsed.put(_END)
+
+    async def _build_stage(self, parsed, built, cpu_pool):
+        loop = asyncio.get_event_loop()
+        while True:
+            parsed_data = await parsed.get()
+            if parsed_data is _END:
+                break
+            self.parsed_chunks.append(parsed_data)
+            await built.put(await loop.run_in_executor(cpu_pool, self.worker._build_results, parsed_data))
+        await built.put(_END)
+
+    async def _write_stage(self, built, writer, io_pool):
+        loop = asyncio.get_event_loop()
+
+        def write(store):
+            for submitted_mass in store.iter_submitted():
+                writer.write(submitted_mass)
+
+        while True:
+            store = await built.get()
+            if store is _END:
+                break
+            self.stores.append(store)
+            await loop.run_in_executor(io_pool, write, store)
+
+    async def _run(self, masses, writer):
+        worker = self.worker
+        fetched = asyncio.Queue(maxsize=self.queue_size)
+        parsed = asyncio.Queue(maxsize=self.queue_size)
+        built = asyncio.Queue(maxsize=self.queue_size)
+        # one extra thread for writing output
+        io_pool = ThreadPoolExecutor(max_workers=worker.max_workers + 1)
+        cpu_pool = ThreadPoolExecutor(max_workers=1)
+        stages = [
+            asyncio.ensure_future(self._produce(masses, fetched, io_pool)),
+            asyncio.ensure_future(self._parse_stage(fetched, parsed, cpu_pool)),
+            asyncio.ensure_future(self._build_stage(parsed, built, cpu_pool)),
+            asyncio.ensure_future(self._write_stage(built, writer, io_pool)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            self.cancelled = True
+            for stage in stages:
+                stage.cancel()
+            # cancel fetches still waiting in queue
+            while not fetched.empty():
+                item = fetched.get_nowait()
+                if item is not _END and item[3] is not None:
+                    item[3].cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise
+        finally:
+            io_pool.shutdown(wait=True)
+            cpu_pool.shutdown(wait=True)
+
+    def run(self) -> ResultStore:
+        """Runs search for worker.text_input and writes results table (worker.output_format).
+        Results are also stored in worker.parsed_data and worker.results."""
+        worker = self.worker
+        masses = worker.text_input.split()
+        if not masses:
+            raise ValueError("FATAL! No data provided for search")
+        if worker.backend == "http":
+            # form is loaded once, before chunks are submitted concurrently
+            worker._get_http_client()._load_form()
+        elif worker.backend == "local":
+            worker._get_engine().reserve(masses)
+        worker._prepare_output()
+        loop = asyncio.new_event_loop()
+        try:
+            with open_writer(worker.output_format, worker.filename, worker.cfg["col_names"]) as writer:
+                loop.run_until_complete(self._run(masses, writer))
+        finally:
+            loop.close()
+        worker.parsed_data = list(concat(self.parsed_chunks))
+        worker.results = ResultStore.concat(self.stores)
+        self.logger.debug(f"Pipeline finished {len(masses)} masses in {len(self.stores)} chunks")
+        return worker.results
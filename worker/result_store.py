@@ -0,0 +1,273 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+
+from .data_types import GlycomodComposition, SubmittedMass
+
+# GlycomodComposition adduct fields and config.json/"adducts" they are calculated for
+ADDUCT_FIELDS = (
+    ("theoretical_MTagH", "H+"),
+    ("theoretical_MTagNa", "Na+"),
+    ("theoretical_MTagK", "K+"),
+    ("theoretical_MTagH2", "2H2+"),
+    ("theoretical_MTagHNa", "HNa2+"),
+    ("theoretical_MTagHK", "HK2+"),
+    ("theoretical_MTagNa2", "2Na2+"),
+    ("theoretical_MTagNH4", "NH4+"),
+)
+# adduct columns in the order of config.json/"col_names"
+CSV_ADDUCT_ORDER = ("H+", "Na+", "K+", "NH4+", "2H2+", "HNa2+", "HK2+", "2Na2+")
+NOT_FOUND = ("NOT FOUND", "NOT FOUND")
+# last column of results table in multi-adduct search, adduct explaining the hit
+ADDUCT_COLUMN = "Adduct"
+
+
+class ResultStore:
+    """Search results stored column by column (struct of arrays).
+
+    Per submitted mass:
+        user_mass -> mass string as submitted
+        adduct, adduct_mass, red_end_tag, red_end_tag_mass
+        header -> index into header_table, interned Glycomod 'Adduct'/'Derivative mass' lines
+        hit_offsets -> hits of mass i are rows hit_offsets[i]:hit_offsets[i+1]
+    Per hit (composition matched to a mass):
+        theoretical_MH, delta -> float64 arrays
+        composition -> index into composition_table, interned (long_notation, short_notation)
+        adduct_ions -> float64 array[hits, len(ADDUCT_FIELDS)]
+    Masses without match have one hit pointing to NOT_FOUND composition.
+
+    iter_submitted()/submitted() yield the same SubmittedMass/GlycomodComposition objects
+    GlycomodWorker used to keep, for code that expects them.
+    """
+    def __init__(self, user_mass=(), adduct=(), adduct_mass=(), red_end_tag=(), red_end_tag_mass=(),
+                 header=(), header_table=(), hit_offsets=(0,), theoretical_MH=(), delta=(),
+                 composition=(), composition_table=(), adduct_ions=None):
+        self.user_mass = list(user_mass)
+        self.adduct = list(adduct)
+        self.adduct_mass = np.asarray(adduct_mass, dtype=np.float64)
+        self.red_end_tag = list(red_end_tag)
+        self.red_end_tag_mass = np.asarray(red_end_tag_mass, dtype=np.float64)
+        self.header = np.asarray(header, dtype=np.int32)
+        self.header_table = list(header_table)
+        self.hit_offsets = np.asarray(hit_offsets, dtype=np.int64)
+        self.theoretical_MH = np.asarray(theoretical_MH, dtype=np.float64)
+        self.delta = np.asarray(delta, dtype=np.float64)
+        self.composition = np.asarray(composition, dtype=np.int32)
+        self.composition_table = list(composition_table)
+        if adduct_ions is None:
+            adduct_ions = np.zeros((len(self.delta), len(ADDUCT_FIELDS)), dtype=np.float64)
+        self.adduct_ions = np.asarray(adduct_ions, dtype=np.float64)
+        self._submitted = None
+
+    def __len__(self):
+        return len(self.user_mass)
+
+    @property
+    def n_hits(self) -> int:
+        return len(self.delta)
+
+    @classmethod
+    def from_submitted(cls, submitted_masses, source=None):
+        """Builds store from list of SubmittedMass objects.
+        Masses that are objects of source.submitted() keep their interned header lines."""
+        columns = {
+            "user_mass": [], "adduct": [], "adduct_mass": [], "red_end_tag": [], "red_end_tag_mass": [],
+            "header": [], "hit_offsets": [0], "theoretical_MH": [], "delta": [], "composition": [],
+        }
+        compositions = {}
+        adduct_ions = []
+        # object ids are stable while source keeps its submitted list
+        source_headers = {}
+        if source is not None and source._submitted is not None:
+            source_headers = {id(mass): header for mass, header in zip(source._submitted, source.header.tolist())}
+        for mass in submitted_masses:
+            columns["user_mass"].append(mass.experimental_mass)
+            columns["adduct"].append(mass.adduct)
+            columns["adduct_mass"].append(mass.adduct_mass)
+            columns["red_end_tag"].append(mass.red_end_tag)
+            columns["red_end_tag_mass"].append(mass.red_end_tag_mass)
+            columns["header"].append(source_headers.get(id(mass), -1))
+            for hit in mass.glycomod_structures:
+                columns["theoretical_MH"].append(hit.theoretical_MH)
+                columns["delta"].append(hit.delta)
+                columns["composition"].append(
+                    compositions.setdefault((hit.long_notation, hit.short_notation), len(compositions))
+                )
+                adduct_ions.append([getattr(hit, field) for field, _ in ADDUCT_FIELDS])
+            columns["hit_offsets"].append(len(columns["delta"]))
+        return cls(
+            header_table=source.header_table if source_headers else (),
+            composition_table=list(compositions),
+            adduct_ions=np.asarray(adduct_ions, dtype=np.float64).reshape(-1, len(ADDUCT_FIELDS)),
+            **columns
+        )
+
+    @classmethod
+    def concat(cls, stores):
+        """Joins stores in given order, interned composition and header tables are merged"""
+        columns = {
+            "user_mass": [], "adduct": [], "adduct_mass": [], "red_end_tag": [], "red_end_tag_mass": [],
+            "header": [], "hit_offsets": [np.zeros(1, dtype=np.int64)], "theoretical_MH": [], "delta": [],
+            "composition": [], "adduct_ions": [np.empty((0, len(ADDUCT_FIELDS)))],
+        }
+        compositions, headers = {}, {}
+        n_hits = 0
+        for store in stores:
+            composition_ids = np.array(
+                [compositions.setdefault(i, len(compositions)) for i in store.composition_table], dtype=np.int32
+            )
+            # last element maps header -1 (no interned header) to itself
+            header_ids = np.array([headers.setdefault(i, len(headers)) for i in store.header_table] + [-1], dtype=np.int32)
+            for name in ("user_mass", "adduct", "adduct_mass", "red_end_tag", "red_end_tag_mass",
+                         "theoretical_MH", "delta", "adduct_ions"):
+                columns[name].append(getattr(store, name))
+            columns["header"].append(header_ids[store.header])
+            columns["composition"].append(composition_ids[store.composition])
+            columns["hit_offsets"].append(store.hit_offsets[1:] + n_hits)
+            n_hits += store.n_hits
+        for name in ("user_mass", "adduct", "red_end_tag"):
+            columns[name] = [i for column in columns[name] for i in column]
+        for name in ("adduct_mass", "red_end_tag_mass", "header", "hit_offsets", "theoretical_MH", "delta",
+                     "composition", "adduct_ions"):
+            columns[name] = np.concatenate(columns[name]) if columns[name] else ()
+        return cls(composition_table=list(compositions), header_table=list(headers), **columns)
+
+    def header_lines(self, index) -> tuple:
+        """Glycomod 'Adduct' and 'Derivative mass' lines of mass at index"""
+        header = self.header[index]
+        if header >= 0:
+            return self.header_table[header]
+        tag = self.red_end_tag[index]
+        return (
+            f"Adduct ([M+{self.adduct[index][:-1]}]+): {self.adduct_mass[index]}",
+            f"Derivative mass ({tag if tag else 'Free reducing end'}): {self.red_end_tag_mass[index]}",
+        )
+
+    def not_found_ids(self) -> list:
+        """Indices of NOT_FOUND in composition_table, stores built from SubmittedMass objects can have it anywhere"""
+        return [i for i, composition in enumerate(self.composition_table) if composition == NOT_FOUND]
+
+    def found(self) -> np.ndarray:
+        """Boolean array, True for masses with at least one matched composition"""
+        not_found = self.not_found_ids()
+        found = np.zeros(len(self), dtype=bool)
+        has_hits = np.diff(self.hit_offsets) > 0
+        found[has_hits] = ~np.isin(self.composition[self.hit_offsets[:-1][has_hits]], not_found)
+        return found
+
+    def hits(self, index) -> range:
+        return range(self.hit_offsets[index], self.hit_offsets[index + 1])
+
+    def select_hits(self, masses, user_mass, owner, hit, delta=None) -> "ResultStore":
+        """Returns new store of masses (indices of masses in self, labelled user_mass) and hit rows of self.
+        owner -> index of new mass every hit belongs to, delta -> replaces delta of hits when given.
+        Masses left without hits get NOT_FOUND hit, NOT_FOUND is added to composition_table if missing."""
+        masses = np.asarray(masses, dtype=np.int64)
+        n_masses = len(masses)
+        delta = self.delta[hit] if delta is None else delta
+        # masses without hits are marked with hit -1
+        not_found = np.flatnonzero(np.bincount(owner, minlength=n_masses) == 0)
+        owner = np.concatenate((owner, not_found))
+        hit = np.concatenate((hit, np.full(len(not_found), -1)))
+        delta = np.concatenate((delta, np.full(len(not_found), 1000.0)))
+        order = np.argsort(owner, kind="stable")
+        owner, hit, delta = owner[order], hit[order], delta[order]
+        found = hit >= 0
+        adduct_ions = np.zeros((len(hit), self.adduct_ions.shape[1]), dtype=np.float64)
+        adduct_ions[found] = self.adduct_ions[hit[found]]
+        rows = masses.tolist()
+        composition_table = self.composition_table
+        not_found_ids = self.not_found_ids()
+        if not_found_ids:
+            not_found_id = not_found_ids[0]
+        else:
+            not_found_id = len(composition_table)
+            composition_table = composition_table + [NOT_FOUND]
+        return ResultStore(
+            user_mass=user_mass,
+            adduct=[self.adduct[i] for i in rows],
+            adduct_mass=self.adduct_mass[masses],
+            red_end_tag=[self.red_end_tag[i] for i in rows],
+            red_end_tag_mass=self.red_end_tag_mass[masses],
+            header=self.header[masses],
+            header_table=self.header_table,
+            hit_offsets=np.concatenate(([0], np.cumsum(np.bincount(owner, minlength=n_masses)))),
+            theoretical_MH=np.where(found, self.theoretical_MH[hit], 0.0),
+            delta=delta,
+            composition=np.where(found, self.composition[hit], not_found_id),
+            composition_table=composition_table,
+            adduct_ions=adduct_ions,
+        )
+
+    def filter_hits(self, keep) -> "ResultStore":
+        """Returns store with hits where keep is True, masses left without hits get NOT_FOUND hit"""
+        owner = np.repeat(np.arange(len(self)), np.diff(self.hit_offsets))
+        hit = np.flatnonzero(np.asarray(keep, dtype=bool) & ~np.isin(self.composition, self.not_found_ids()))
+        return self.select_hits(np.arange(len(self)), self.user_mass, owner[hit], hit)
+
+    def experimental_masses(self) -> np.ndarray:
+        """Submitted masses as float64 array"""
+        return np.array(self.user_mass, dtype=np.float64)
+
+    def iter_submitted(self):
+        """Yields SubmittedMass objects with GlycomodComposition for every hit"""
+        theoretical_MH = self.theoretical_MH.tolist()
+        delta = self.delta.tolist()
+        composition = self.composition.tolist()
+        adduct_ions = self.adduct_ions.tolist()
+        fields = [field for field, _ in ADDUCT_FIELDS]
+        for index in range(len(self)):
+            structures = []
+            for row in self.hits(index):
+                long_notation, short_notation = self.composition_table[composition[row]]
+                structures.append(
+                    GlycomodComposition(
+                        theoretical_MH=theoretical_MH[row],
+                        delta=delta[row],
+                        long_notation=long_notation,
+                        short_notation=short_notation,
+                        **dict(zip(fields, adduct_ions[row]))
+                    )
+                )
+            yield SubmittedMass(
+                experimental_mass=self.user_mass[index],
+                adduct=self.adduct[index],
+                adduct_mass=float(self.adduct_mass[index]),
+                red_end_tag=self.red_end_tag[index],
+                red_end_tag_mass=float(self.red_end_tag_mass[index]),
+                glycomod_structures=structures
+            )
+
+    def submitted(self) -> list:
+        """List of SubmittedMass objects, built once and reused"""
+        if self._submitted is None:
+            self._submitted = list(self.iter_submitted())
+        return self._submitted
+
+    def _table_columns(self, adduct=False) -> list:
+        """Arrays of one row per hit, in order of SubmittedMass.prep_csv_out(adduct)"""
+        mass_index = np.repeat(np.arange(len(self)), np.diff(self.hit_offsets))
+        long_notation = np.array([i[0] for i in self.composition_table] or [""], dtype=object)
+        short_notation = np.array([i[1] for i in self.composition_table] or [""], dtype=object)
+        adduct_column = {name: i for i, (_, name) in enumerate(ADDUCT_FIELDS)}
+        return [
+            np.array(self.user_mass, dtype=object)[mass_index],
+            np.array(self.red_end_tag, dtype=object)[mass_index],
+            self.red_end_tag_mass[mass_index],
+            short_notation[self.composition],
+            long_notation[self.composition],
+            self.theoretical_MH,
+            self.delta,
+        ] + [self.adduct_ions[:, adduct_column[name]] for name in CSV_ADDUCT_ORDER] + (
+            [np.array(self.adduct, dtype=object)[mass_index]] if adduct else []
+        )
+
+    def to_columns(self, col_names) -> dict:
+        """{column name: list of values}, same columns as to_dataframe(), without pandas"""
+        columns = self._table_columns(adduct=ADDUCT_COLUMN in col_names)
+        return {name: column.tolist() for name, column in zip(col_names, columns)}
+
+    def to_dataframe(self, col_names):
+        """One row per hit, columns ordered as SubmittedMass.prep_csv_out()"""
+        import pandas as pd
+        columns = self._table_columns(adduct=ADDUCT_COLUMN in col_names)
+        return pd.DataFrame(dict(zip(col_names, columns)), columns=col_names)
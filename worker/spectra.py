@@ -0,0 +1,216 @@
+# -*- coding: UTF-8 -*-
+import os
+import zlib
+import base64
+from typing import NamedTuple
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from .peaklist import PeakList, read_peak_list
+
+# config.json/"peak_picking", missing keys are taken from here
+PEAK_PICKING_DEFAULTS = {
+    "ms_level": 1,
+    "min_intensity": 0.0,
+    "relative_intensity": 0.01,
+    "decimals": 4,
+}
+SPECTRUM_EXTENSIONS = (".mzml", ".mgf")
+INPUT_EXTENSIONS = (".txt",) + SPECTRUM_EXTENSIONS
+
+# mzML controlled vocabulary (PSI-MS) accessions
+_MS_LEVEL = "MS:1000511"
+_PROFILE = "MS:1000128"
+_MZ_ARRAY = "MS:1000514"
+_INTENSITY_ARRAY = "MS:1000515"
+_FLOAT32 = "MS:1000521"
+_FLOAT64 = "MS:1000523"
+_ZLIB = "MS:1000574"
+_NO_COMPRESSION = "MS:1000576"
+
+
+class Spectrum(NamedTuple):
+    """One spectrum of run file.
+        mz, intensity -> float64 arrays
+        ms_level -> None if not given (MGF)
+        centroided -> False for profile spectra, which are centroided by pick_peaks
+    """
+    id: str
+    ms_level: int
+    centroided: bool
+    mz: np.ndarray
+    intensity: np.ndarray
+
+
+def _local_name(tag) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _cv_params(element) -> dict:
+    """{accession: value} of cvParams directly under element"""
+    return {
+        child.get("accession"): child.get("value")
+        for child in element if _local_name(child.tag) == "cvParam"
+    }
+
+
+def _decode_array(array_element):
+    """Returns (array accession, float64 array) of mzML binaryDataArray"""
+    params = _cv_params(array_element)
+    if _FLOAT64 in params:
+        dtype = "<f8"
+    elif _FLOAT32 in params:
+        dtype = "<f4"
+    else:
+        raise ValueError("Unsupported mzML binary data type, only 32 and 64-bit floats are supported")
+    if _ZLIB not in params and _NO_COMPRESSION not in params:
+        raise ValueError("Unsupported mzML compression, only zlib and no compression are supported")
+    binary = next((i for i in array_element if _local_name(i.tag) == "binary"), None)
+    data = base64.b64decode(binary.text or "") if binary is not None else b""
+    if _ZLIB in params and data:
+        data = zlib.decompress(data)
+    kind = _MZ_ARRAY if _MZ_ARRAY in params else _INTENSITY_ARRAY if _INTENSITY_ARRAY in params else None
+    return kind, np.frombuffer(data, dtype=dtype).astype(np.float64)
+
+
+def _mzml_spectrum(element) -> Spectrum:
+    params = _cv_params(element)
+    arrays = {}
+    for child in element:
+        if _local_name(child.tag) == "binaryDataArrayList":
+            for array_element in child:
+                kind, array = _decode_array(array_element)
+                arrays[kind] = array
+    empty = np.empty(0, dtype=np.float64)
+    mz, intensity = arrays.get(_MZ_ARRAY, empty), arrays.get(_INTENSITY_ARRAY, empty)
+    if len(mz) != len(intensity):
+        raise ValueError(f"Spectrum {element.get('id')} has {len(mz)} m/z and {len(intensity)} intensity values")
+    ms_level = int(params[_MS_LEVEL]) if params.get(_MS_LEVEL) else None
+    return Spectrum(element.get("id", ""), ms_level, _PROFILE not in params, mz, intensity)
+
+
+def iter_mzml(path):
+    """Yields Spectrum of every spectrum in mzML file, one at a time.
+    Parsed spectra are dropped from XML tree, so memory does not grow with size of the file."""
+    context = ET.iterparse(path, events=("start", "end"))
+    parent = None
+    for event, element in context:
+        name = _local_name(element.tag)
+        if event == "start":
+            if name == "spectrumList":
+                parent = element
+            continue
+        if name == "spectrum":
+            yield _mzml_spectrum(element)
+            element.clear()
+            if parent is not None:
+                parent.remove(element)
+
+
+def _mgf_spectrum(title, peak_lines) -> Spectrum:
+    try:
+        peaks = np.array([line.split()[:2] for line in peak_lines], dtype=np.float64).reshape(-1, 2)
+    except ValueError:
+        raise ValueError(f"Invalid peak line in MGF spectrum '{title}'")
+    return Spectrum(title, None, True, peaks[:, 0].copy(), peaks[:, 1].copy())
+
+
+def iter_mgf(path):
+    """Yields Spectrum of every BEGIN IONS ... END IONS block of MGF file, one at a time.
+    MGF peak lists are centroided."""
+    with open(path, "r") as infile:
+        title, peak_lines, in_spectrum = "", [], False
+        for line in infile:
+            line = line.strip()
+            if not line or line[0] in "#;!/":
+                continue
+            upper = line.upper()
+            if upper == "BEGIN IONS":
+                title, peak_lines, in_spectrum = "", [], True
+            elif upper == "END IONS":
+                if in_spectrum:
+                    yield _mgf_spectrum(title, peak_lines)
+                in_spectrum = False
+            elif in_spectrum:
+                if "=" in line:
+                    if upper.startswith("TITLE="):
+                        title = line[len("TITLE="):]
+                else:
+                    peak_lines.append(line)
+
+
+def iter_spectra(path):
+    """iter_mzml or iter_mgf, chosen by file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".mzml":
+        return iter_mzml(path)
+    if extension == ".mgf":
+        return iter_mgf(path)
+    raise ValueError(f"Unsupported spectrum file {path}, supported: {list(SPECTRUM_EXTENSIONS)}")
+
+
+def pick_peaks(spectrum, min_intensity=0.0, relative_intensity=0.0) -> np.ndarray:
+    """Returns m/z of peaks above max(min_intensity, relative_intensity * base peak intensity).
+    Profile spectra are centroided: every local intensity maximum becomes one peak at
+    intensity-weighted m/z of the maximum and its two neighbours.
+        ### EXAMPLE ###
+        >>>pick_peaks(spectrum, relative_intensity=0.01)
+        >>>array([ 911.3012, 1057.3371])
+    """
+    mz, intensity = spectrum.mz, spectrum.intensity
+    if not len(mz):
+        return np.empty(0, dtype=np.float64)
+    threshold = max(min_intensity, relative_intensity * intensity.max())
+    if spectrum.centroided:
+        return mz[(intensity >= threshold) & (intensity > 0)]
+    if len(mz) < 3:
+        return np.empty(0, dtype=np.float64)
+    left, center, right = intensity[:-2], intensity[1:-1], intensity[2:]
+    # flat tops count once, at their first point
+    apex = np.flatnonzero((center > left) & (center >= right) & (center >= threshold) & (center > 0)) + 1
+    weights = intensity[apex - 1] + intensity[apex] + intensity[apex + 1]
+    return (
+        mz[apex - 1] * intensity[apex - 1] + mz[apex] * intensity[apex] + mz[apex + 1] * intensity[apex + 1]
+    ) / weights
+
+
+def read_spectra(path, options=None) -> PeakList:
+    """Reads mzML or MGF file spectrum by spectrum and returns picked peaks of all spectra as PeakList.
+    Only picked m/z values are kept in memory, never the whole run.
+    Peaks are rounded to "decimals" and merged across spectra, so m/z found in many scans is searched once.
+    Masses are sorted.
+        options -> config.json/"peak_picking" (see PEAK_PICKING_DEFAULTS), ms_level null keeps all spectra
+        ### EXAMPLE ###
+        >>>peaks = read_spectra("run.mzML", {"relative_intensity": 0.05})
+        >>>peaks.labels
+        >>>['911.3012', '1057.3371']
+    """
+    options = {**PEAK_PICKING_DEFAULTS, **(options or {})}
+    ms_level = options["ms_level"]
+    picked = []
+    for spectrum in iter_spectra(path):
+        if ms_level is not None and spectrum.ms_level is not None and spectrum.ms_level != ms_level:
+            continue
+        picked.append(pick_peaks(
+            spectrum, min_intensity=float(options["min_intensity"]),
+            relative_intensity=float(options["relative_intensity"]),
+        ))
+    decimals = int(options["decimals"])
+    masses = np.unique(np.round(np.concatenate(picked) if picked else np.empty(0, dtype=np.float64), decimals))
+    return PeakList(masses, [f"{i:.{decimals}f}" for i in masses.tolist()])
+
+
+def read_input(path, options=None) -> PeakList:
+    """Reads masses of .txt peak list (see peaklist.read_peak_list) or peaks picked from .mzML/.mgf file.
+    Raises TypeError for other files.
+        options -> config.json/"peak_picking", used for spectrum files
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".txt":
+        return read_peak_list(path)
+    if extension in SPECTRUM_EXTENSIONS:
+        return read_spectra(path, options)
+    raise TypeError(
+        f"Unsupported input file {path}. Please provide text (.txt) file with masses, or .mzML or .mgf file."
+    )
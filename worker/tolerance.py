@@ -0,0 +1,48 @@
+# -*- coding: UTF-8 -*-
+import math
+
+import numpy as np
+
+# decimals of tolerance sent to Glycomod
+QUERY_DECIMALS = 4
+
+
+def parse_tolerance(value) -> tuple:
+    """Returns (Da, ppm) of config.json/"Tolerance". Plain numbers are Da,
+    ppm and mixed tolerances are written with units, window of every mass is Da + ppm*mass/1e6.
+        ### EXAMPLE ###
+        >>>parse_tolerance("0.5")
+        >>>(0.5, 0.0)
+        >>>parse_tolerance("10 ppm")
+        >>>(0.0, 10.0)
+        >>>parse_tolerance("0.01 Da + 5 ppm")
+        >>>(0.01, 5.0)
+    """
+    da, ppm = 0.0, 0.0
+    for part in str(value).lower().split("+"):
+        part = part.strip()
+        try:
+            if part.endswith("ppm"):
+                ppm += float(part[:-len("ppm")])
+            elif part.endswith("da"):
+                da += float(part[:-len("da")])
+            else:
+                da += float(part)
+        except ValueError:
+            raise ValueError(f"Invalid tolerance '{value}', expected e.g. '0.5', '10 ppm' or '0.01 Da + 5 ppm'")
+    if da < 0 or ppm < 0 or not da + ppm:
+        raise ValueError(f"Invalid tolerance '{value}', tolerance must be positive")
+    return da, ppm
+
+
+def tolerance_windows(masses, tolerance) -> np.ndarray:
+    """Half-width (Da) of tolerance window of every mass, tolerance is (Da, ppm) from parse_tolerance"""
+    da, ppm = tolerance
+    return da + ppm * 1e-6 * np.asarray(masses, dtype=np.float64)
+
+
+def query_tolerance(window) -> str:
+    """Da tolerance for Glycomod, rounded up so no hit within window is missed"""
+    scale = 10**QUERY_DECIMALS
+    # float error (0.04500000000001592) does not round up
+    return f"{math.ceil(float(window) * scale - 1e-6) / scale:.{QUERY_DECIMALS}f}"
@@ -1,9 +1,17 @@
 # -*- coding: UTF-8 -*-
-import re
+import os
+import json
+import time
+import tempfile
 from http.client import HTTPConnection
 from typing import Dict
 import hashlib
 
+import numpy as np
+
+# MASS_TYPES: "mono" -> monoisotopic masses, "avg" -> average masses (config.json/"<mass type>_masses_underivatized")
+from .mass_config import MASS_TYPES, MassConfig, compile_config
+
 # Cytonize all util functions??
 
 def string_to_dict(string)-> Dict[str, int]:  
@@ -72,69 +80,137 @@ def truncated_str_from_dict(dictionary):
         f"{'HexA' + str(dictionary['(HexA)']) if dictionary.get('(HexA)') else ''}" 
 
 
-def calc_theor_mono_mass(dictionary, cfg, prec=6, reducing_end=None) -> float:
-    """Returns theoretical monoisotopic mass for glycan in dictionary form
-        - reducing end type specified by reducing_end parameter ("2-AB" or "ProA") ELSE treated as unlabeled nonreduced"""
+def _masses_and_tag(cfg, reducing_end, mass_type="mono") -> tuple:
+    """Returns (residue masses, reducing end tag mass) of MassConfig, config dicts are read directly.
+    Helpers for one glycan do not compile dicts (see mass_config.compile_config), so they cost the same
+    as before MassConfig and always see edits of the dict."""
+    if isinstance(cfg, MassConfig):
+        config = compile_config(cfg, mass_type)
+        return config.masses, config.tag_mass(reducing_end)
     reducing_end_tag_mass = 0.0
     if reducing_end is not None:
-        if reducing_end in cfg["reducing_end_tag_mono"].keys():
-            reducing_end_tag_mass = cfg["reducing_end_tag_mono"][reducing_end]
-        else:
-            raise ValueError(f"Invalid reducing end tag. Available tags:  {list(cfg['reducing_end_tag'].keys())}")
+        tags = cfg.get(f"reducing_end_tag_{mass_type}")
+        if not isinstance(tags, dict) or reducing_end not in tags:
+            raise ValueError(f"Invalid reducing end tag: {reducing_end}")
+        reducing_end_tag_mass = tags[reducing_end]
+    return cfg[f"{mass_type}_masses_underivatized"], reducing_end_tag_mass
+
+
+def calc_theor_mono_mass(dictionary, cfg, prec=6, reducing_end=None) -> float:
+    """Returns theoretical monoisotopic mass for glycan in dictionary form
+        - reducing end type specified by reducing_end parameter ("2-AB" or "ProA") ELSE treated as unlabeled nonreduced
+    cfg is config dict or MassConfig compiled from it (see mass_config.compile_config)"""
+    masses, reducing_end_tag_mass = _masses_and_tag(cfg, reducing_end)
     # I don't know why there is H3O+, but it is in accordance with what Glycomod and Glycoworkbench show as mono masses
     return round(
-        sum(
-            [
-                dictionary[key]*cfg["mono_masses_underivatized"][key]
-                for key in dictionary.keys()
-            ]
-        ) + cfg["mono_masses_underivatized"]["H3O+"] + reducing_end_tag_mass,
+        sum([dictionary[key]*masses[key] for key in dictionary]) + masses["H3O+"] + reducing_end_tag_mass,
         prec
     )
 
 
 def _calc_theor_mono_mass_adducts(dictionary, cfg, charge, reducing_end_mass, adduct_mass, prec=6):
+    masses, _ = _masses_and_tag(cfg, None)
     return round(
-        (sum(
-            [
-                dictionary[key]*cfg["mono_masses_underivatized"][key]
-                for key in dictionary.keys()
-            ]
-        ) + cfg["mono_masses_underivatized"]["H2O"] + reducing_end_mass + adduct_mass) / charge,
+        (sum([dictionary[key]*masses[key] for key in dictionary]) + masses["H2O"] + reducing_end_mass + adduct_mass) / charge,
         prec
     )
 
 
 def calc_default_adducts_mono(dictionary, cfg, prec=4, reducing_end=None):
-    reducing_end_tag_mass = 0.0
-    if reducing_end is not None:
-        if reducing_end in cfg["reducing_end_tag_mono"].keys():
-            reducing_end_tag_mass = cfg["reducing_end_tag_mono"][reducing_end]
-        else:
-            raise ValueError(f"Invalid reducing end tag. Available tags: {list(cfg['reducing_end_tag'].keys())}")
-    adduct_ions = {
-        i: _calc_theor_mono_mass_adducts(dictionary, cfg, j[1], reducing_end_tag_mass, j[0], prec=prec) for i,j in cfg["adducts"].items()
-    }
-    return adduct_ions
+    """Returns {adduct: theoretical m/z} of config.json/"adducts" for glycan in dictionary form.
+    Composition mass is summed once for all adducts, values are the same as _calc_theor_mono_mass_adducts"""
+    masses, reducing_end_tag_mass = _masses_and_tag(cfg, reducing_end)
+    if isinstance(cfg, MassConfig):
+        cfg.require("adducts")
+        adducts = cfg.adducts
+    elif isinstance(cfg.get("adducts"), dict):
+        adducts = [(name, mass, charge) for name, (mass, charge) in cfg["adducts"].items()]
+    else:
+        raise ValueError("Invalid config, missing sections: ['adducts']")
+    base = sum([dictionary[key]*masses[key] for key in dictionary]) + masses["H2O"] + reducing_end_tag_mass
+    return {name: round((base + mass) / charge, prec) for name, mass, charge in adducts}
+
+
+def round_array(values, prec):
+    """Rounds array exactly like built-in round(float, prec), values close to a tie fall back to round()"""
+    scaled = values * 10.0**prec
+    rounded = np.round(values, prec)
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in zip(*np.nonzero(near_tie)):
+        rounded[index] = round(float(values[index]), prec)
+    return rounded
+
+
+def adduct_table(cfg, mass_type="mono") -> dict:
+    """Returns config.json/"adducts" for mono masses, config.json/"adducts_avg" for average masses"""
+    return cfg["adducts"] if mass_type == "mono" else cfg["adducts_avg"]
+
+
+def adduct_ion_label(name, charge) -> str:
+    """Returns ion notation of config.json/"adducts" entry, as in Glycomod 'Adduct' line
+        ### EXAMPLE ###
+        >>>adduct_ion_label("Na+", 1)
+        >>>"[M+Na]+"
+        >>>adduct_ion_label("HNa2+", 2)
+        >>>"[M+HNa]2+"
+    """
+    ion = name.rstrip("+")
+    if charge > 1 and ion.endswith(str(charge)):
+        ion = ion[:-len(str(charge))]
+    return f"[M+{ion}]{charge if charge > 1 else ''}+"
+
+
+def calc_adducts_batch(dictionaries, cfg, prec=4, reducing_end=None, mass_type="mono"):
+    """Vectorized calc_default_adducts_mono for many glycans at once.
+    Returns (adduct names, array[len(dictionaries), len(adducts)]), mono values are identical
+    to calc_default_adducts_mono.
+    With mass_type="avg", average residue, tag and adduct masses are used
+    (config.json/"avg_masses_underivatized", "reducing_end_tag_avg", "adducts_avg").
+    cfg is config dict or MassConfig compiled from it (see mass_config.compile_config).
+
+    Residue masses are summed position by position, in the key order of every dictionary,
+    so floating point sums come out exactly as with built-in sum()."""
+    config = compile_config(cfg, mass_type)
+    config.require("adducts")
+    reducing_end_tag_mass = config.tag_mass(reducing_end)
+    rows, columns, positions, counts = config.indices(dictionaries)
+    n_terms = int(columns.max()) + 1 if len(columns) else 0
+    products = np.zeros((len(dictionaries), n_terms), dtype=np.float64)
+    products[rows, columns] = counts * config.mass_vector[positions]
+    totals = np.zeros(len(dictionaries), dtype=np.float64)
+    for column in range(n_terms):
+        totals = totals + products[:, column]
+    totals = totals + config.water + reducing_end_tag_mass
+    adduct_ions = (totals[:, None] + config.adduct_masses[None, :]) / config.adduct_charges[None, :]
+    return list(config.adduct_names), round_array(adduct_ions, prec)
+
+
+def calc_adducts_mono_batch(dictionaries, cfg, prec=4, reducing_end=None):
+    """calc_adducts_batch with monoisotopic masses"""
+    return calc_adducts_batch(dictionaries, cfg, prec=prec, reducing_end=reducing_end)
 
 
 def calc_theor_avg_mass(dictionary, cfg, prec=6, reducing_end=None) -> float:
     """Returns theoretical average mass for glycan in dictionary form"""
-    reducing_end_tag_mass = 0.0
-    if reducing_end is not None:
-        if reducing_end in cfg["reducing_end_tag_avg"].keys():
-            reducing_end_tag_mass = cfg["reducing_end_tag_avg"][reducing_end]
+    if isinstance(cfg, MassConfig):
+        config = compile_config(cfg, "avg")
+        masses, tags = config.masses, config.tags
+    else:
+        masses, tags = cfg["avg_masses_underivatized"], cfg.get("reducing_end_tag_avg") or {}
+    # unknown tags are treated as free reducing end
+    reducing_end_tag_mass = tags.get(reducing_end, 0.0)
     return round(
-        sum(
-            [
-                dictionary[key]*cfg["avg_masses_underivatized"][key] 
-                for key in dictionary.keys()
-                ]
-            ) + cfg["avg_masses_underivatized"]["H3O+"] + reducing_end_tag_mass,
+        sum([dictionary[key]*masses[key] for key in dictionary]) + masses["H3O+"] + reducing_end_tag_mass,
         prec
     )
 
 
+def config_checksum(cfg, sections) -> str:
+    """Returns sha256 hex digest of config sections, used to detect config.json modifications"""
+    relevant = {section: cfg.get(section) for section in sections}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
 def check_internet_conn():
     conn = HTTPConnection("www.google.com", timeout=5)
     try:
@@ -146,6 +222,27 @@ def check_internet_conn():
         return False
 
 
+def check_internet_conn_cached(max_age=300, path=None):
+    """check_internet_conn() result is remembered for max_age seconds, so runs started
+    shortly one after another do not wait for connection check again.
+    Only successful checks are remembered (modification time of file at path)."""
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), "glycomodworker_conn_ok")
+    try:
+        if time.time() - os.path.getmtime(path) < max_age:
+            return True
+    except OSError:
+        pass
+    connected = check_internet_conn()
+    if connected:
+        try:
+            with open(path, "w") as f:
+                f.write(str(time.time()))
+        except OSError:
+            pass
+    return connected
+
+
 def validate_filename(string):
     filename = ""
     if len(string) > 1:
@@ -160,9 +257,6 @@ def validate_filename(string):
 
 
 def check_text_input_consistency(string):
-    stripped_text = re.sub(r'\s+', '', string)
-    for char in stripped_text:
-        if char.isdigit() or char == ".":
-            continue
-        else:
-            raise ValueError(f"Your input contains invalid character '{char}'; Input should consist of floating point numbers.")
+    """Raises ValueError listing lines of string which are not floating point numbers (see peaklist.parse_peak_text)"""
+    from .peaklist import parse_peak_text
+    parse_peak_text(string)
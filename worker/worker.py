@@ -1,19 +1,49 @@
 # -*- coding: UTF-8 -*-
+import io
 import os
+import sys
 import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import arrow
-import pandas as pd
-from bs4 import BeautifulSoup
+import numpy as np
 from toolz.itertoolz import concat
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import Select
 
-from .data_types import GlycomodComposition, SubmittedMass
-from .utils import string_to_dict
-from .utils import calc_default_adducts_mono
-from .utils import truncated_str_from_dict
+from .result_store import ResultStore, ADDUCT_FIELDS, NOT_FOUND, ADDUCT_COLUMN
+from .utils import round_array
+from .utils import calc_adducts_batch, adduct_table, adduct_ion_label, MASS_TYPES
+from .mass_config import compile_config
+from .compositions import parse_composition
+from .local_search import LocalSearchEngine
+from .mass_index import MassIndex
+from .cache import ResultCache
+from .writers import open_writer, write_text_report, OUTPUT_FORMATS
+from .metrics import measured
+from .peaklist import PeakList, parse_peak_text
+from .dedup import MassClusters
+from .tolerance import parse_tolerance, tolerance_windows, query_tolerance
+from .journal import RunJournal, input_checksum
+from .utils import config_checksum
+
+BACKENDS = ("selenium", "http", "local")
+# masses per journal entry when chunk_size is not set
+JOURNAL_CHUNK_SIZE = 100
+HTML_PARSERS = ("lxml", "reference")
+
+
+def _count_submitted(worker, text_input=None):
+    return {"masses": len((text_input or worker.text_input).split())}
+
+
+def _count_parsed(worker, *args, **kwargs):
+    # result lines of matched compositions, 'N structures' lines are left out
+    hits = sum(1 for result in worker.parsed_data for line in result if line[:1].isdigit() and "structure" not in line)
+    return {"masses": len(worker.parsed_data), "hits": hits}
+
+
+def _count_results(worker, *args, **kwargs):
+    return {"masses": len(worker.results), "hits": worker.results.n_hits}
 
 
 class GlycomodWorker:
@@ -23,7 +53,8 @@ class GlycomodWorker:
     ### So far only MASSES FROM POSITIVE MODE MS CAN BE USED. ###
     ### So far only H+ is USED AS ADDUCT. ###
 
-    Results can be reported as .csv or .txt.
+    Results can be reported as .csv or .txt, or as .parquet/.feather (output_format, requires pyarrow).
+    Table rows are written as SubmittedMass objects are produced (see writers).
     Masses without matches on Glycomod are reported as NOT FOUND.
 
     EXAMPLE - from html - all relevant data from web
@@ -36,10 +67,13 @@ class GlycomodWorker:
 
     Data in EXAMPLE gets parsed and stored as objects used for reporting and calculations.
 
-    Monoisotopic or average masses can be used.
+    Monoisotopic or average masses can be used (mass_type "mono" or "avg"). Search, reducing end tag,
+    adduct masses and adduct columns all use masses of selected type.
 
-    At this point only Da can be used when specifying mass error.
-    Default mass error tolerance is 0.5 Da.
+    Mass error tolerance (config.json/"Tolerance") is given in Da ("0.5"), ppm ("10 ppm")
+    or both ("0.01 Da + 5 ppm"), see tolerance.parse_tolerance. Default is 0.5 Da.
+    Glycomod accepts only Da, so with ppm "selenium" and "http" backends submit Da tolerance
+    of the widest window and leave out hits outside window of every mass.
 
     Glycan search properties - monosaccharide presence and number(range) can be
     configured in config.json/"default_mono" and config.json/"default_occurences"
@@ -47,265 +81,809 @@ class GlycomodWorker:
         1 -> "possible" -> monosaccharide may be present
         0 -> "no" -> glycan MUST NOT CONTAIN specified monosaccharide
     BY DEFAULT ONLY N-glycans CONTAINING (Man)3(GlcNAc)2 ARE SELECTED
+
+    Search backend:
+        "selenium" -> Glycomod form is submitted through headless Chrome
+        "http" -> Glycomod form is submitted directly over pooled HTTP connections (see GlycomodHTTPClient)
+        "local" -> compositions are enumerated and matched locally (see LocalSearchEngine)
+            precomputed MassIndex is used when it exists for current config
+
+    Large mass lists can be split into chunks of chunk_size masses which are submitted
+    concurrently by max_workers threads ("selenium" and "http" backends).
+    Failed chunks are resubmitted up to chunk_retries times.
+
+    Glycomod HTML is parsed with lxml (see gm_parser.parse_gm_html), html_parser="reference"
+    uses original BeautifulSoup/html5lib parser (gm_parser.parse_gm_soup).
+
+    With keep_browser, started Chrome browsers are kept and reused for next fetches until close(),
+    reset() prepares worker for the next input (see batch.run_batch).
+
+    With pipeline, fetching, parsing, result creation and output run as overlapping asyncio stages,
+    chunk by chunk (see pipeline.SearchPipeline).
+
+    With metrics (see metrics.RunMetrics), wall time, item counts and peak memory of run() and
+    every stage are recorded.
+
+    With use_cache, per-mass results are stored in ResultCache and only masses
+    missing from cache are searched.
+
+    Masses can be given as text_input or as peaks (see peaklist.read_peak_list), whose
+    float array is searched directly by the "local" backend.
+
+    With dedup, masses closer than dedup*Tolerance are searched as one query window and
+    results are fanned back out to every mass (see dedup.MassClusters). Not used with pipeline.
+
+    With adducts (names from config.json/"adducts" or "all", "local" backend only), every mass is searched
+    as m/z of every adduct and charge at once, every match keeps the adduct that explains it
+    (ADDUCT_COLUMN of results table). Cache, journal and dedup are not used.
+
+    With journal (path), results of every completed chunk are appended to RunJournal, so run()
+    interrupted by browser or network failure resumes from completed chunks when started again
+    with the same input and config. Journal is removed when output is written.
     """
-    def __init__(self, cfg, driver_path="", text_input="", reducing_end=None, adduct="H+", save_txt=False, filename=""):
-        self.driver = None
+    def __init__(self, cfg, driver_path="", text_input="", reducing_end=None, adduct="H+", save_txt=False, filename="", backend="selenium",
+                 chunk_size=0, max_workers=4, chunk_retries=2, use_cache=False, html_parser="lxml",
+                 output_format="csv", keep_browser=False, pipeline=False, metrics=None, peaks=None, dedup=0.0,
+                 journal=None, mass_type="mono", adducts=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend {backend}. Available backends: {list(BACKENDS)}")
+        if html_parser not in HTML_PARSERS:
+            raise ValueError(f"Unsupported HTML parser {html_parser}. Available parsers: {list(HTML_PARSERS)}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format {output_format}. Available formats: {list(OUTPUT_FORMATS)}")
+        if mass_type not in MASS_TYPES:
+            raise ValueError(f"Unsupported mass type {mass_type}. Available mass types: {list(MASS_TYPES)}")
+        if not 0.0 <= dedup <= 1.0:
+            raise ValueError(f"dedup must be a fraction of Tolerance between 0 and 1, got {dedup}")
+        if adducts:
+            if backend != "local":
+                raise ValueError("Multi-adduct search is supported only by 'local' backend")
+            available = adduct_table(cfg, mass_type)
+            adducts = list(available) if adducts == "all" else list(adducts)
+            unknown = [i for i in adducts if i not in available]
+            if unknown:
+                raise ValueError(f"Unsupported adducts {unknown}. Available adducts: {list(available)}")
+        self.html_parser = html_parser
+        self.output_format = output_format
+        self.backend = backend
+        self.engine = None
+        self.http_client = None
+        self.keep_browser = keep_browser
+        self.pipeline = pipeline
+        self.metrics = metrics
+        self.dedup = dedup
+        self.journal = journal
+        # RunJournal of last journaled search, removed by run() once output is written
+        self._run_journal = None
+        self.mass_type = mass_type
+        self.adducts = list(adducts or ())
+        # all browsers kept with keep_browser, and those not used at the moment
+        self._drivers = []
+        self._idle_drivers = []
+        self._drivers_lock = threading.Lock()
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.chunk_retries = chunk_retries
+        self.cache = ResultCache.from_config(cfg) if use_cache else None
         self.logger = logging.getLogger(name="Worker")
+        if pipeline and (dedup or journal):
+            self.logger.warning("dedup and journal are not used with pipeline, searching without pipeline")
+        if self.adducts and (pipeline or dedup or journal or use_cache):
+            self.logger.warning("pipeline, dedup, journal and cache are not used in multi-adduct search")
+        if pipeline and backend != "local" and parse_tolerance(cfg.get("Tolerance", "0.5"))[1]:
+            self.logger.warning("ppm tolerance is not used with pipeline on Glycomod, searching without pipeline")
         self.cfg=cfg
+        # mass sections validated once, used for adduct ions of every result
+        self.mass_config = compile_config(cfg, mass_type)
         self.driver_path = driver_path
         self.reducing_end_tag = None
         self.reducing_end_mass = 0.0
         self.reducing_end_mass_full = 0.0  # USED AS 'derivative_mass' field input in GM
         self.save_txt = save_txt
         self.filename = filename
-        self.text_input = text_input
+        self.peaks = peaks
+        self.text_input = peaks.text if peaks is not None else text_input
+        self.html = ""
         self.soup = None
         self.parsed_data = []
-        self.compositions = []
-        # configure webdriver
-        self.driver_options = Options()  
-        self.driver_options.add_argument("--headless") 
+        self._compositions = None
+        self.results = ResultStore()
+        # webdriver options are set when browser is first started (see _get_driver)
+        self.driver_options = None
         try:
             if reducing_end:
                 self.reducing_end_tag = reducing_end
-                self.reducing_end_mass = self.cfg["reducing_end_tag_mono"][reducing_end]   
-                self.reducing_end_mass_full = self.cfg["reducing_end_tag_mono_full"][reducing_end]      
+                self.reducing_end_mass = self.cfg[f"reducing_end_tag_{mass_type}"][reducing_end]
+                self.reducing_end_mass_full = self.cfg[f"reducing_end_tag_{mass_type}_full"][reducing_end]
         except ValueError as e:
             self.logger.error(f"End tag {reducing_end} not supported, supporting only 2-AB and ProA at this point\n{e}")
         try:
-            self.adduct_info = (adduct, self.cfg["mono_masses_underivatized"][adduct])
+            self.adduct_info = (adduct, self.cfg[f"{mass_type}_masses_underivatized"][adduct])
         except ValueError as e:
             self.logger.error(f"Adduct {adduct} not supported")
 
-    def output_csv(self):
-        out = list(concat([i.prep_csv_out() for i in self.compositions]))
-        df = pd.DataFrame.from_records(out, columns=self.cfg["col_names"])
-        if self.filename:
-            df.to_csv(str(self.filename) + ".csv", index=False)    
-        else:
+    @property
+    def results(self) -> ResultStore:
+        """Search results. Once compositions were used, results are built from that list, so its edits are kept.
+        Built store is reused until masses of the list or their compositions change."""
+        if self._compositions is None:
+            return self._results
+        # holds the objects themselves, so list edits are seen even when ids are reused
+        snapshot = [(mass, list(mass.glycomod_structures)) for mass in self._compositions]
+        if self._rebuilt is None or self._rebuilt[0] != snapshot:
+            self._rebuilt = (snapshot, ResultStore.from_submitted(self._compositions, source=self._results))
+        return self._rebuilt[1]
+
+    @results.setter
+    def results(self, store):
+        self._results = store
+        self._compositions = None
+        self._rebuilt = None
+
+    @property
+    def compositions(self) -> list:
+        """Results as list of SubmittedMass objects, same as before ResultStore was introduced.
+        The same list is returned until next search, appended or edited masses are used in output."""
+        if self._compositions is None:
+            # copy, so edits of the list do not change objects results were built from
+            self._compositions = list(self._results.submitted())
+        return self._compositions
+
+    @compositions.setter
+    def compositions(self, submitted_masses):
+        self._results = ResultStore()
+        self._compositions = submitted_masses
+        self._rebuilt = None
+
+    @measured("output_table", lambda worker, *args, **kwargs: {"rows": worker.results.n_hits})
+    def output_table(self, fmt=None):
+        """Writes results as .csv, .parquet or .feather (output_format), row by row,
+        without building whole table in memory (see writers.open_writer)"""
+        fmt = fmt or self.output_format
+        self._prepare_output()
+        with open_writer(fmt, self.filename, self._col_names()) as writer:
+            for submitted_mass in self.results.iter_submitted():
+                writer.write(submitted_mass)
+        self.logger.debug(f"Finished saving results as .{fmt}")
+
+    def _col_names(self) -> list:
+        """config.json/"col_names", multi-adduct results have adduct of every hit in ADDUCT_COLUMN"""
+        return list(self.cfg["col_names"]) + ([ADDUCT_COLUMN] if self.adducts else [])
+
+    def _prepare_output(self):
+        import arrow
+        if not self.filename:
             # set filename in case self.save_txt == True, both files should have the same name
             self.filename = f"results_{arrow.now().format('YYYYMMDD_HH:mm:ss')}"
-            df.to_csv(self.filename + ".csv", index=False)
-        self.logger.debug(f"Finished saving results as .csv")
-    
+
+    def output_csv(self):
+        self.output_table(fmt="csv")
+
+    @measured("output_text", lambda worker, *args, **kwargs: {"masses": len(worker.results)})
     def output_text(self, to_std_out=False):
-        pretty_txt = self._prettify_text()
+        """Writes human readable results to stdout or filename.txt, mass by mass (see writers.write_text_report)"""
+        import arrow
         if to_std_out:
-            print(pretty_txt)
-        else:
-            if self.filename:
-                with open(str(self.filename) + ".txt", "w") as outfile:
-                    outfile.write(pretty_txt)
-            else:
-                with open(f"results_{arrow.now().format('YYYYMMDD_HH:mm:ss')}.txt", "w") as outfile:
-                    outfile.write(pretty_txt)
-            self.logger.debug("Finished saving results as .txt")
+            # same as print() of the whole report
+            write_text_report(self.results, sys.stdout, end="\n")
+            return
+        filename = str(self.filename) if self.filename else f"results_{arrow.now().format('YYYYMMDD_HH:mm:ss')}"
+        with open(filename + ".txt", "w") as outfile:
+            write_text_report(self.results, outfile)
+        self.logger.debug("Finished saving results as .txt")
 
     def _prettify_text(self):
-        """ Transforms raw text to more readable form.
-        EXAMPLE RAW:
-            'User mass: 1454.0',
-            'Adduct ([M+H]+): 1.00727',
-            'Derivative mass (Free reducing end): 18.0105546',
-            '1434.5020.48(Hex)3 (HexNAc)2 (Deoxyhexose)1 (Pent)3',
-            '1435.32-0.337(Hex)1 (HexNAc)3 (Deoxyhexose)2 (Pent)1 (Sulph)3',
-            '1435.362-0.379(Hex)4 (HexNAc)1 (Deoxyhexose)2 (Pent)1 (Sulph)2',
-            '3 structures'
-        EXAMPLE PROCESSED:
+        """ Transforms results to more readable form, returns whole report as one string.
+        EXAMPLE:
             User mass: 1454.0
             Adduct ([M+H]+): 1.00727
             Derivative mass (Free reducing end): 18.0105546
-	            1. [MH]+: 1434.502,  Error: 0.48, Comp: (Hex)3(HexNAc)2(Deoxyhexose)1(Pent)3
-	            2. [MH]+: 1435.32,  Error: -0.337, Comp: (Hex)1(HexNAc)3(Deoxyhexose)2(Pent)1(Sulph)3
-	            3. [MH]+: 1435.362,  Error: -0.379, Comp: (Hex)4(HexNAc)1(Deoxyhexose)2(Pent)1(Sulph)2
-            3 structures"""
-        prep_text = self.parsed_data.copy()
-        for i in prep_text:
-            # if unmatched len == 4
-            if len(i) > 4:  
-                res_string = i[3:len(i)-1]
-                prepped = []
-                counter = 1
-                for res in res_string:                    
-                    split_index = res.index("(")
-                    num_str, comp_str = res[:split_index:], res[split_index:]
-                    comp_str = "".join(comp_str.split())
-                    if num_str.find("-") > 0:  # -1 if not found
-                        # [mass, error]
-                        numbers = [num_str[:num_str.index("-")], num_str[num_str.index("-"):]]
-                    else:
-                        numbers = [num_str[:num_str.rindex(".")-1], num_str[num_str.rindex(".")-1:]]
-                    prepped.append(f"\t{counter}. [MH]+: {numbers[0]:>9},  Error: {numbers[1]:>6}, Comp: {comp_str}")
-                    counter += 1
-                # replace with processed strings
-                i[3:len(i)-1] = prepped
-        return "\n\n".join(["\n".join(i) for i in prep_text])
-
-    def _fetch_glycomod_html_data(self):
-        """Fetches Glycomod HTML"""
-        self.driver = webdriver.Chrome(
+	            1. [MH]+:  1434.502,  Error:   0.48, Comp: (Hex)3(HexNAc)2(Deoxyhexose)1(Pent)3
+	            2. [MH]+:   1435.32,  Error: -0.337, Comp: (Hex)1(HexNAc)3(Deoxyhexose)2(Pent)1(Sulph)3
+	            3. [MH]+:  1435.362,  Error: -0.379, Comp: (Hex)4(HexNAc)1(Deoxyhexose)2(Pent)1(Sulph)2
+            3 structures found."""
+        report = io.StringIO()
+        write_text_report(self.results, report)
+        return report.getvalue()
+
+    def _get_driver(self):
+        """Starts headless Chrome. With keep_browser, idle browser started before is returned if there is one"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        if self.keep_browser:
+            with self._drivers_lock:
+                if self._idle_drivers:
+                    return self._idle_drivers.pop()
+        if self.driver_options is None:
+            self.driver_options = Options()
+            self.driver_options.add_argument("--headless")
+        driver = webdriver.Chrome(
             executable_path=self.driver_path, 
             chrome_options=self.driver_options
         )
-        self.driver.get(self.cfg["glycomod_link"])
-        assert "GlycoMod" in self.driver.title
-        self.logger.debug(f"Connected to [{self.driver.title}]")
+        if self.keep_browser:
+            with self._drivers_lock:
+                self._drivers.append(driver)
+        return driver
+
+    def _release_driver(self, driver, failed=False):
+        """Keeps browser for next fetch (keep_browser), otherwise or if fetch failed, closes it"""
+        if self.keep_browser and not failed:
+            with self._drivers_lock:
+                self._idle_drivers.append(driver)
+            return
+        if self.keep_browser:
+            with self._drivers_lock:
+                self._drivers.remove(driver)
+        try:
+            if failed:
+                driver.quit()
+            else:
+                driver.close()
+        except Exception as e:
+            self.logger.warning(f"Error closing browser: {e}")
+
+    def _fetch_html_selenium(self, text_input) -> str:
+        """Fills and submits Glycomod form in headless Chrome, returns result page HTML"""
+        driver = self._get_driver()
+        try:
+            html = self._submit_form_selenium(driver, text_input)
+        except Exception:
+            self._release_driver(driver, failed=True)
+            raise
+        self._release_driver(driver)
+        return html
+
+    def _select_mass_type_selenium(self, driver):
+        """Selects average masses in Glycomod form, field is found by option text or radio value"""
+        from selenium.webdriver.support.ui import Select
+        from .http_client import MASS_TYPE_TEXT
+        text = MASS_TYPE_TEXT[self.mass_type]
+        lower = "translate({}, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+        selects = driver.find_elements_by_xpath(f"//select[option[normalize-space({lower.format('text()')})='{text}']]")
+        if selects:
+            select = Select(selects[0])
+            for option in select.options:
+                if option.text.strip().lower() == text:
+                    select.select_by_visible_text(option.text)
+                    return
+        radios = driver.find_elements_by_xpath(f"//input[@type='radio'][{lower.format('@value')}='{text}']")
+        if not radios:
+            raise ValueError(f"Glycomod form has no '{text}' mass option")
+        radios[0].click()
+
+    def _submit_form_selenium(self, driver, text_input) -> str:
+        from selenium.webdriver.support.ui import Select
+        driver.get(self.cfg["glycomod_link"])
+        assert "GlycoMod" in driver.title
+        self.logger.debug(f"Connected to [{driver.title}]")
         # set tolerance
-        tol = self.driver.find_element_by_xpath("//input[@name='Tolerance']")
+        tol = driver.find_element_by_xpath("//input[@name='Tolerance']")
         tol.clear()
         tol.send_keys(self.cfg.get("Tolerance", "0.5"))
         # enter masses into mass textarea
-        element = self.driver.find_element_by_xpath("//textarea[@name='Masses']")
-        if self.text_input:
-            element.send_keys(self.text_input)
+        element = driver.find_element_by_xpath("//textarea[@name='Masses']")
+        if text_input:
+            element.send_keys(text_input)
         else:
             raise ValueError("FATAL! No data provided for fetching html")
         # select analyte type    
-        analyte = Select(self.driver.find_element_by_xpath("//select[@name='Nform']"))
+        analyte = Select(driver.find_element_by_xpath("//select[@name='Nform']"))
         if self.reducing_end_tag:
             analyte.select_by_visible_text("Derivatised oligosaccharides")
-            derivative_name = self.driver.find_element_by_xpath("//input[@name='derivative_name']")
+            derivative_name = driver.find_element_by_xpath("//input[@name='derivative_name']")
             derivative_name.send_keys(self.reducing_end_tag)
-            derivative_mass = self.driver.find_element_by_xpath("//input[@name='derivative_mass']")
+            derivative_mass = driver.find_element_by_xpath("//input[@name='derivative_mass']")
             # USING self.reducing_end_mass_full!!!!!!!!!
             derivative_mass.send_keys(str(self.reducing_end_mass_full))         
         else:
             analyte.select_by_visible_text("Free / PNGase released oligosaccharides")
+        if self.mass_type != "mono":
+            self._select_mass_type_selenium(driver)
         # select N-glycan monosaccharide content options    
         try:
             for option, value in self.cfg["default_mono"].items():
                 if value == 2:
                     Select(
-                        self.driver.find_element_by_xpath(f"//select[@name='{option}']")
+                        driver.find_element_by_xpath(f"//select[@name='{option}']")
                         ).select_by_visible_text("yes")
                 elif value == 1:
                     Select(
-                        self.driver.find_element_by_xpath(f"//select[@name='{option}']")
+                        driver.find_element_by_xpath(f"//select[@name='{option}']")
                         ).select_by_visible_text("possible")
                 else:
                     Select(
-                        self.driver.find_element_by_xpath(f"//select[@name='{option}']")
+                        driver.find_element_by_xpath(f"//select[@name='{option}']")
                         ).select_by_visible_text("no")
             for option, value in self.cfg["default_occurrences"].items():
-                self.driver.find_element_by_xpath(f"//input[@name='{option}']").send_keys(value)
+                driver.find_element_by_xpath(f"//input[@name='{option}']").send_keys(value)
         except Exception as e:
             self.logger.error("Error happened selecting Glycomod options:\n {e}")
             raise
 
         try:
-            self.driver.find_element_by_xpath("//input[@value='Start GlycoMod']").click()
+            driver.find_element_by_xpath("//input[@value='Start GlycoMod']").click()
         except Exception as e:
             self.logger.error("Error happended trying to submit Glycomod form:\n{e}")
 
-        self.soup = BeautifulSoup(self.driver.page_source, 'html5lib')
-        self.driver.close()
+        return driver.page_source
+
+    @measured("_fetch_glycomod_html_data", _count_submitted)
+    def _fetch_glycomod_html_data(self, text_input=None):
+        """Fetches Glycomod HTML"""
+        self.html = self._fetch_html_selenium(text_input or self.text_input)
+        self.soup = None
+
+    def _get_http_client(self):
+        if self.http_client is None:
+            from .http_client import GlycomodHTTPClient
+            self.http_client = GlycomodHTTPClient(self.cfg["glycomod_link"], maxsize=self.max_workers)
+        return self.http_client
+
+    def _fetch_html_http(self, text_input) -> str:
+        """Submits Glycomod form over HTTP, returns result page HTML"""
+        client = self._get_http_client()
+        fields = client.fill_form(
+            self.cfg, text_input,
+            reducing_end_tag=self.reducing_end_tag,
+            # USING self.reducing_end_mass_full, same as with Selenium
+            derivative_mass=self.reducing_end_mass_full,
+            mass_type=self.mass_type
+        )
+        html = client.submit(fields)
+        self.logger.debug("Fetched Glycomod HTML over HTTP")
+        return html
+
+    @measured("_fetch_glycomod_html_http", _count_submitted)
+    def _fetch_glycomod_html_http(self, text_input=None):
+        """Fetches Glycomod HTML without browser"""
+        self.html = self._fetch_html_http(text_input or self.text_input)
+        self.soup = None
+
+    def _fetch_chunk(self, chunk_number, masses) -> list:
+        """Fetches and parses results for one chunk of masses, retrying failed attempts"""
+        fetch = self._fetch_html_http if self.backend == "http" else self._fetch_html_selenium
+        for attempt in range(1, self.chunk_retries + 2):
+            try:
+                parsed = self._parse_html(fetch("\n".join(masses)))
+                if len(parsed) != len(masses):
+                    raise ValueError(f"Expected results for {len(masses)} masses, got {len(parsed)}")
+                return parsed
+            except Exception as e:
+                if attempt > self.chunk_retries:
+                    self.logger.error(f"Chunk {chunk_number} failed after {attempt} attempts: {e}")
+                    raise
+                self.logger.warning(f"Chunk {chunk_number} attempt {attempt} failed, retrying: {e}")
+
+    @measured("_fetch_chunked", _count_submitted)
+    def _fetch_chunked(self, text_input=None):
+        """Splits masses into chunks of self.chunk_size and fetches them concurrently.
+        Parsed results are merged in input order."""
+        masses = (text_input or self.text_input).split()
+        if not masses:
+            raise ValueError("FATAL! No data provided for fetching html")
+        chunks = [masses[i:i + self.chunk_size] for i in range(0, len(masses), self.chunk_size)]
+        if self.backend == "http":
+            # form is loaded once, before chunks are submitted concurrently
+            self._get_http_client()._load_form()
+        self.logger.debug(f"Fetching {len(masses)} masses in {len(chunks)} chunks, {self.max_workers} workers")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            parsed_chunks = list(executor.map(self._fetch_chunk, range(len(chunks)), chunks))
+        self.parsed_data = list(concat(parsed_chunks))
+
+    def _get_engine(self) -> LocalSearchEngine:
+        if self.engine is None:
+            index = MassIndex.for_config(self.cfg, mass_type=self.mass_type)
+            if index is None:
+                self.logger.debug("No mass index for current config, enumerating compositions")
+            self.engine = LocalSearchEngine(
+                self.cfg, reducing_end=self.reducing_end_tag, adduct=self.adduct_info[0], index=index,
+                mass_type=self.mass_type
+            )
+        return self.engine
+
+    @measured("_search_local", _count_parsed)
+    def _search_local(self, text_input=None):
+        """Runs search with LocalSearchEngine, results are stored same as parsed Glycomod HTML"""
+        if text_input is None and self.peaks is not None:
+            self.parsed_data = self._get_engine().search_masses(self.peaks.masses, self.peaks.labels)
+            return
+        text_input = text_input or self.text_input
+        if not text_input:
+            raise ValueError("FATAL! No data provided for local search")
+        self.parsed_data = self._get_engine().search(text_input)
+
+    def _search(self, text_input=None):
+        """Runs search with selected backend and stores results in self.parsed_data"""
+        if self.backend == "local":
+            self._search_local(text_input)
+        elif self.chunk_size:
+            self._fetch_chunked(text_input)
+        elif self.backend == "http":
+            self._fetch_glycomod_html_http(text_input)
+            self._parse_gm_html()
+        else:
+            self._fetch_glycomod_html_data(text_input)
+            self._parse_gm_html()
+
+    def _cache_settings(self) -> dict:
+        """Search settings that results depend on, used as part of cache key"""
+        settings = {
+            "Tolerance": self.cfg.get("Tolerance", "0.5"),
+            "reducing_end_tag": self.reducing_end_tag,
+            "derivative_mass": self.reducing_end_mass_full,
+            "adduct": self.adduct_info[0],
+            # local results follow residue, adduct and tag masses of config.json, edited masses must not hit old results
+            "masses": config_checksum(self.cfg, (
+                f"{self.mass_type}_masses_underivatized", "adducts" if self.mass_type == "mono" else "adducts_avg",
+                f"reducing_end_tag_{self.mass_type}", f"reducing_end_tag_{self.mass_type}_full",
+            )),
+            "default_mono": self.cfg["default_mono"],
+            "default_occurrences": self.cfg["default_occurrences"],
+            "backend": self.backend,
+        }
+        if self.mass_type != "mono":
+            settings["mass_type"] = self.mass_type
+        return settings
+
+    @measured("_search_cached", lambda worker: {"cache_hits": worker.cache.hits, "cache_misses": worker.cache.misses})
+    def _search_cached(self):
+        """Searches only masses missing from result cache, cached results are reused"""
+        masses = self.text_input.split()
+        settings = self._cache_settings()
+        results = self.cache.get_many(masses, settings)
+        missing = list(dict.fromkeys(i for i in masses if i not in results))
+        if missing:
+            self._search("\n".join(missing))
+            if len(self.parsed_data) != len(missing):
+                self.logger.warning(f"Got results for {len(self.parsed_data)} of {len(missing)} masses, searching without cache")
+                self._search()
+                return
+            fetched = dict(zip(missing, self.parsed_data))
+            self.cache.put_many(fetched, settings)
+            results.update(fetched)
+        # every mass gets its own list, same mass can be submitted more than once
+        self.parsed_data = [list(results[i]) for i in masses]
+        self.logger.debug(f"Result cache: {self.cache.hits} hits, {self.cache.misses} misses")
     
+    def _parse_html(self, html) -> list:
+        from .gm_parser import parse_gm_soup, parse_gm_html
+        if self.html_parser == "lxml":
+            return parse_gm_html(html)
+        from bs4 import BeautifulSoup
+        return parse_gm_soup(BeautifulSoup(html, 'html5lib'))
+
+    @measured("_parse_gm_html", _count_parsed)
     def _parse_gm_html(self) -> list: 
         """Parses HTML for relevant data about glycan compositions"""
-        if self.soup:
-            items = []
-            glycans_list = []
-            for hr in self.soup.find_all("hr"):
-                for item in hr.find_next_siblings():
-                    if item.name == 'hr':
-                        break
-                    items.append(item.text)
-            # this is a bit silly but I do not want to use regexes
-            clean_text = ''.join(items).replace(u'\nglycoform mass\nΔmass (Dalton)\nstructure\ntype\nLinks', "")\
-                .replace("high_manUniCarbKB", "").replace("hybrid/complexUniCarbKB", "").\
-                replace(" -UniCarbKB", "").replace("high_man", "").replace("hybrid/complex", "").\
-                replace("paucimannose", "").\
-                replace(" -", "").\
-                replace("\n\n\n\nSIB Swiss Institute of Bioinformatics | Disclaimer", "").\
-                replace("Back to the Top\n\n", "")
-            unprocessed_strings = clean_text.split(' found.', clean_text.count('found.')-1)
-            for i in unprocessed_strings:
-                ll = i.split("\n")
-                ll2 = []
-                for j in range(len(ll)):
-                    if len(ll[j]) > 1:
-                        ll2.append(ll[j])
-                glycans_list.append(ll2)           
-            self.parsed_data = glycans_list 
+        from .gm_parser import parse_gm_soup
+        if self.soup is None and self.html:
+            self.parsed_data = self._parse_html(self.html)
+        elif self.soup:
+            self.parsed_data = parse_gm_soup(self.soup)
         else:
             raise ValueError("NO GLYCOMOD DATA WAS FETCHED.")
     
+    @measured("_create_glycan_objects", _count_results)
     def _create_glycan_objects(self):
-        """Creates SubmittedMass objects from parsed html data"""
-        for result in self.parsed_data:
+        """Creates ResultStore from parsed html data"""
+        self.results = self._build_results(self.parsed_data)
+
+    def _build_results(self, parsed_data) -> ResultStore:
+        """Creates ResultStore from parsed html data.
+        Adduct masses are calculated at once, for every distinct composition (see calc_adducts_batch)."""
+        user_mass, header, hit_offsets = [], [], [0]
+        theoretical_MH, delta, composition = [], [], []
+        headers = {}
+        # composition 0 is used for masses without match
+        compositions = {NOT_FOUND[0]: 0}
+        composition_table = [NOT_FOUND]
+        comp_dicts = []
+        for result in parsed_data:
             submitted = 0.0
-            compositions = []
+            header_lines = []
             for element in result:
                 if element.startswith('User mass: '):
                     submitted = element[len('User mass: '):]
                     if " " in submitted:
                         submitted = "".join(submitted.split())
+                elif element.startswith(('Adduct', 'Derivative mass')):
+                    header_lines.append(element)
 
                 if element[0].isdigit():
-                    if "0 structures" in element:
-                        compositions.append(
-                            GlycomodComposition(
-                                theoretical_MH=0.0,
-                                delta=1000.0,
-                                long_notation="NOT FOUND",
-                                short_notation="NOT FOUND",
-                                theoretical_MTagH=0.0,
-                                theoretical_MTagNa=0.0,
-                                theoretical_MTagK=0.0,
-                                theoretical_MTagH2=0.0,
-                                theoretical_MTagHNa=0.0,
-                                theoretical_MTagHK=0.0,
-                                theoretical_MTagNa2=0.0,
-                                theoretical_MTagNH4=0.0,
-                            )
-                        )
+                    # "10 structures" also contains "0 structures"
+                    if element.startswith("0 structures"):
+                        theoretical_MH.append(0.0)
+                        delta.append(1000.0)
+                        composition.append(0)
                     elif "structure" not in element:
                         split_index = element.index("(")
                         num_str, comp_str = element[:split_index:], element[split_index:]
+                        # local backend separates numbers with tab (see LocalSearchEngine._lines)
+                        if "\t" in num_str:
+                            numbers = num_str.split("\t")
                         # find returns -1 if not found
-                        if num_str.find("-") > 0:  
+                        elif num_str.find("-") > 0:  
                             numbers = [num_str[:num_str.index("-")], num_str[num_str.index("-"):]]
                         else:
                             # if positive, python handles .17 as 0.17, so no problem
                             numbers = [num_str[:num_str.rindex(".")], num_str[num_str.rindex("."):]]
-                        comp_dict = string_to_dict(comp_str)
-                        # if self.use_avg_vals: # TODO
-                        #    raise NotImplementedError
-                        adduct_ions = calc_default_adducts_mono(comp_dict, self.cfg, reducing_end=self.reducing_end_tag)
-                        compositions.append(
-                            GlycomodComposition(
-                                theoretical_MH=float(numbers[0]),
-                                theoretical_MTagH=adduct_ions["H+"],
-                                theoretical_MTagNa=adduct_ions["Na+"],
-                                theoretical_MTagK=adduct_ions["K+"],
-                                theoretical_MTagH2=adduct_ions["2H2+"],
-                                theoretical_MTagHNa=adduct_ions["HNa2+"],
-                                theoretical_MTagHK=adduct_ions["HK2+"],
-                                theoretical_MTagNa2=adduct_ions["2Na2+"],
-                                theoretical_MTagNH4=adduct_ions["NH4+"],
-                                delta=float(numbers[1]),
-                                long_notation=comp_str,
-                                short_notation=truncated_str_from_dict(comp_dict)
-                            )
-                        )
-            self.compositions.append(
-                SubmittedMass(
-                    experimental_mass=submitted,
-                    # peak_number=peak_num,
-                    adduct=self.adduct_info[0],
-                    adduct_mass=self.adduct_info[1],
-                    red_end_tag=self.reducing_end_tag,
-                    red_end_tag_mass=self.reducing_end_mass,
-                    glycomod_structures=compositions
-                )
-            )
+                        if comp_str not in compositions:
+                            parsed = parse_composition(comp_str)
+                            compositions[comp_str] = len(composition_table)
+                            composition_table.append(parsed.notation)
+                            comp_dicts.append(parsed.dictionary)
+                        theoretical_MH.append(float(numbers[0]))
+                        delta.append(float(numbers[1]))
+                        composition.append(compositions[comp_str])
+            user_mass.append(submitted)
+            header.append(headers.setdefault(tuple(header_lines), len(headers)))
+            hit_offsets.append(len(delta))
+
+        ion_table = self._adduct_ion_table(comp_dicts)
+        return ResultStore(
+            user_mass=user_mass,
+            adduct=[self.adduct_info[0]] * len(user_mass),
+            adduct_mass=[self.adduct_info[1]] * len(user_mass),
+            red_end_tag=[self.reducing_end_tag] * len(user_mass),
+            red_end_tag_mass=[self.reducing_end_mass] * len(user_mass),
+            header=header,
+            header_table=list(headers),
+            hit_offsets=hit_offsets,
+            theoretical_MH=theoretical_MH,
+            delta=delta,
+            composition=composition,
+            composition_table=composition_table,
+            adduct_ions=ion_table[np.asarray(composition, dtype=np.int64)]
+        )
+
+    def _adduct_ion_table(self, comp_dicts) -> np.ndarray:
+        """Adduct ions (ADDUCT_FIELDS) of composition table [NOT_FOUND, *comp_dicts], calculated at once
+        (see calc_adducts_batch). NOT_FOUND row is zeros."""
+        adduct_names, adduct_ions = calc_adducts_batch(
+            comp_dicts, self.mass_config, reducing_end=self.reducing_end_tag, mass_type=self.mass_type
+        )
+        ion_table = np.zeros((len(comp_dicts) + 1, len(ADDUCT_FIELDS)), dtype=np.float64)
+        ion_table[1:] = adduct_ions[:, [adduct_names.index(name) for _, name in ADDUCT_FIELDS]]
+        return ion_table
+
+    @measured("_search_adducts", _count_results)
+    def _search_adducts(self):
+        """Searches every mass as every adduct in self.adducts at once (see LocalSearchEngine.match_adducts).
+        Results have one block per (mass, adduct) explaining at least one composition, in input order,
+        masses not explained by any adduct get one NOT_FOUND block of the first adduct."""
+        peaks = self._input_masses()
+        if not len(peaks):
+            raise ValueError("FATAL! No data provided for local search")
+        engine = self._get_engine()
+        table = adduct_table(self.cfg, self.mass_type)
+        adducts = [(name, *table[name]) for name in self.adducts]
+        pair_offsets, hits = engine.match_adducts(peaks.masses, adducts)
+        n_adducts = len(adducts)
+        pair_counts = np.diff(pair_offsets)
+        matched = np.flatnonzero(pair_counts)
+        unmatched = np.setdiff1d(np.arange(len(peaks)), matched // n_adducts)
+        blocks = np.sort(np.concatenate((matched, unmatched * n_adducts)))
+        block_mass, block_adduct = blocks // n_adducts, blocks % n_adducts
+        counts = pair_counts[blocks]
+        hit_offsets = np.concatenate(([0], np.cumsum(np.maximum(counts, 1))))
+        # compositions of every block and their rows in results, NOT_FOUND blocks have none
+        block_start = np.cumsum(counts) - counts
+        index = np.arange(int(counts.sum()))
+        matched_hits = hits[index + np.repeat(pair_offsets[blocks] - block_start, counts)]
+        rows = index + np.repeat(hit_offsets[:-1] - block_start, counts)
+        hit_adduct = np.repeat(block_adduct, counts)
+
+        distinct, composition_ids = np.unique(matched_hits, return_inverse=True)
+        parsed = [parse_composition(engine.long_notation(engine.counts[i])) for i in distinct.tolist()]
+        comp_dicts = [i.dictionary for i in parsed]
+        composition_table = [NOT_FOUND] + [i.notation for i in parsed]
+        composition = np.zeros(hit_offsets[-1], dtype=np.int64)
+        composition[rows] = composition_ids + 1
+        glycoform_mass = engine.masses[matched_hits]
+        offsets = np.array([engine.derivative_mass + mass for _, mass, _ in adducts], dtype=np.float64)
+        charges = np.array([charge for _, _, charge in adducts], dtype=np.float64)
+        theoretical_MH = np.zeros(hit_offsets[-1], dtype=np.float64)
+        theoretical_MH[rows] = round_array(glycoform_mass, 3)
+        # delta of m/z, reported with 3 decimals as in Glycomod
+        delta = np.full(hit_offsets[-1], 1000.0)
+        delta[rows] = round_array(
+            peaks.masses[np.repeat(block_mass, counts)] - (glycoform_mass + offsets[hit_adduct]) / charges[hit_adduct], 3
+        )
+        names = [name for name, _, _ in adducts]
+        self.results = ResultStore(
+            user_mass=[peaks.labels[i] for i in block_mass.tolist()],
+            adduct=[names[i] for i in block_adduct.tolist()],
+            adduct_mass=[adducts[i][1] for i in block_adduct.tolist()],
+            red_end_tag=[self.reducing_end_tag] * len(blocks),
+            red_end_tag_mass=[self.reducing_end_mass] * len(blocks),
+            header=block_adduct,
+            header_table=[
+                (f"Adduct ({adduct_ion_label(name, charge)}): {mass}",
+                 f"Derivative mass ({engine.derivative_name}): {engine.derivative_mass}")
+                for name, mass, charge in adducts
+            ],
+            hit_offsets=hit_offsets,
+            theoretical_MH=theoretical_MH,
+            delta=delta,
+            composition=composition,
+            composition_table=composition_table,
+            adduct_ions=self._adduct_ion_table(comp_dicts)[composition],
+        )
 
+    def reset(self, text_input="", filename="", peaks=None):
+        """Clears results of previous run so backend (browser, HTTP pool, local engine) can be reused
+        for another input"""
+        self.peaks = peaks
+        self.text_input = peaks.text if peaks is not None else text_input
+        self.filename = filename
+        self.html = ""
+        self.soup = None
+        self.parsed_data = []
+        self.results = ResultStore()
+        self._run_journal = None
+
+    def close(self):
+        """Closes browsers kept with keep_browser, HTTP connections and result cache"""
+        for driver in self._drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                self.logger.warning(f"Error closing browser: {e}")
+        self._drivers = []
+        self._idle_drivers = []
+        if self.http_client is not None:
+            self.http_client.close()
+            self.http_client = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    @measured("_run_pipeline", _count_results)
+    def _run_pipeline(self):
+        """Runs search and writes results table in overlapping stages (see pipeline.SearchPipeline)"""
+        from .pipeline import SearchPipeline
+        SearchPipeline(self).run()
+
+    def _search_chunk(self, chunk_number, masses) -> list:
+        if self.backend == "local":
+            return self._get_engine().search("\n".join(masses))
+        return self._fetch_chunk(chunk_number, masses)
+
+    @measured("_search_journaled", _count_parsed)
+    def _search_journaled(self):
+        """Searches masses chunk by chunk, skipping chunks completed in RunJournal.
+        Completed chunks are appended to journal as they finish."""
+        masses = self.text_input.split()
+        if not masses:
+            raise ValueError("FATAL! No data provided for search")
+        chunk_size = self.chunk_size or JOURNAL_CHUNK_SIZE
+        journal = RunJournal(self.journal, {
+            "input": input_checksum(masses),
+            "settings": config_checksum(self._cache_settings(), sorted(self._cache_settings())),
+            "chunk_size": chunk_size,
+        })
+        chunks = [masses[i:i + chunk_size] for i in range(0, len(masses), chunk_size)]
+        self._run_journal = journal
+        done = journal.open()
+        try:
+            pending = [i for i in range(len(chunks)) if i not in done]
+            self.logger.debug(f"Searching {len(pending)} of {len(chunks)} chunks, journal: {self.journal}")
+            if pending and self.backend == "http":
+                self._get_http_client()._load_form()
+            workers = 1 if self.backend == "local" else self.max_workers
+            failed = None
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._search_chunk, i, chunks[i]): i for i in pending}
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        # chunks already running are still journaled, the rest is left for the next run
+                        if failed is None:
+                            failed = e
+                            for i in futures:
+                                i.cancel()
+                        continue
+                    done[futures[future]] = results
+                    journal.append(futures[future], results)
+            if failed is not None:
+                raise failed
+        finally:
+            journal.close()
+        self.parsed_data = list(concat(done[i] for i in range(len(chunks))))
+
+    def _search_input(self):
+        if self.journal:
+            self._search_journaled()
+        elif self.cache is not None:
+            self._search_cached()
+        else:
+            self._search()
+        self._create_glycan_objects()
+
+    @contextmanager
+    def _query_tolerance(self, tolerance):
+        """Searches with Da tolerance string instead of config.json/"Tolerance" inside with block"""
+        if self.backend == "local":
+            # engine created inside the block would keep query tolerance
+            self._get_engine()
+        cfg = self.cfg
+        engine_tolerance = self.engine.tolerance if self.engine is not None else None
+        self.cfg = dict(cfg, Tolerance=tolerance)
+        if self.engine is not None:
+            self.engine.tolerance = parse_tolerance(tolerance)
+        try:
+            yield
+        finally:
+            self.cfg = cfg
+            if self.engine is not None:
+                self.engine.tolerance = engine_tolerance
+
+    def _input_masses(self) -> PeakList:
+        return self.peaks if self.peaks is not None else parse_peak_text(self.text_input)
+
+    @measured("_search_deduplicated", lambda worker: {"windows": len(worker._clusters)})
+    def _search_deduplicated(self):
+        """Searches query windows of near-duplicate masses, results are fanned out to every mass"""
+        peaks = self._input_masses()
+        windows = tolerance_windows(peaks.masses, parse_tolerance(self.cfg.get("Tolerance", "0.5")))
+        narrowest = float(windows.min()) if len(windows) else 0.0
+        widest = float(windows.max()) if len(windows) else 0.0
+        self._clusters = MassClusters(peaks.masses, peaks.labels, self.dedup*narrowest)
+        self.logger.info(f"Searching {len(self._clusters)} query windows for {len(peaks)} masses")
+        text_input = self.text_input
+        self.peaks = PeakList(self._clusters.query_masses, self._clusters.query_labels)
+        self.text_input = self.peaks.text
+        try:
+            with self._query_tolerance(self._clusters.query_tolerance(widest)):
+                self._search_input()
+        finally:
+            self.peaks, self.text_input = peaks, text_input
+        self.results = self._clusters.fan_out(self.results, windows)
+
+    def _search_widened(self):
+        """Searches Glycomod with Da tolerance of the widest ppm window, hits outside window
+        of every mass are left out. Glycomod reports deltas with 3 decimals, so hits less than
+        0.0005 Da from window limit can be kept or left out differently than in local search."""
+        tolerance = parse_tolerance(self.cfg.get("Tolerance", "0.5"))
+        windows = tolerance_windows(self._input_masses().masses, tolerance)
+        with self._query_tolerance(query_tolerance(windows.max() if len(windows) else 0.0)):
+            self._search_input()
+        windows = tolerance_windows(self.results.experimental_masses(), tolerance)
+        hit_windows = np.repeat(windows, np.diff(self.results.hit_offsets))
+        self.results = self.results.filter_hits(np.abs(self.results.delta) <= hit_windows)
+
+    def _needs_widened_search(self) -> bool:
+        """True if backend can not search tolerance of config as it is (ppm with Glycomod)"""
+        return self.backend != "local" and parse_tolerance(self.cfg.get("Tolerance", "0.5"))[1] > 0
+
+    def search(self) -> ResultStore:
+        """Searches masses from text_input and returns results, without writing any output"""
+        if self.adducts:
+            self._search_adducts()
+        elif self.dedup:
+            self._search_deduplicated()
+        elif self._needs_widened_search():
+            self._search_widened()
+        else:
+            self._search_input()
+        return self.results
+
+    @measured("run", _count_results)
     def run(self):
         """Run GlycomodWorker search and report results"""
-        self._fetch_glycomod_html_data()
-        self._parse_gm_html()
-        self._create_glycan_objects()
-        self.output_csv()
+        if self.pipeline and not (self.dedup or self.journal or self.adducts or self._needs_widened_search()):
+            self._run_pipeline()
+        else:
+            self.search()
+            self.output_table()
+            if self._run_journal is not None:
+                # output is complete, nothing to resume
+                self._run_journal.remove()
+                self._run_journal = None
         if self.save_txt:
             try:
                 self.output_text()
@@ -0,0 +1,163 @@
+# -*- coding: UTF-8 -*-
+import csv
+import logging
+
+from .result_store import ADDUCT_COLUMN
+
+OUTPUT_FORMATS = ("csv", "parquet", "feather")
+# masses formatted before text report is written out
+TEXT_BATCH_MASSES = 1000
+# types of SubmittedMass.prep_csv_out() columns, in order
+# EXP_mass, Tag, Tag_mass, Comp_SHORT, Comp_LONG, [MH]+, Error, 8 adduct ions
+# multi-adduct results have ADDUCT_COLUMN (string) after them
+COLUMN_TYPES = ("string", "string", "float64", "string", "string") + ("float64",) * 10
+
+
+class CSVResultWriter:
+    """Writes SubmittedMass rows to .csv as they are produced.
+    Output is the same as pandas.DataFrame.to_csv(index=False) of all rows.
+    path can also be open text file (e.g. io.StringIO), it is not closed by close()."""
+    extension = ".csv"
+
+    def __init__(self, path, col_names):
+        self.path = path
+        self.col_names = list(col_names)
+        self.adduct = ADDUCT_COLUMN in self.col_names
+        self.rows = 0
+        self.owns_file = not hasattr(path, "write")
+        self.outfile = open(path, "w", newline="") if self.owns_file else path
+        self.writer = csv.writer(self.outfile, lineterminator="\n")
+        self.writer.writerow(self.col_names)
+
+    def write(self, submitted_mass):
+        rows = submitted_mass.prep_csv_out(adduct=self.adduct)
+        self.writer.writerows(rows)
+        self.rows += len(rows)
+
+    def close(self):
+        if self.owns_file:
+            self.outfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrowResultWriter:
+    """Writes SubmittedMass rows to .parquet or .feather in batches of batch_size rows.
+    Every batch is written as parquet row group / feather record batch, so only one batch is kept in memory.
+    path can also be binary file object (e.g. io.BytesIO). Requires pyarrow."""
+    def __init__(self, path, col_names, fmt="parquet", batch_size=50000):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError(f"Writing {fmt} files requires pyarrow. Install it with: pip install pyarrow")
+        if fmt not in ("parquet", "feather"):
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.logger = logging.getLogger(name="ArrowResultWriter")
+        self.pa = pa
+        self.path = path
+        self.fmt = fmt
+        self.extension = "." + fmt
+        self.col_names = list(col_names)
+        self.adduct = ADDUCT_COLUMN in self.col_names
+        self.batch_size = batch_size
+        self.rows = 0
+        self.batch = []
+        self.schema = pa.schema([
+            (name, pa.string() if col_type == "string" else pa.float64())
+            for name, col_type in zip(self.col_names, COLUMN_TYPES + ("string",))
+        ])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            # feather v2 is arrow IPC file format
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def _flush(self):
+        if not self.batch:
+            return
+        columns = [
+            self.pa.array(list(column), type=field.type)
+            for column, field in zip(zip(*self.batch), self.schema)
+        ]
+        batch = self.pa.RecordBatch.from_arrays(columns, schema=self.schema)
+        if self.fmt == "parquet":
+            self.writer.write_table(self.pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        self.batch = []
+
+    def write(self, submitted_mass):
+        rows = submitted_mass.prep_csv_out(adduct=self.adduct)
+        self.batch.extend(rows)
+        self.rows += len(rows)
+        if len(self.batch) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+        self.logger.debug(f"Wrote {self.rows} rows to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(fmt, filename, col_names):
+    """Returns writer for fmt, writing to filename + format extension
+        ### EXAMPLE ###
+        >>>with open_writer("csv", "results", cfg["col_names"]) as writer:
+        >>>    writer.write(submitted_mass)
+    """
+    if fmt == "csv":
+        return CSVResultWriter(str(filename) + ".csv", col_names)
+    if fmt in ("parquet", "feather"):
+        return ArrowResultWriter(f"{filename}.{fmt}", col_names, fmt=fmt)
+    raise ValueError(f"Unsupported output format: {fmt}. Supported: {OUTPUT_FORMATS}")
+
+
+def write_text_report(results, outfile, end="", batch_masses=TEXT_BATCH_MASSES):
+    """Writes human readable report of ResultStore to open text file (or sys.stdout), batch_masses
+    masses at a time, so memory does not grow with the report. results are only read, report can be
+    written any number of times. Blocks of masses are separated by empty line, end is written after last one.
+        ### EXAMPLE ###
+        User mass: 1454.0
+        Adduct ([M+H]+): 1.00727
+        Derivative mass (Free reducing end): 18.0105546
+            1. [MH]+:  1434.502,  Error:   0.48, Comp: (Hex)3(HexNAc)2(Deoxyhexose)1(Pent)3
+        1 structure found.
+    """
+    from .result_store import NOT_FOUND
+    # spaces are removed from long notation once per distinct composition
+    comp_strs = ["".join(long_notation.split()) for long_notation, _ in results.composition_table]
+    not_found = [composition == NOT_FOUND for composition in results.composition_table]
+    offsets = results.hit_offsets
+    for start in range(0, len(results), batch_masses):
+        stop = min(start + batch_masses, len(results))
+        first_hit = int(offsets[start])
+        theoretical_MH = results.theoretical_MH[first_hit:offsets[stop]].tolist()
+        delta = results.delta[first_hit:offsets[stop]].tolist()
+        composition = results.composition[first_hit:offsets[stop]].tolist()
+        hit_offsets = (offsets[start:stop + 1] - first_hit).tolist()
+        blocks = []
+        for index in range(start, stop):
+            lines = [f"User mass: {results.user_mass[index]}", *results.header_lines(index)]
+            counter = 0
+            for row in range(hit_offsets[index - start], hit_offsets[index - start + 1]):
+                if not_found[composition[row]]:
+                    continue
+                counter += 1
+                lines.append(
+                    f"\t{counter}. [MH]+: {theoretical_MH[row]:>9},  Error: {delta[row]:>6}, Comp: {comp_strs[composition[row]]}"
+                )
+            lines.append(f"{counter} structure{'' if counter == 1 else 's'} found.")
+            blocks.append("\n".join(lines))
+        outfile.write(("\n\n" if start else "") + "\n\n".join(blocks))
+    outfile.write(end)